@@ -0,0 +1,434 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: End-to-end crawl benchmark against a local synthetic web
+# (`synthetic_web.py`), without network access.
+#
+# The synthetic web (thousands of article pages, one home page and one
+# RSS/Atom feed per site, with a configurable latency and error rate) is
+# served from background processes, and every scenario runs in a fresh
+# Python process, in a temporary working directory, so the state files of
+# the crawlers (`data/`, `result.json`) start empty:
+#
+# - rss_spider: `run_rss_spider` scans the home pages for feed links;
+# - dynamic_spider: `run_dynamic_spider` scrapes the articles (its item
+#   pipeline writes to PostgreSQL, so it needs --database);
+# - crawler_pool: the articles scraped by the warm `CrawlerPool` workers,
+#   as in the continuous crawl;
+# - feed_validation: the feeds discovered on the pool, then downloaded and
+#   parsed by `validate_feeds`;
+# - extract_rss_and_save: the whole feed discovery of the API, feeds stored
+#   in the database included (needs --database).
+#
+# Every scenario reports its pages and feeds per second, the CPU time of
+# its processes (crawler workers and parsers included) and their peak RSS.
+# The results are saved in a JSON file keyed by git commit, so a run can be
+# compared with the one of another commit (--compare).
+#
+# The per-host delay is disabled by default (--domain-delay 0): the
+# benchmark measures the crawler, not the politeness settings. Scenarios
+# with --database write to the PostgreSQL database of the `POSTGRES_*`
+# settings (see `app.db.session`), which should be a scratch database.
+#
+# Usage (from the repository root):
+#     python benchmarks/crawl_benchmark.py [--sites 200] [--articles 20]
+#         [--latency 0.02] [--error-rate 0.01] [--scenario crawler_pool]
+#         [--database] [--repeat 1] [--compare HEAD~1]
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import queue
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from synthetic_web import SyntheticWeb, SyntheticWebServer  # noqa: E402
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SCENARIOS = (
+    "rss_spider", "dynamic_spider", "crawler_pool", "feed_validation",
+    "extract_rss_and_save"
+)
+
+# Scenarios writing to PostgreSQL, only run with --database
+DATABASE_SCENARIOS = ("dynamic_spider", "extract_rss_and_save")
+
+DEFAULT_OUTPUT = os.path.join("data", "benchmarks", "crawl_benchmark.json")
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def git_commit() -> str:
+    """
+    Return the commit of the working tree, suffixed with "-dirty" when it
+    has uncommitted changes.
+    """
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+
+    commit = git("rev-parse", "HEAD") or "unknown"
+    if git("status", "--porcelain", "--untracked-files=no"):
+        commit += "-dirty"
+    return commit
+
+
+def resource_usage() -> Dict[str, float]:
+    """
+    CPU seconds of this process and of its finished children, and the peak
+    RSS of the largest of them, in megabytes.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "cpu": own.ru_utime + own.ru_stime
+        + children.ru_utime + children.ru_stime,
+        "rss": max(own.ru_maxrss, children.ru_maxrss) * RSS_UNIT / 2**20
+    }
+
+
+def _drain(outcomes: "queue.Queue") -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    while not outcomes.empty():
+        outcome = outcomes.get()
+        if outcome is not None:
+            status = outcome["status"]
+            counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def bench_rss_spider(web: SyntheticWeb) -> Dict[str, int]:
+    from app.scraping.sipder_rss import run_rss_spider
+
+    results: "queue.Queue" = queue.Queue()
+    run_rss_spider(web.home_urls(), results)
+    return {"pages": web.sites, "feeds": len(results.get())}
+
+
+def bench_dynamic_spider(web: SyntheticWeb) -> Dict[str, int]:
+    from app.scraping.spider_factory import run_dynamic_spider
+
+    outcomes: "queue.Queue" = queue.Queue()
+    run_dynamic_spider(web.article_urls(), outcomes)
+    counts = _drain(outcomes)
+    return {"pages": sum(counts.values()), "failed": counts.get("failed", 0)}
+
+
+async def bench_crawler_pool(web: SyntheticWeb) -> Dict[str, int]:
+    from app.scraping.crawler_pool import CrawlerPool
+
+    counts = {"pages": 0, "failed": 0, "items": 0}
+
+    def on_message(kind: str, payload: Any) -> None:
+        if kind == "link":
+            counts["pages"] += 1
+            counts["failed"] += payload["status"] == "failed"
+        elif kind == "item":
+            counts["items"] += 1
+
+    crawlers = CrawlerPool()
+    crawlers.start()
+    try:
+        await crawlers.crawl("dynamic", web.article_urls(), on_message)
+    finally:
+        await crawlers.close()
+    return counts
+
+
+async def bench_feed_validation(web: SyntheticWeb) -> Dict[str, int]:
+    from app.scraping.crawler_pool import CrawlerPool
+    from app.scraping.http_cache import ConditionalFetchStats, ValidatorStore
+    from app.scraping.sipder_rss import discover_feeds, validate_feeds
+
+    crawlers = CrawlerPool()
+    crawlers.start()
+    validators = ValidatorStore()
+    valid = 0
+    try:
+        feed_urls = await discover_feeds(crawlers, web.home_urls())
+        async for _, summary, _ in validate_feeds(
+            feed_urls, validators, ConditionalFetchStats()
+        ):
+            valid += bool(summary and summary["entries"])
+    finally:
+        validators.close()
+        await crawlers.close()
+    return {
+        "pages": web.sites,
+        "feeds": valid,
+        "discovered": len(feed_urls)
+    }
+
+
+async def bench_extract_rss_and_save(web: SyntheticWeb) -> Dict[str, int]:
+    from app.db.session import create_db_pool
+    from app.scraping.crawler_pool import CrawlerPool
+    from app.scraping.sipder_rss import extract_rss_and_save
+    from app.utils.metrics import FEED_FETCHES, FEEDS_STORED
+
+    with open("sites.txt", "w", encoding="utf8") as file:
+        file.write("\n".join(web.home_urls()) + "\n")
+
+    pool = await create_db_pool(min_size=1, max_size=4)
+    crawlers = CrawlerPool()
+    crawlers.start()
+    try:
+        await extract_rss_and_save(pool, "sites.txt", crawlers)
+    finally:
+        await crawlers.close()
+        await pool.close()
+
+    stored = {status: int(FEEDS_STORED.labels(status).value)
+              for status in ("inserted", "duplicate", "error")}
+    return {
+        "pages": web.sites,
+        "feeds": stored["inserted"] + stored["duplicate"],
+        "failed": stored["error"] + int(FEED_FETCHES.labels("error").value)
+    }
+
+
+BENCHMARKS = {
+    "rss_spider": bench_rss_spider,
+    "dynamic_spider": bench_dynamic_spider,
+    "crawler_pool": bench_crawler_pool,
+    "feed_validation": bench_feed_validation,
+    "extract_rss_and_save": bench_extract_rss_and_save
+}
+
+
+def run_scenario(name: str, web: SyntheticWeb) -> Dict[str, Any]:
+    """
+    Run a scenario in the current process and measure it.
+    """
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    before = resource_usage()
+    start = time.perf_counter()
+    counts = BENCHMARKS[name](web)
+    if asyncio.iscoroutine(counts):
+        counts = asyncio.run(counts)
+    wall = time.perf_counter() - start
+    after = resource_usage()
+
+    cpu = after["cpu"] - before["cpu"]
+    result = {
+        "wall_seconds": round(wall, 3),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_percent": round(100 * cpu / wall, 1),
+        "peak_rss_mb": round(after["rss"], 1),
+        "pages_per_second": round(counts.get("pages", 0) / wall, 2)
+    }
+    if "feeds" in counts:
+        result["feeds_per_second"] = round(counts["feeds"] / wall, 2)
+    result.update(counts)
+    return result
+
+
+def spawn_scenario(
+    name: str,
+    web: SyntheticWeb,
+    env: Dict[str, str]
+) -> Dict[str, Any]:
+    """
+    Run a scenario in a fresh process, in an empty working directory.
+    """
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as workdir:
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__),
+             "--run", name, "--web", json.dumps(web.to_dict())],
+            cwd=workdir, env=env, stdout=subprocess.PIPE, text=True
+        )
+    lines = process.stdout.strip().splitlines()
+    if process.returncode or not lines:
+        return {"error": f"exit code {process.returncode}"}
+    return json.loads(lines[-1])
+
+
+def median_run(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Keep the run of median wall time, with the spread of all the runs.
+    """
+    runs = [run for run in runs if "error" not in run] or runs
+    if len(runs) == 1 or "error" in runs[0]:
+        return runs[0]
+    walls = [run["wall_seconds"] for run in runs]
+    middle = sorted(runs, key=lambda run: run["wall_seconds"])[len(runs) // 2]
+    return {**middle, "runs": len(runs),
+            "wall_stdev": round(statistics.stdev(walls), 3)}
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def find_baseline(results: Dict[str, Any], ref: str) -> Optional[str]:
+    """
+    Return the key of the saved results of a commit, given as any git
+    revision or commit prefix.
+    """
+    commit = subprocess.run(
+        ["git", "rev-parse", ref], cwd=ROOT, capture_output=True, text=True
+    ).stdout.strip() or ref
+    for key in results:
+        if key.startswith(commit):
+            return key
+    return None
+
+
+def report(
+    scenarios: Dict[str, Dict[str, Any]],
+    baseline: Optional[Dict[str, Any]] = None
+) -> None:
+    print(f"{'scenario':<22}{'pages/s':>10}{'feeds/s':>10}{'cpu s':>9}"
+          f"{'cpu %':>8}{'RSS MB':>9}{'failed':>8}"
+          + (f"{'vs. base':>10}" if baseline else ""))
+    for name, result in scenarios.items():
+        if "error" in result or "skipped" in result:
+            print(f"{name:<22}{result.get('error') or result['skipped']}")
+            continue
+        feeds = result.get("feeds_per_second")
+        line = (
+            f"{name:<22}{result['pages_per_second']:>10.1f}"
+            + (f"{feeds:>10.1f}" if feeds is not None else f"{'-':>10}")
+            + f"{result['cpu_seconds']:>9.1f}{result['cpu_percent']:>8.0f}"
+            f"{result['peak_rss_mb']:>9.0f}{result.get('failed', 0):>8}"
+        )
+        previous = (baseline or {}).get(name, {})
+        if previous.get("pages_per_second"):
+            ratio = result["pages_per_second"] / previous["pages_per_second"]
+            line += f"{ratio:>9.2f}x"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sites", type=int, default=200)
+    parser.add_argument("--articles", type=int, default=20,
+                        help="Articles per site")
+    parser.add_argument("--hosts", type=int, default=16,
+                        help="Loopback addresses the sites are spread over")
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="Mean latency of the server, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-processes", type=int,
+                        default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Crawler workers (0 keeps CRAWLER_POOL_SIZE)")
+    parser.add_argument("--domain-delay", type=float, default=0.0)
+    parser.add_argument("--per-host-concurrency", type=int, default=4)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run, may be repeated (default: "
+                        "every scenario available)")
+    parser.add_argument("--database", action="store_true",
+                        help="Also run the scenarios writing to PostgreSQL")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", metavar="REVISION",
+                        help="Compare with the saved results of a commit")
+    parser.add_argument("--run", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--web", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        # Child process of a single scenario
+        web = SyntheticWeb(**json.loads(args.web))
+        print(json.dumps(run_scenario(args.run, web)), flush=True)
+        return
+
+    web = SyntheticWeb(
+        sites=args.sites, articles=args.articles, hosts=args.hosts,
+        latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, seed=args.seed
+    )
+    settings = {
+        "CRAWLER_DOMAIN_DELAY": str(args.domain_delay),
+        "CRAWLER_CONCURRENT_REQUESTS_PER_DOMAIN":
+            str(args.per_host_concurrency),
+        "INDICATOR_KEYWORDS_FILE": os.path.join(
+            ROOT, "src", "app", "static", "docs",
+            "keywords_ciberseguridad_ot_it.txt"
+        )
+    }
+    if args.workers:
+        settings["CRAWLER_POOL_SIZE"] = str(args.workers)
+    env = {**os.environ, **settings}
+
+    selected = args.scenario or list(SCENARIOS)
+    scenarios: Dict[str, Dict[str, Any]] = {}
+    print(f"{web.sites} sites, {web.sites * web.articles} articles on "
+          f"{web.hosts} hosts, latency {web.latency * 1000:.0f} ms, "
+          f"error rate {web.error_rate:.1%}\n")
+    with SyntheticWebServer(web, args.server_processes):
+        for name in selected:
+            if name in DATABASE_SCENARIOS and not args.database:
+                scenarios[name] = {"skipped": "skipped, needs --database"}
+                continue
+            scenarios[name] = median_run([
+                spawn_scenario(name, web, env) for _ in range(args.repeat)
+            ])
+
+    results = load_results(args.output)
+    baseline = None
+    if args.compare:
+        key = find_baseline(results, args.compare)
+        if key is None:
+            print(f"No saved results for {args.compare} in {args.output}")
+        else:
+            print(f"Compared with {key}")
+            baseline = results[key]["scenarios"]
+
+    commit = git_commit()
+    web_settings = web.to_dict()
+    web_settings.pop("port")
+    results[commit] = {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "web": web_settings,
+        "settings": {
+            name: value for name, value in settings.items()
+            if name.startswith("CRAWLER_")
+        },
+        "scenarios": {
+            name: result for name, result in scenarios.items()
+            if "skipped" not in result
+        }
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf8") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+    report(scenarios, baseline)
+    print(f"\nResults of {commit} saved in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
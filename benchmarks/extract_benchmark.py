@@ -0,0 +1,147 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: Micro-benchmark of the article content extractors
+# (`app.scraping.extractors`).
+#
+# `result.json` only keeps the text extracted from every page, so the pages
+# are rebuilt as HTML documents: the original title, headings and paragraphs
+# inside an article, with some words of every paragraph wrapped in inline
+# links, surrounded by the usual navigation, sidebar, comments and footer.
+# Every extractor is then timed on a single core, both including the HTML
+# parse (what a crawler worker pays per page) and on the already parsed
+# tree, and the result is reported in pages per second.
+#
+# Usage (from the repository root):
+#     python benchmarks/extract_benchmark.py [--input result.json]
+#                                            [--repeat 5] [--limit 0]
+
+import argparse
+import html
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from lxml import html as lxml_html  # noqa: E402
+from app.scraping.extractors import EXTRACTORS, TEXT_TAGS  # noqa: E402
+
+
+def load_items(path: str) -> List[Dict[str, Any]]:
+    """
+    Read the items of a `result.json` file. Files cut while being written
+    are accepted: every complete item before the cut is returned.
+    """
+    with open(path, "r", encoding="utf8") as file:
+        content = file.read()
+
+    decoder = json.JSONDecoder()
+    items = []
+    position = content.find("[") + 1
+    while True:
+        while position < len(content) and content[position] in " \r\n\t,":
+            position += 1
+        if position >= len(content) or content[position] == "]":
+            break
+        try:
+            item, position = decoder.raw_decode(content, position)
+        except json.JSONDecodeError:
+            break
+        items.append(item)
+    return items
+
+
+def _linkify(text: str) -> str:
+    words = html.escape(text).split(" ")
+    for index in range(3, len(words), 12):
+        words[index] = f'<a href="/tag/{index}">{words[index]}</a>'
+    return " ".join(words)
+
+
+def build_page(item: Dict[str, Any]) -> bytes:
+    """
+    Rebuild an HTML page holding the content of a scraped item.
+    """
+    body = []
+    for tag in TEXT_TAGS:
+        for text in item.get(tag, []):
+            content = _linkify(text) if tag == "p" else html.escape(text)
+            body.append(f"<{tag}>{content}</{tag}>")
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(item.get("title", ""))}</title>
+<script>window.dataLayer = window.dataLayer || [];</script>
+<style>body {{ font-family: sans-serif; }}</style>
+</head>
+<body>
+<header role="banner"><nav class="menu"><ul>
+<li><a href="/">Home</a></li><li><a href="/news">News</a></li>
+<li><a href="/about">About</a></li></ul></nav></header>
+<main><article><div class="entry-content">
+{"".join(body)}
+</div></article>
+<aside class="sidebar"><h3>Related posts</h3>
+<p>Subscribe to the <a href="/newsletter">newsletter</a>.</p></aside>
+<div id="comments"><h3>Leave a Reply</h3>
+<p>Your email address will not be published.</p></div>
+</main>
+<footer><p>Copyright 2025. All rights reserved.</p></footer>
+</body>
+</html>""".encode("utf8")
+
+
+def run(pages: List[bytes], repeat: int) -> None:
+    trees = [lxml_html.document_fromstring(page) for page in pages]
+    total = len(pages) * repeat
+    size = sum(len(page) for page in pages) / 1024 / len(pages)
+    print(f"{len(pages)} pages ({size:.1f} KB on average), "
+          f"{repeat} rounds, 1 core\n")
+    print(f"{'extractor':<14}{'parse+extract':>18}{'extract only':>18}")
+
+    for name, extractor in EXTRACTORS.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for page in pages:
+                extractor(lxml_html.document_fromstring(page))
+        with_parse = total / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for tree in trees:
+                extractor(tree)
+        extract_only = total / (time.perf_counter() - start)
+
+        print(f"{name:<14}{with_parse:>12.1f} pg/s{extract_only:>12.1f} pg/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input", default="result.json")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=0,
+                        help="Only use the first N pages (0 uses them all)")
+    args = parser.parse_args()
+
+    items = load_items(args.input)
+    if args.limit:
+        items = items[:args.limit]
+    if not items:
+        sys.exit(f"No items found in {args.input}")
+
+    run([build_page(item) for item in items], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
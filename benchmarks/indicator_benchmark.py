@@ -0,0 +1,143 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: Micro-benchmark of the indicator extraction stage
+# (`app.scraping.indicators`).
+#
+# The items of `result.json` are run through the `IndicatorExtractor` (one
+# combined pattern plus the keyword automaton) and through the naive
+# approach it replaces (one regular expression per indicator kind and per
+# keyword), on a single core. The page extraction of the crawler workers is
+# timed on the same items (see `extract_benchmark.py`), so the indicator
+# stage can be compared with the rate at which a worker produces items. Both
+# are well above what a polite worker downloads: at most
+# `CRAWLER_CONCURRENT_REQUESTS / CRAWLER_DOMAIN_DELAY` pages per second, 32
+# with the default settings.
+#
+# Usage (from the repository root):
+#     python benchmarks/indicator_benchmark.py [--input result.json]
+#                                              [--repeat 5] [--limit 0]
+
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from lxml import html as lxml_html  # noqa: E402
+from extract_benchmark import build_page, load_items  # noqa: E402
+from app.scraping.extractors import get_extractor  # noqa: E402
+from app.scraping.indicators import (  # noqa: E402
+    TEXT_FIELDS,
+    IndicatorExtractor,
+    load_keywords
+)
+
+NAIVE_PATTERNS = {
+    "cve": re.compile(r"\bCVE-\d{4}-\d{4,7}\b", re.I),
+    "ipv4": re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b"),
+    "md5": re.compile(r"\b[0-9a-f]{32}\b", re.I),
+    "sha1": re.compile(r"\b[0-9a-f]{40}\b", re.I),
+    "sha256": re.compile(r"\b[0-9a-f]{64}\b", re.I),
+    "domain": re.compile(r"\b(?:[a-z0-9-]+\.)+[a-z]{2,24}\b", re.I)
+}
+
+
+def item_text(item: Dict[str, Any]) -> str:
+    return "\n".join([item.get("title", "")] + [
+        text for field in TEXT_FIELDS[1:] for text in item.get(field, [])
+    ])
+
+
+def naive_extractor(keywords: Dict[str, str]) -> Callable:
+    """
+    Build the baseline: every indicator kind and every keyword scanned with
+    its own regular expression.
+    """
+    keyword_patterns = [
+        (re.compile(rf"\b{re.escape(alias)}\b", re.I), keyword)
+        for alias, keyword in keywords.items()
+    ]
+
+    def extract(item: Dict[str, Any]) -> Dict[str, List[str]]:
+        text = item_text(item)
+        found = {kind: sorted(set(pattern.findall(text)))
+                 for kind, pattern in NAIVE_PATTERNS.items()}
+        found["keyword"] = sorted({
+            keyword for pattern, keyword in keyword_patterns
+            if pattern.search(text)
+        })
+        return found
+
+    return extract
+
+
+def timed(function: Callable, items: List[Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            function(item)
+    return len(items) * repeat / (time.perf_counter() - start)
+
+
+def run(items: List[Dict[str, Any]], repeat: int) -> None:
+    keywords = load_keywords()
+    extractor = IndicatorExtractor(keywords)
+    size = sum(len(item_text(item)) for item in items) / 1024 / len(items)
+    print(f"{len(items)} items ({size:.1f} KB of text on average), "
+          f"{len(keywords)} keywords, {repeat} rounds, 1 core\n")
+
+    pages = [build_page(item) for item in items]
+    extract_article = get_extractor()
+    crawl_rate = timed(
+        lambda page: extract_article(lxml_html.document_fromstring(page)),
+        pages, repeat
+    )
+    rates = {
+        "indicators": timed(extractor.extract, items, repeat),
+        "naive": timed(naive_extractor(keywords), items, repeat)
+    }
+
+    print(f"{'stage':<22}{'items/s':>12}{'vs. page extraction':>22}")
+    print(f"{'page extraction':<22}{crawl_rate:>12.1f}{'1.00x':>22}")
+    for name, rate in rates.items():
+        print(f"{name:<22}{rate:>12.1f}{rate / crawl_rate:>21.2f}x")
+
+    found = [extractor.extract(item) for item in items]
+    totals = {}
+    for indicators in found:
+        for kind, values in indicators.items():
+            totals[kind] = totals.get(kind, 0) + len(values)
+    print("\nIndicators found:", ", ".join(
+        f"{kind}={count}" for kind, count in sorted(totals.items())
+    ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input", default="result.json")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=0,
+                        help="Only use the first N items (0 uses them all)")
+    args = parser.parse_args()
+
+    items = load_items(args.input)
+    if args.limit:
+        items = items[:args.limit]
+    if not items:
+        sys.exit(f"No items found in {args.input}")
+
+    run(items, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: Local synthetic web used by the crawl benchmark
+# (`crawl_benchmark.py`).
+#
+# Every site has a home page advertising its feed with a <link> tag, an RSS
+# 2.0 (even sites) or Atom (odd sites) feed listing its articles, and the
+# article pages, rebuilt like in `extract_benchmark.py` from deterministic
+# text holding CVE ids, addresses, hashes, domains and vendor names.
+#
+# The crawlers limit their requests per host, so the sites are spread over
+# several loopback addresses (127.0.0.1, 127.0.0.2, ...), all listening on
+# the same port and served by a few processes. Linux routes the whole
+# 127.0.0.0/8 block to the loopback interface; other systems need the extra
+# addresses to be configured first.
+#
+# Every answer is delayed by a random latency and fails with a 500 at a
+# configurable rate. The random draws only depend on the seed, the path and
+# the number of previous requests to it, so two runs with the same settings
+# serve the same web. Articles and feeds are sent with an ETag and answer
+# 304 to a matching If-None-Match.
+
+import random
+import socket
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from extract_benchmark import build_page
+
+WORDS = (
+    "attackers", "exploited", "vulnerability", "remote", "code", "execution",
+    "patch", "firmware", "industrial", "controller", "network", "operators",
+    "ransomware", "campaign", "phishing", "credentials", "advisory",
+    "researchers", "disclosed", "affected", "versions", "update", "systems",
+    "malware", "loader", "payload", "infrastructure", "command", "server",
+    "threat", "actor", "group", "targeted", "energy", "sector", "utilities",
+    "the", "a", "of", "and", "to", "in", "that", "with", "for", "on", "was",
+    "by", "after", "before", "while", "their", "this", "which", "were"
+)
+
+VENDORS = (
+    "Siemens", "Schneider Electric", "Rockwell Automation", "Fortinet",
+    "Cisco", "Microsoft", "Ivanti", "Palo Alto Networks", "VMware", "Citrix"
+)
+
+FEED_DATE = "Sat, 18 Oct 2026 12:00:00 GMT"
+
+ATOM_DATE = "2026-10-18T12:00:00Z"
+
+
+class SyntheticWeb:
+    """
+    Shape of the synthetic web and the URLs of its pages.
+    """
+
+    def __init__(
+        self,
+        sites: int = 200,
+        articles: int = 20,
+        hosts: int = 16,
+        port: int = 0,
+        latency: float = 0.02,
+        jitter: float = 0.01,
+        error_rate: float = 0.01,
+        paragraphs: int = 8,
+        seed: int = 1
+    ):
+        """
+        Args:
+            sites (int): Number of sites, each with a home page and a feed.
+            articles (int): Number of articles of every site.
+            hosts (int): Number of loopback addresses the sites are spread
+            over.
+            port (int): Port of the servers, 0 picks a free one on start.
+            latency (float): Mean latency of an answer, in seconds.
+            jitter (float): Standard deviation of the latency, in seconds.
+            error_rate (float): Share of the requests answered with a 500.
+            paragraphs (int): Number of paragraphs of every article.
+            seed (int): Seed of every random draw.
+        """
+        self.sites = sites
+        self.articles = articles
+        self.hosts = max(1, min(hosts, 254))
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.paragraphs = paragraphs
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @property
+    def addresses(self) -> List[str]:
+        return [f"127.0.0.{index + 1}" for index in range(self.hosts)]
+
+    def site_url(self, site: int) -> str:
+        host = self.addresses[site % self.hosts]
+        return f"http://{host}:{self.port}/site/{site}/"
+
+    def home_urls(self) -> List[str]:
+        return [self.site_url(site) for site in range(self.sites)]
+
+    def feed_urls(self) -> List[str]:
+        return [self.site_url(site) + "feed.xml" for site in range(self.sites)]
+
+    def article_urls(self) -> List[str]:
+        # Sites interleaved, like the entries of several feeds
+        return [
+            self.site_url(site) + f"article/{article}"
+            for article in range(self.articles)
+            for site in range(self.sites)
+        ]
+
+
+def _rng(*key: Any) -> random.Random:
+    return random.Random(zlib.crc32(repr(key).encode("utf8")))
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _indicator(rng: random.Random, site: int) -> str:
+    kind = rng.randrange(5)
+    if kind == 0:
+        return f"CVE-2026-{rng.randrange(1000, 60000)}"
+    if kind == 1:
+        return ".".join(str(rng.randrange(1, 255)) for _ in range(4))
+    if kind == 2:
+        return f"{rng.getrandbits(256):064x}"
+    if kind == 3:
+        return f"update{rng.randrange(100)}.site{site}-cdn[.]com"
+    return rng.choice(VENDORS)
+
+
+def article_item(web: SyntheticWeb, site: int, article: int) -> Dict:
+    """
+    Content of an article, in the shape of a scraped item.
+    """
+    rng = _rng(web.seed, site, article)
+    paragraphs = []
+    for _ in range(web.paragraphs):
+        sentences = [_sentence(rng, rng.randrange(8, 20))
+                     for _ in range(rng.randrange(3, 7))]
+        sentences.insert(
+            rng.randrange(len(sentences)),
+            f"Analysts linked it to {_indicator(rng, site)}."
+        )
+        paragraphs.append(" ".join(sentences))
+    return {
+        "title": f"Site {site} article {article}: {_sentence(rng, 6)}",
+        "h1": [_sentence(rng, 6)],
+        "h2": [_sentence(rng, 4) for _ in range(2)],
+        "p": paragraphs
+    }
+
+
+def _feed_type(site: int) -> str:
+    return "application/atom+xml" if site % 2 else "application/rss+xml"
+
+
+def home_page(web: SyntheticWeb, site: int) -> bytes:
+    links = "".join(
+        f'<li><a href="article/{article}">Article {article}</a></li>'
+        for article in range(web.articles)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Site {site}</title>
+<link rel="alternate" type="{_feed_type(site)}" title="Site {site}"
+      href="feed.xml">
+<link rel="stylesheet" type="text/css" href="/style.css">
+</head>
+<body><main><h1>Site {site}</h1><ul>{links}</ul></main></body>
+</html>""".encode("utf8")
+
+
+def feed(web: SyntheticWeb, site: int) -> bytes:
+    url = web.site_url(site)
+    titles = [
+        escape(article_item(web, site, article)["title"])
+        for article in range(web.articles)
+    ]
+    if site % 2:
+        entries = "".join(f"""
+<entry><title>{title}</title>
+<link href="{url}article/{article}"/>
+<id>{url}article/{article}</id><updated>{ATOM_DATE}</updated></entry>"""
+            for article, title in enumerate(titles))
+        return f"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<title>Site {site}</title><link href="{url}"/>
+<id>{url}</id><updated>{ATOM_DATE}</updated>{entries}
+</feed>""".encode("utf8")
+
+    items = "".join(f"""
+<item><title>{title}</title><link>{url}article/{article}</link>
+<guid>{url}article/{article}</guid><pubDate>{FEED_DATE}</pubDate></item>"""
+        for article, title in enumerate(titles))
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel>
+<title>Site {site}</title><link>{url}</link>
+<description>Synthetic site {site}</description>{items}
+</channel></rss>""".encode("utf8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like real servers
+    web: SyntheticWeb
+    requests: Dict[str, int]
+    lock: threading.Lock
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        with self.lock:
+            attempt = self.requests[path] = self.requests.get(path, 0) + 1
+        rng = _rng(self.web.seed, path, attempt)
+        time.sleep(max(0.0, rng.gauss(self.web.latency, self.web.jitter)))
+
+        if path == "/robots.txt":
+            return self.answer(200, "text/plain", b"User-agent: *\nAllow: /\n")
+        if rng.random() < self.web.error_rate:
+            return self.answer(500, "text/plain", b"Internal Server Error")
+
+        page = _page(self.web, path)
+        if page is None:
+            return self.answer(404, "text/plain", b"Not Found")
+        content_type, body, etag = page
+        if etag and self.headers.get("If-None-Match") == etag:
+            return self.answer(304, None, b"", etag)
+        self.answer(200, content_type, body, etag)
+
+    def answer(self, status: int, content_type: Optional[str], body: bytes,
+               etag: Optional[str] = None) -> None:
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", FEED_DATE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+
+@lru_cache(maxsize=None)
+def _page(web: SyntheticWeb, path: str) -> Optional[Tuple[str, bytes, str]]:
+    parts = path.strip("/").split("/")
+    if len(parts) < 2 or parts[0] != "site" or not parts[1].isdigit():
+        return None
+    site = int(parts[1])
+    if site >= web.sites:
+        return None
+
+    if len(parts) == 2:
+        return "text/html; charset=utf-8", home_page(web, site), ""
+    if parts[2:] == ["feed.xml"]:
+        body = feed(web, site)
+        content_type = _feed_type(site)
+    elif (len(parts) == 4 and parts[2] == "article" and parts[3].isdigit()
+          and int(parts[3]) < web.articles):
+        body = build_page(article_item(web, site, int(parts[3])))
+        content_type = "text/html; charset=utf-8"
+    else:
+        return None
+    return content_type, body, f'"{zlib.crc32(body):08x}"'
+
+
+def _serve(servers: List[ThreadingHTTPServer]) -> None:
+    threads = [
+        threading.Thread(target=server.serve_forever, daemon=True)
+        for server in servers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class SyntheticWebServer:
+    """
+    Serves a `SyntheticWeb` from background processes, as a context
+    manager.
+    """
+
+    def __init__(self, web: SyntheticWeb, processes: int = 4):
+        self.web = web
+        self.processes = max(1, min(processes, web.hosts))
+        self._workers = []
+
+    def _bind(self) -> List[ThreadingHTTPServer]:
+        if not self.web.port:
+            with socket.socket() as probe:
+                probe.bind((self.web.addresses[0], 0))
+                self.web.port = probe.getsockname()[1]
+
+        handler = type("Handler", (_Handler,), {
+            "web": self.web, "requests": {}, "lock": threading.Lock()
+        })
+        servers = []
+        for address in self.web.addresses:
+            server = ThreadingHTTPServer(
+                (address, self.web.port), handler, bind_and_activate=False
+            )
+            server.daemon_threads = True
+            server.request_queue_size = 1024
+            server.server_bind()
+            server.server_activate()
+            servers.append(server)
+        return servers
+
+    def start(self) -> "SyntheticWebServer":
+        # The sockets are bound before forking, so the servers accept
+        # connections as soon as `start` returns
+        servers = self._bind()
+        context = get_context("fork")
+        for index in range(self.processes):
+            worker = context.Process(
+                target=_serve, args=(servers[index::self.processes],),
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        for server in servers:
+            server.socket.close()
+        return self
+
+    def stop(self) -> None:
+        for worker in self._workers:
+            worker.terminate()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def __enter__(self) -> "SyntheticWebServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,76 @@
+# @ Author: Antonio Llorente. Aitea Tech Becarios
+
+# <antoniollorentecuenca@gmail.com>
+
+# @ Project: Cebolla
+
+# @ Create Time: 2026-10-18 10:30:50
+
+# @ Modified time: 2026-10-18 10:30:50
+
+# @ Description: This FastAPI router exposes the metrics of the application
+# (see `app.utils.metrics`) at `/metrics` in the Prometheus text exposition
+# format: pages fetched and failed and bytes downloaded per host, latency of
+# the crawl stages, crawler worker processes and the state of the database
+# connection pools. `/metrics/db-pools` sums up the acquisition statistics of
+# every pool, to tell when one is undersized.
+
+from typing import Any, Dict, List
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from app.utils.metrics import REGISTRY, collect
+
+router = APIRouter(tags=["Metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _db_pools(request: Request) -> List:
+    state = request.app.state
+    return [
+        getattr(state, name) for name in ("api_pool", "pool")
+        if hasattr(state, name)
+    ]
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """
+    Endpoint to scrape the metrics of the API and its crawler workers.
+
+    The gauges of the database pools and the crawler pool are read when the
+    endpoint is called; counters and histograms of the crawler workers are
+    merged as their batches finish.
+
+    Args:
+        request (Request): The incoming HTTP request object, with access to
+                            the app's state (DB pools and crawlers).
+
+    Returns:
+        PlainTextResponse: The metrics in the Prometheus text format.
+    """
+    collect(
+        _db_pools(request),
+        getattr(request.app.state, "crawlers", None)
+    )
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@router.get("/metrics/db-pools")
+async def get_db_pool_stats(request: Request) -> List[Dict[str, Any]]:
+    """
+    Endpoint to check the sizing of the database connection pools.
+
+    For every pool ("api" and "batch"): its open, idle and in-use
+    connections, the callers waiting for one, the number of acquisitions
+    and those that timed out, the average and longest wait, and the
+    average time a connection is held. Waits that are not close to zero, or
+    timeouts, mean that the pool needs more connections.
+
+    Args:
+        request (Request): The incoming HTTP request object.
+
+    Returns:
+        List[Dict[str, Any]]: The statistics of every pool.
+    """
+    return [pool.stats() for pool in _db_pools(request)]
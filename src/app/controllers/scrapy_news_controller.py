@@ -10,48 +10,82 @@
 
 # @ Description:This FastAPI router exposes endpoints for triggering a
 # dynamic spider to scrape news articles from URLs stored in a PostgreSQL
-# database and for retrieving the `result.json` file generated by the
-# scraping process.The scraping operation is asynchronous, and upon completion,
-# a success# message is returned. If any error occurs during scraping, a
-# 500 error with a failure message is raised. Additionally, the router
-# provides access to the `result.json` file, which contains the scraped data.
-# If the file is not found, a 404 error is raised.
-
-import os
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import FileResponse
-from app.scraping.spider_factory import run_dynamic_spider_from_db
+# database and for reading the items stored by the scraping process.
+# The scraping operation runs as a background job: the
+# request returns a job ID at once, and the `/jobs` endpoints report the
+# job status and progress or cancel it. Additionally, the router
+# provides paged access to the scraped data kept in the append-only result
+# store (`/results`), and streams the whole corpus as `result.json`.
+# If nothing has been scraped yet, a 404 error is raised. `/stream` pushes
+# the items of the running crawl jobs to the client as they are scraped, as
+# NDJSON or Server-Sent Events. `/search` runs a
+# ranked full-text search over the articles stored in PostgreSQL, and
+# `/domains` reports the per-host politeness state of the crawler workers.
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+from fastapi import APIRouter, Request, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel
+from app.models.articles_db import (
+    SEARCH_MAX_CANDIDATES,
+    ArticleSearchPage,
+    search_articles
+)
+from app.scraping.broadcast import STREAM_KEEPALIVE
+from app.scraping.jobs import CrawlJobResponse
 from loguru import logger
 
 router = APIRouter(prefix="/newsSpider", tags=["News spider"])
 
+class ResultPage(BaseModel):
+    """
+    Pydantic model for a page of scraped items and the next page's cursor.
+    """
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
 @router.get("/scrape-news")
-async def scrape_news_articles(request: Request) -> dict [str,str]:
+async def scrape_news_articles(
+    request: Request,
+    full: bool = Query(False)
+) -> dict [str,str]:
     """
     Endpoint to start the news scraping process using the dynamic spider.
 
     This function:
-    - Acquires a PostgreSQL connection pool.
-    - Executes the dynamic spider to scrape news from URLs in the DB.
-    - Returns a success message or an error message if scraping fails.
+    - Starts a background crawl job on the app's crawler pool, using its
+      PostgreSQL connection pool. Only entries that are new since the last run, or due for a
+      refresh, are scraped unless a full re-crawl is requested.
+    - Returns the job ID immediately; progress is available through
+      `GET /newsSpider/jobs/{job_id}`.
 
     Args:
         request (Request): The incoming HTTP request object, with access to
-                            the app's state (DB connection pool).
+                            the app's state (DB pool, crawlers and jobs).
+        full (bool): Ignore the crawl watermark and re-crawl every entry.
 
     Returns:
-        dict: A dictionary with the operation status, indicating success or
-              failure.
+        dict: A dictionary with the operation status and the job ID.
 
     Raises:
-        HTTPException: If an error occurs during scraping, a 500 status code
-                       exception is raised.
+        HTTPException: 409 if a crawl job is already running, or 500 if the
+                       job could not be started.
     """
 
     try:
         pool = request.app.state.pool
-        await run_dynamic_spider_from_db(pool)
-        return {"status": "✅ News successfully processed"}
+        crawlers = request.app.state.crawlers
+        store = request.app.state.results
+        job = request.app.state.jobs.start(
+            pool, crawlers, store, force_full=full
+        )
+        return {"status": "🚀 News scraping started", "job_id": job.job_id}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Scraping failed: {e}")
         raise HTTPException(
@@ -59,24 +93,248 @@ async def scrape_news_articles(request: Request) -> dict [str,str]:
             detail=f"Scraping failed: {str(e)}"
         )
 
-@router.get("/result.json")
-async def get_result_json():
+@router.get("/jobs", response_model=List[CrawlJobResponse])
+async def list_jobs(request: Request) -> List[CrawlJobResponse]:
+    """
+    Endpoint to list the running and recently finished crawl jobs.
+
+    Args:
+        request (Request): The incoming HTTP request object.
+
+    Returns:
+        List[CrawlJobResponse]: Status and progress of every known job.
+    """
+    return [job.to_response() for job in request.app.state.jobs.list()]
+
+@router.get("/jobs/{job_id}", response_model=CrawlJobResponse)
+async def get_job(request: Request, job_id: str) -> CrawlJobResponse:
+    """
+    Endpoint to poll the status and progress of a crawl job.
+
+    Args:
+        request (Request): The incoming HTTP request object.
+        job_id (str): Identifier returned by `/scrape-news`.
+
+    Returns:
+        CrawlJobResponse: Status, pages done/failed and throughput.
+
+    Raises:
+        HTTPException: If the job does not exist, a 404 status code is raised.
     """
-    Endpoint to retrieve the result.json file.
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_response()
 
-    This function attempts to return the `result.json` file from the server's
-    file system. If the file is not found, it raises a 404 error.
+@router.delete("/jobs/{job_id}", response_model=CrawlJobResponse)
+async def cancel_job(request: Request, job_id: str) -> CrawlJobResponse:
+    """
+    Endpoint to cancel a crawl job and stop its crawler workers.
+
+    Args:
+        request (Request): The incoming HTTP request object.
+        job_id (str): Identifier returned by `/scrape-news`.
 
     Returns:
-        FileResponse: The `result.json` file if it exists.
+        CrawlJobResponse: The final state of the cancelled job.
 
     Raises:
-        HTTPException: If the `result.json` file does not exist, a 404 status
-                       code is raised.
+        HTTPException: If the job does not exist, a 404 status code is raised.
+    """
+    job = await request.app.state.jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    logger.info("Crawl job {} cancelled on request", job_id)
+    return job.to_response()
+
+@router.get("/domains")
+async def list_domains(
+    request: Request,
+    limit: int = Query(100, ge=1, le=10000)
+) -> List[Dict[str, Any]]:
+    """
+    Endpoint to inspect the per-host politeness state of the crawlers:
+    current delay, robots.txt crawl delay, Retry-After backoff, average
+    latency and the number of requests, throttled answers and errors.
+
+    Args:
+        request (Request): Incoming HTTP request object.
+        limit (int): Maximum number of hosts to return, most requested first.
+
+    Returns:
+        List[Dict[str, Any]]: The state of every host.
     """
-    file_path = "result.json"
+    return request.app.state.crawlers.domain_stats()[:limit]
 
-    if not os.path.exists(file_path):
+@router.get("/search", response_model=ArticleSearchPage)
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, lt=SEARCH_MAX_CANDIDATES)
+) -> ArticleSearchPage:
+    """
+    Endpoint to search the scraped articles.
+
+    Supports the web search syntax: `"quoted phrases"`, `or` and `-word` to
+    exclude a term. Results are ranked by relevance, with the title
+    weighted above the headers and the body, and include a highlighted
+    snippet. Only the newest matches of very common terms are ranked.
+
+    Args:
+        request (Request): The incoming HTTP request object.
+        q (str): The search terms.
+        limit (int): Maximum number of articles per page.
+        offset (int): Pass the returned `next_offset` to get the next page.
+
+    Returns:
+        ArticleSearchPage: The matching articles and the next page's offset.
+
+    Raises:
+        HTTPException: If the search fails, a 500 status code is raised.
+    """
+    try:
+        async with request.app.state.api_pool.acquire() as conn:
+            return await search_articles(conn, q, limit, offset)
+    except Exception as e:
+        logger.error(f"Article search failed: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Article search failed: {str(e)}"
+        )
+
+@router.get("/results", response_model=ResultPage)
+async def get_results(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    url: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> ResultPage:
+    """
+    Endpoint to page through the scraped items.
+
+    Items are read from the committed part of the result store, so pages
+    are consistent while a crawl is running. Pass the returned
+    `next_cursor` as `cursor` to get the following page.
+
+    Args:
+        request (Request): The incoming HTTP request object.
+        cursor (str, optional): Cursor returned by the previous page.
+        limit (int): Maximum number of items per page.
+        url (str, optional): Only return items scraped from this URL.
+        since (datetime, optional): Only items fetched at or after this time.
+        until (datetime, optional): Only items fetched at or before this time.
+
+    Returns:
+        ResultPage: The items and the cursor of the next page, if any.
+
+    Raises:
+        HTTPException: If the cursor is malformed, a 400 status code is
+                       raised.
+    """
+    store = request.app.state.results
+    try:
+        items, next_cursor = await asyncio.to_thread(
+            store.read,
+            cursor,
+            limit,
+            url,
+            since.timestamp() if since else None,
+            until.timestamp() if until else None
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return ResultPage(items=items, next_cursor=next_cursor)
+
+@router.get("/result.json")
+async def get_result_json(request: Request):
+    """
+    Endpoint to retrieve every scraped item as a JSON array.
+
+    The array is streamed from the result store one item at a time, so the
+    whole corpus is never held in memory.
+
+    Returns:
+        StreamingResponse: The scraped items as a JSON array.
+
+    Raises:
+        HTTPException: If nothing has been scraped yet, a 404 status code is
+                       raised.
+    """
+    store = request.app.state.results
+    if not store.load_manifest()["segments"]:
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(file_path, media_type='application/json')
\ No newline at end of file
+    def stream() -> Iterator[str]:
+        yield "["
+        for index, item in enumerate(store.iter_items()):
+            yield ("," if index else "") + "\n" + json.dumps(
+                item, ensure_ascii=False
+            )
+        yield "\n]"
+
+    return StreamingResponse(stream(), media_type='application/json')
+
+@router.get("/stream")
+async def stream_results(
+    request: Request,
+    stream_format: str = Query("ndjson", alias="format",
+                               pattern="^(ndjson|sse)$")
+) -> StreamingResponse:
+    """
+    Endpoint to receive the items of the running crawl jobs as they are
+    scraped.
+
+    Only the items scraped after the subscription are sent, one JSON object
+    per line (`format=ndjson`) or per `data:` event (`format=sse`, also used
+    when the client accepts `text/event-stream`). A client reading slower
+    than the crawl loses the oldest items of its buffer instead of slowing
+    the crawler down; the number of items lost is sent before the next item,
+    as a `{"dropped": n}` line or a `dropped` event. Idle event streams
+    receive a keep-alive comment every few seconds. The stream ends when the
+    application stops.
+
+    Args:
+        request (Request): The incoming HTTP request object.
+        stream_format (str): "ndjson" or "sse".
+
+    Returns:
+        StreamingResponse: The live stream of scraped items.
+
+    Raises:
+        HTTPException: If too many clients are already subscribed, a 503
+                       status code is raised.
+    """
+    sse = (stream_format == "sse"
+           or "text/event-stream" in request.headers.get("accept", ""))
+    channel = request.app.state.stream
+    try:
+        subscription = channel.subscribe()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def stream():
+        with subscription:
+            while not subscription.finished:
+                message, dropped = await subscription.get(STREAM_KEEPALIVE)
+                if dropped:
+                    notice = json.dumps({"dropped": dropped})
+                    yield (f"event: dropped\ndata: {notice}\n\n" if sse
+                           else notice + "\n")
+                if message is not None:
+                    yield f"data: {message}\n\n" if sse else message + "\n"
+                elif await request.is_disconnected():
+                    return
+                elif sse and not dropped:
+                    yield ": keep-alive\n\n"
+
+    # The generator never runs if the client leaves before the first item,
+    # the slot is freed once the response ends anyway
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(channel.unsubscribe, subscription)
+    )
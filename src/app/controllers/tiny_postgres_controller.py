@@ -14,26 +14,42 @@
 # 1. `POST /feeds`: Accepts an RSS feed URL, parses its content using the
 # feedparser library, and inserts its metadata (e.g., title, feed URL, and
 # site URL) into the PostgreSQL database.
+# 1b. `POST /feeds/bulk`: Inserts a batch of feeds in a few round trips,
+# skipping duplicates and returning the outcome of every feed.
 # 2. `GET /search-and-insert-rss`: Reads a list of URLs from a file and
 # processes them to extract and save RSS feed metadata into the database.
-# 3. `GET /feeds`: Retrieves a list of RSS feeds stored in the PostgreSQL
-# database, with an optional limit on the number of results.
+# 3. `GET /feeds`: Retrieves a page of the RSS feeds stored in the PostgreSQL
+# database, ordered by id, with a cursor to request the next page.
+# 3b. `GET /feeds/export`: Streams every stored feed as NDJSON.
+# 3c. `GET /feeds/schedule`: Lists the polling schedule learned for every
+# feed by the feed scheduler, next due first.
+# 4. `GET /cache-stats`: Reports the hit rate of the in-process lookup caches.
 # This module is designed to handle the creation, search, and insertion of
 # RSS feeds and their metadata in a structured way, using asynchronous
 # database interactions.
 
 from fastapi import APIRouter, Request, HTTPException
-from app.scraping.sipder_rss import extract_rss_and_save
+from app.scraping.sipder_rss import extract_rss_and_save, store_feed_validators
+from app.scraping.http_cache import ValidatorStore
 from fastapi import APIRouter, Request, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from typing import List
 from pydantic import HttpUrl
 from loguru import logger
+import asyncio
 import feedparser
+import json
+from app.models.cache import cache_stats, feed_page_cache, feed_url_cache
+from app.models.feed_schedule_db import FeedSchedule, get_feed_schedules
 from app.models.ttrss_postgre_db import (
     FeedCreateRequest,
+    FeedInsertResult,
+    FeedPage,
     FeedResponse,
     get_feeds_from_db,
-    insert_feed_to_db
+    iter_feeds,
+    insert_feed_to_db,
+    insert_feeds_bulk
 )
 
 # Router configuration
@@ -48,6 +64,18 @@ router = APIRouter(
     },
 )
 
+def save_feed_validators(feed_url: str, feed) -> None:
+    """
+    Store the ETag/Last-Modified validators of a parsed feed. Blocking, run
+    it off the event loop.
+    """
+    validators = ValidatorStore()
+    try:
+        store_feed_validators(feed_url, feed, validators)
+    finally:
+        validators.close()
+
+
 @router.post("/feeds", response_model=FeedResponse)
 async def enter_feed(
     request: Request,
@@ -61,7 +89,10 @@ async def enter_feed(
 
     If the feed is successfully parsed and the entries are found,
     the feed's metadata is saved to the database, and the response contains
-    the newly created feed's data.
+    the newly created feed's data. The feed's ETag/Last-Modified validators
+    are stored so later discovery runs can fetch it conditionally. Feeds
+    found in `feed_url_cache` are returned as stored, without being fetched
+    or inserted again.
 
     Args:
         request (Request): Incoming HTTP request object.
@@ -74,8 +105,14 @@ async def enter_feed(
 
     try:
         feed_url_str = str(feed_url)
+        owner_uid = 1  # Default user ID
+
+        known = feed_url_cache.get((feed_url_str, owner_uid))
+        if known is not None:
+            logger.info("Feed already stored with ID {}", known['id'])
+            return FeedResponse(**known)
 
-        feed = feedparser.parse(feed_url_str)
+        feed = await asyncio.to_thread(feedparser.parse, feed_url_str)
 
         if not feed.entries:
             logger.warning("No entries found in feed: {}", feed_url_str)
@@ -89,7 +126,6 @@ async def enter_feed(
 
         logger.debug("Parsed feed title: '{}', site URL: '{}'", title, site_url)
 
-        owner_uid = 1  # Default user ID
         cat_id = 0     # Default category ID (will be assigned in DB logic)
 
         feed_data = FeedCreateRequest(
@@ -100,17 +136,15 @@ async def enter_feed(
             cat_id=cat_id
         )
 
-        async with request.app.state.pool.acquire() as conn:
+        async with request.app.state.api_pool.acquire() as conn:
             logger.info("Inserting feed into database.")
-            await insert_feed_to_db(conn, feed_data)
-
-            new_feed = await conn.fetchrow(
-                "SELECT * FROM ttrss_feeds WHERE feed_url = $1",
-                feed_url_str
-            )
+            new_feed = await insert_feed_to_db(conn, feed_data)
 
         logger.success("Feed successfully inserted with ID {}", new_feed['id'])
 
+        # Later discovery runs can then skip this feed while it is unchanged
+        await asyncio.to_thread(save_feed_validators, feed_url_str, feed)
+
         response_feed = FeedResponse(
             id=new_feed['id'],
             title=new_feed['title'],
@@ -130,63 +164,170 @@ async def enter_feed(
         )
 
 
+@router.post("/feeds/bulk", response_model=List[FeedInsertResult])
+async def enter_feeds_bulk(
+    request: Request,
+    feeds: List[FeedCreateRequest]
+) -> List[FeedInsertResult]:
+    """
+    Insert a batch of feeds into the database.
+
+    The feeds are written with a bulk insert; feeds already stored, or
+    repeated in the batch, are skipped and reported as duplicates.
+
+    Args:
+        request (Request): Incoming HTTP request object.
+        feeds (List[FeedCreateRequest]): The feeds to insert.
+
+    Returns:
+        List[FeedInsertResult]: The outcome of every feed, in input order.
+    """
+    logger.info("Bulk inserting {} feeds.", len(feeds))
+
+    async with request.app.state.api_pool.acquire() as conn:
+        results = await insert_feeds_bulk(conn, feeds)
+
+    inserted = sum(1 for result in results if result.status == "inserted")
+    logger.success("Bulk insert finished: {} of {} inserted.",
+                   inserted, len(results))
+    return results
+
+
 @router.get("/search-and-insert-rss")
-async def search_and_insert_rss(request: Request) -> dict[str, str]:
+async def search_and_insert_rss(
+    request: Request,
+    refresh: bool = Query(False)
+) -> dict[str, str]:
     """
     Reads URLs from a file, processes them to extract RSS feeds, and stores
     the feed metadata into the PostgreSQL database.
 
     This endpoint triggers the process to read URLs from a predefined file,
     attempts to extract RSS feed links, and saves the feed metadata into the
-    PostgreSQL database.
+    PostgreSQL database. The feeds of the domains checked recently are taken
+    from the discovery cache unless `refresh` is set.
 
     Args:
         request (Request): The incoming HTTP request object.
+        refresh (bool): Crawl every website again, ignoring the cache.
 
     Returns:
         dict: A success message indicating that the feeds were processed.
     """
     pool = request.app.state.pool
+    crawlers = request.app.state.crawlers
     file_path = "src/app/static/docs/urls_ciberseguridad_ot_it.txt"
-    await extract_rss_and_save(pool, file_path)
+    await extract_rss_and_save(pool, file_path, crawlers, refresh)
     return {"status": "✅ Feeds successfully processed"}
 
 
 
 
-@router.get("/feeds", response_model=List[FeedResponse])
+@router.get("/feeds", response_model=FeedPage)
 async def list_feeds(
     request: Request,
-    limit: int = Query(10, ge=1, le=100)
-) -> List[FeedResponse]:
+    limit: int = Query(10, ge=1, le=1000),
+    after: int = Query(0, ge=0)
+) -> Response:
     """
-    Retrieve a list of RSS feeds from the PostgreSQL database.
+    Retrieve a page of RSS feeds from the PostgreSQL database.
 
-    This endpoint retrieves up to a specified number of RSS feeds from the
-    PostgreSQL database. The maximum number of feeds returned can be controlled
-    via the `limit` query parameter.
+    Feeds are ordered by id. The `next_cursor` of a page is passed as
+    `after` to fetch the following one. Pages are cached for a few seconds,
+    and the cache is cleared whenever feeds are inserted.
 
     Args:
         request (Request): Incoming HTTP request object.
         limit (int): The number of feed records to return (default is 10).
+        after (int): Return the feeds following this cursor.
+
+    Returns:
+        Response: The FeedPage serialized as JSON.
+    """
+    logger.info("Fetching up to {} feeds after id {}.", limit, after)
+
+    body = feed_page_cache.get((after, limit))
+    if body is None:
+        try:
+            async with request.app.state.api_pool.acquire() as conn:
+                feeds, next_cursor = await get_feeds_from_db(
+                    conn, limit, after
+                )
+        except Exception as e:
+            logger.error("Error fetching feeds: {}", str(e))
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error retrieving feeds: {str(e)}"
+            )
+        logger.success("Successfully fetched {} feeds.", len(feeds))
+        body = json.dumps(
+            {"items": feeds, "next_cursor": next_cursor},
+            ensure_ascii=False
+        ).encode("utf8")
+        feed_page_cache.set((after, limit), body)
+
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/feeds/export")
+async def export_feeds(request: Request) -> StreamingResponse:
+    """
+    Stream every stored feed as newline-delimited JSON, ordered by id.
+
+    Rows are read through a server-side cursor and written as they arrive,
+    so the export never holds the whole table in memory.
+
+    Args:
+        request (Request): Incoming HTTP request object.
 
     Returns:
-        List[FeedResponse]: A list of RSS feed metadata in JSON format.
+        StreamingResponse: One JSON feed object per line.
     """
-    logger.info("Fetching up to {} feeds from database.", limit)
+    pool = request.app.state.pool
+
+    async def stream():
+        async with pool.acquire() as conn:
+            async for feed in iter_feeds(conn):
+                yield json.dumps(feed, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
+
+@router.get("/feeds/schedule", response_model=List[FeedSchedule])
+async def list_feed_schedules(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+) -> List[FeedSchedule]:
+    """
+    Retrieve the polling schedule of the stored feeds, next due first.
+
+    Args:
+        request (Request): Incoming HTTP request object.
+        limit (int): The number of schedules to return (default is 100).
+        offset (int): The number of schedules to skip.
+
+    Returns:
+        List[FeedSchedule]: The learned interval, next poll time and poll
+        counters of every feed.
+    """
     try:
-        async with request.app.state.pool.acquire() as conn:
-            feeds = await get_feeds_from_db(conn, limit)
-            logger.success("Successfully fetched {} feeds.", len(feeds))
-            return feeds
+        async with request.app.state.api_pool.acquire() as conn:
+            return await get_feed_schedules(conn, limit, offset)
     except Exception as e:
-        logger.error("Error fetching feeds: {}", str(e))
+        logger.error("Error fetching feed schedules: {}", str(e))
         raise HTTPException(
             status_code=500,
-            detail=f"Error retrieving feeds: {str(e)}"
+            detail=f"Error retrieving feed schedules: {str(e)}"
         )
 
 
+@router.get("/cache-stats")
+async def get_cache_stats() -> List[dict]:
+    """
+    Report the size and hit rate of the in-process lookup caches.
 
-
+    Returns:
+        List[dict]: Hits, misses, evictions and hit rate of every cache.
+    """
+    return cache_stats()
@@ -3,11 +3,221 @@
 
 # @ Create Time: 2025-05-5 12:17:59
 
-# @ Modified time: 2025-05-5 12:17:59
+# @ Modified time: 2026-10-18 12:17:59
 
 # @ Project: Cebolla
 
-# @ Description: Main entry point for running the application in a development
-# environment.
+# @ Description: Connection settings and pools of the PostgreSQL database
+# shared by the API and the crawl task workers.
 #
-# This script cointeins the methots to save de information in opensearch
\ No newline at end of file
+# The settings default to the development database exposed by the Tiny Tiny
+# RSS container and can be overridden with `POSTGRES_*` environment variables,
+# so workers on other machines can reach the same database.
+#
+# The API opens two pools, so short request queries never queue behind
+# long-running work:
+#
+# - "api": the queries of the HTTP endpoints (feed pages, search, inserts),
+#   with a command timeout;
+# - "batch": the crawl jobs, the feed discovery and the exports, which may
+#   hold a connection for a long time.
+#
+# Every pool is wrapped in a `MeteredPool`, which records the time callers
+# wait for a connection, how long they keep it and the acquisitions that
+# timed out (`db_pool_*` metrics, labelled by pool). Waits that are not close
+# to zero, or timeouts, mean that the pool is undersized.
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+import asyncpg
+from app.utils.metrics import (
+    DB_ACQUIRE_SECONDS,
+    DB_ACQUIRE_TIMEOUTS,
+    DB_CHECKOUT_SECONDS
+)
+
+
+def _seconds(name: str, default: str = "") -> Optional[float]:
+    # Empty values disable the timeout
+    value = os.getenv(name, default)
+    return float(value) if value else None
+
+
+DB_SETTINGS = {
+    "user": os.getenv("POSTGRES_USER", "postgres"),
+    "password": os.getenv("POSTGRES_PASSWORD", "password123"),
+    "database": os.getenv("POSTGRES_DB", "postgres"),
+    # ONLY DEVELOPER, PORT EXPOSED DB TINY POSTGRES
+    "host": os.getenv("POSTGRES_HOST", "127.0.0.1"),
+    "port": int(os.getenv("POSTGRES_PORT", "5432")),
+}
+
+# Settings shared by every pool. The statement cache must be disabled (0)
+# behind a pgbouncer in transaction pooling mode.
+POOL_SETTINGS = {
+    # Seconds to wait for a new connection to be established
+    "timeout": _seconds("POSTGRES_CONNECT_TIMEOUT", "10"),
+    "statement_cache_size": int(
+        os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "100")
+    ),
+    "max_cached_statement_lifetime": int(
+        os.getenv("POSTGRES_MAX_CACHED_STATEMENT_LIFETIME", "300")
+    ),
+    # Queries served by a connection before it is replaced
+    "max_queries": int(os.getenv("POSTGRES_MAX_QUERIES", "50000")),
+    # Seconds an idle connection above `min_size` is kept open
+    "max_inactive_connection_lifetime": float(
+        os.getenv("POSTGRES_MAX_INACTIVE_LIFETIME", "300")
+    )
+}
+
+# Size, default query timeout and acquire timeout of every pool, in seconds
+POOL_PROFILES: Dict[str, Dict[str, Any]] = {
+    "api": {
+        "min_size": int(os.getenv("POSTGRES_API_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("POSTGRES_API_POOL_MAX_SIZE", "10")),
+        "command_timeout": _seconds("POSTGRES_API_COMMAND_TIMEOUT", "30"),
+        "acquire_timeout": _seconds("POSTGRES_API_ACQUIRE_TIMEOUT", "10")
+    },
+    "batch": {
+        "min_size": int(os.getenv("POSTGRES_BATCH_POOL_MIN_SIZE", "1")),
+        "max_size": int(os.getenv("POSTGRES_BATCH_POOL_MAX_SIZE", "10")),
+        "command_timeout": _seconds("POSTGRES_BATCH_COMMAND_TIMEOUT"),
+        "acquire_timeout": _seconds("POSTGRES_BATCH_ACQUIRE_TIMEOUT")
+    }
+}
+
+
+class _MeteredAcquire:
+    """
+    Connection acquisition usable both as `async with pool.acquire()` and
+    as `await pool.acquire()`.
+    """
+
+    def __init__(self, pool: "MeteredPool", timeout: Optional[float]):
+        self.pool = pool
+        self.timeout = timeout
+        self.conn = None
+
+    def __await__(self):
+        return self.pool._acquire(self.timeout).__await__()
+
+    async def __aenter__(self):
+        self.conn = await self.pool._acquire(self.timeout)
+        return self.conn
+
+    async def __aexit__(self, *exc) -> None:
+        conn, self.conn = self.conn, None
+        await self.pool.release(conn)
+
+
+class MeteredPool:
+    """
+    asyncpg pool proxy measuring how long callers wait for a connection and
+    how long they keep it. Every other attribute is delegated to the
+    wrapped pool.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.pool.Pool,
+        name: str = "default",
+        acquire_timeout: Optional[float] = None
+    ):
+        self._pool = pool
+        self.name = name
+        self.acquire_timeout = acquire_timeout
+        self.waiting = 0
+        self.max_wait = 0.0
+        self._checkouts: Dict[int, float] = {}
+
+    def acquire(self, *, timeout=None) -> _MeteredAcquire:
+        return _MeteredAcquire(
+            self, self.acquire_timeout if timeout is None else timeout
+        )
+
+    async def _acquire(self, timeout: Optional[float]):
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            conn = await self._pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            DB_ACQUIRE_TIMEOUTS.labels(self.name).inc()
+            raise
+        finally:
+            self.waiting -= 1
+        now = time.perf_counter()
+        DB_ACQUIRE_SECONDS.labels(self.name).observe(now - start)
+        self.max_wait = max(self.max_wait, now - start)
+        self._checkouts[id(conn)] = now
+        return conn
+
+    async def release(self, conn, *, timeout=None) -> None:
+        start = self._checkouts.pop(id(conn), None)
+        if start is not None:
+            DB_CHECKOUT_SECONDS.labels(self.name).observe(
+                time.perf_counter() - start
+            )
+        await self._pool.release(conn, timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the size of the pool and its acquisition statistics since
+        the process started.
+        """
+        waits = DB_ACQUIRE_SECONDS.labels(self.name)
+        checkouts = DB_CHECKOUT_SECONDS.labels(self.name)
+        return {
+            "pool": self.name,
+            "size": self._pool.get_size(),
+            "idle": self._pool.get_idle_size(),
+            "max_size": self._pool.get_max_size(),
+            "in_use": len(self._checkouts),
+            "waiting": self.waiting,
+            "acquires": waits.count,
+            "acquire_timeouts": int(
+                DB_ACQUIRE_TIMEOUTS.labels(self.name).value
+            ),
+            "acquire_wait_avg": waits.sum / waits.count if waits.count else 0,
+            "acquire_wait_max": self.max_wait,
+            "checkout_avg": (
+                checkouts.sum / checkouts.count if checkouts.count else 0
+            )
+        }
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+
+async def create_db_pool(
+    profile: str = "batch",
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None
+) -> MeteredPool:
+    """
+    Create an asyncpg connection pool to the configured database.
+
+    Args:
+        profile (str): "api" or "batch", see `POOL_PROFILES`. Also the name
+        of the pool in the metrics.
+        min_size (int, optional): Connections opened when the pool starts,
+        overrides the profile.
+        max_size (int, optional): Maximum number of connections of the pool,
+        overrides the profile.
+
+    Returns:
+        MeteredPool: The connection pool.
+    """
+    settings = POOL_PROFILES[profile]
+    pool = await asyncpg.create_pool(
+        **DB_SETTINGS,
+        **POOL_SETTINGS,
+        min_size=settings["min_size"] if min_size is None else min_size,
+        max_size=settings["max_size"] if max_size is None else max_size,
+        command_timeout=settings["command_timeout"],
+        # Tells the pools apart in pg_stat_activity
+        server_settings={"application_name": f"cebolla-{profile}"}
+    )
+    return MeteredPool(pool, profile, settings["acquire_timeout"])
@@ -0,0 +1,231 @@
+# @ Author: Antonio Llorente. Aitea Tech Becarios
+
+# <antoniollorentecuenca@gmail.com>
+
+# @ Project: Cebolla
+
+# @ Create Time: 2026-10-18 10:30:50
+
+# @ Modified time: 2026-10-18 10:30:50
+
+# @ Description: Module for storing the scraped articles in PostgreSQL and
+# searching them. Every article is one row of the `articles` table, upserted
+# on its URL together with its indicators of compromise (see
+# `app.scraping.indicators`), with a generated `tsvector` (title weighted
+# above headers and body) covered by a GIN index. Searches rank the newest
+# matches of a query with `ts_rank_cd` and return them page by page with a
+# highlighted snippet.
+
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from asyncpg import Connection
+
+# Text search configuration (language) used to index and query articles
+SEARCH_CONFIG = os.getenv("ARTICLE_SEARCH_CONFIG", "english")
+if not re.fullmatch(r"[a-z_]+", SEARCH_CONFIG):
+    raise ValueError(f"Invalid ARTICLE_SEARCH_CONFIG: {SEARCH_CONFIG!r}")
+
+# Only the newest matches of a query are ranked, so common terms cost the
+# same on a large corpus as on a small one
+SEARCH_MAX_CANDIDATES = int(os.getenv("ARTICLE_SEARCH_MAX_CANDIDATES", "5000"))
+
+HEADER_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+ARTICLES_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS articles (
+        id BIGSERIAL PRIMARY KEY,
+        url TEXT NOT NULL UNIQUE,
+        title TEXT NOT NULL DEFAULT '',
+        headers TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        simhash TEXT,
+        duplicate_of TEXT,
+        indicators JSONB NOT NULL DEFAULT '{{}}',
+        fetched_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        search_vector TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('{SEARCH_CONFIG}', title), 'A')
+            || setweight(to_tsvector('{SEARCH_CONFIG}', headers), 'B')
+            || setweight(to_tsvector('{SEARCH_CONFIG}', body), 'C')
+        ) STORED
+    );
+
+    ALTER TABLE articles
+        ADD COLUMN IF NOT EXISTS indicators JSONB NOT NULL DEFAULT '{{}}';
+
+    CREATE INDEX IF NOT EXISTS articles_search_idx
+        ON articles USING GIN (search_vector);
+"""
+
+# Unchanged articles are not rewritten, which would re-index them
+_UPSERT_ARTICLES_SQL = """
+    INSERT INTO articles (
+        url, title, headers, body, simhash, duplicate_of, indicators,
+        fetched_at
+    ) VALUES {values}
+    ON CONFLICT (url) DO UPDATE
+    SET title = EXCLUDED.title,
+        headers = EXCLUDED.headers,
+        body = EXCLUDED.body,
+        simhash = EXCLUDED.simhash,
+        duplicate_of = EXCLUDED.duplicate_of,
+        indicators = EXCLUDED.indicators,
+        fetched_at = EXCLUDED.fetched_at
+    WHERE (articles.title, articles.headers, articles.body)
+        IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.headers, EXCLUDED.body)
+        OR articles.indicators IS DISTINCT FROM EXCLUDED.indicators
+"""
+
+# Upsert statement with asyncpg placeholders, one row per execution
+UPSERT_ARTICLE_SQL = _UPSERT_ARTICLES_SQL.format(
+    values="($1, $2, $3, $4, $5, $6, $7::jsonb, $8)"
+)
+
+# Upsert statement for `psycopg2.extras.execute_values`
+UPSERT_ARTICLES_VALUES_SQL = _UPSERT_ARTICLES_SQL.format(values="%s")
+
+
+class ArticleHit(BaseModel):
+    """
+    Pydantic model for an article matching a full-text search.
+    """
+    id: int
+    url: str
+    title: str
+    snippet: str
+    rank: float
+    fetched_at: datetime
+    duplicate_of: Optional[str] = None
+    indicators: Dict[str, List[str]] = {}
+
+
+class ArticleSearchPage(BaseModel):
+    """
+    Pydantic model for a page of search results. `next_offset` is the
+    offset of the next page, or None on the last page.
+    """
+    items: List[ArticleHit]
+    next_offset: Optional[int] = None
+
+
+def article_row(item: Dict[str, Any]) -> Tuple:
+    """
+    Convert a scraped item into the values of an `articles` row.
+
+    Args:
+        item (Dict[str, Any]): Item produced by the dynamic spider.
+
+    Returns:
+        Tuple: url, title, headers, body, simhash, duplicate_of,
+        indicators (as JSON) and fetched_at, in the column order of the
+        upsert statements.
+    """
+    headers = "\n".join(
+        text for tag in HEADER_TAGS for text in item.get(tag, ())
+    )
+    fetched_at = item.get("fetched_at")
+    return (
+        item["url"],
+        item.get("title") or "",
+        headers,
+        "\n".join(item.get("p", ())),
+        item.get("simhash"),
+        item.get("duplicate_of"),
+        json.dumps(item.get("indicators") or {}),
+        datetime.fromtimestamp(fetched_at, timezone.utc)
+        if fetched_at else datetime.now(timezone.utc)
+    )
+
+
+async def ensure_articles_table(conn: Connection) -> None:
+    """
+    Create the articles table and its full-text index if they are missing.
+
+    Args:
+        conn (Connection): Active database connection.
+    """
+    await conn.execute(ARTICLES_TABLE_SQL)
+
+
+async def upsert_articles(
+    conn: Connection,
+    items: List[Dict[str, Any]]
+) -> None:
+    """
+    Insert or update a batch of scraped articles in a single round trip.
+
+    Args:
+        conn (Connection): Active database connection.
+        items (List[Dict[str, Any]]): Items produced by the dynamic spider.
+    """
+    if items:
+        await conn.executemany(
+            UPSERT_ARTICLE_SQL, [article_row(item) for item in items]
+        )
+
+
+async def search_articles(
+    conn: Connection,
+    query: str,
+    limit: int,
+    offset: int = 0,
+    max_candidates: int = SEARCH_MAX_CANDIDATES
+) -> ArticleSearchPage:
+    """
+    Run a ranked full-text search over the stored articles.
+
+    The query uses the web search syntax (`"quoted phrases"`, `or`,
+    `-excluded`). Its newest `max_candidates` matches, found through the
+    GIN index, are ranked with `ts_rank_cd`, and only the requested page
+    gets a highlighted snippet.
+
+    Args:
+        conn (Connection): Active database connection.
+        query (str): The search terms.
+        limit (int): Maximum number of articles per page.
+        offset (int): Number of ranked articles to skip.
+        max_candidates (int): Matches ranked at most.
+
+    Returns:
+        ArticleSearchPage: The matching articles, best first, and the offset
+        of the next page.
+    """
+    rows = await conn.fetch(f"""
+        WITH query AS (
+            SELECT websearch_to_tsquery('{SEARCH_CONFIG}', $1) AS q
+        ), candidates AS (
+            SELECT a.id, a.search_vector
+            FROM articles AS a, query
+            WHERE a.search_vector @@ query.q
+            ORDER BY a.id DESC
+            LIMIT $4
+        ), ranked AS (
+            SELECT c.id, ts_rank_cd(c.search_vector, query.q) AS rank
+            FROM candidates AS c, query
+            ORDER BY rank DESC, c.id DESC
+            LIMIT $2 OFFSET $3
+        )
+        SELECT a.id, a.url, a.title, a.fetched_at, a.duplicate_of,
+               a.indicators, r.rank,
+               ts_headline('{SEARCH_CONFIG}', a.body, query.q,
+                           'MaxFragments=2, MinWords=10, MaxWords=30')
+                   AS snippet
+        FROM ranked AS r
+        JOIN articles AS a ON a.id = r.id, query
+        ORDER BY r.rank DESC, a.id DESC
+    """, query, limit + 1, offset, max_candidates)
+
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+    return ArticleSearchPage(
+        items=[
+            ArticleHit(**{**row, "indicators": json.loads(row["indicators"])})
+            for row in rows
+        ],
+        next_offset=next_offset
+    )
@@ -0,0 +1,101 @@
+# @ Author: Antonio Llorente. Aitea Tech Becarios
+
+# <antoniollorentecuenca@gmail.com>
+
+# @ Project: Cebolla
+
+# @ Create Time: 2026-10-18 10:30:50
+
+# @ Modified time: 2026-10-18 10:30:50
+
+# @ Description: Module providing a small in-process cache for hot, rarely
+# changing database lookups. `TTLCache` combines a time-to-live per entry with
+# LRU eviction once `maxsize` is reached, supports explicit invalidation after
+# writes and keeps hit/miss statistics. The shared caches for feed category
+# ids and known feed URLs are defined here and registered so their hit rates
+# can be exposed by the API.
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire `ttl` seconds after being stored.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _registry.append(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for `key`, or `default` if it is missing or
+        has expired.
+        """
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Drop a single entry, or the whole cache when no key is given.
+        """
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+_registry: List[TTLCache] = []
+
+
+def cache_stats() -> List[Dict[str, Any]]:
+    """
+    Return the statistics of every cache created in the process.
+    """
+    return [cache.stats() for cache in _registry]
+
+
+# 'Sin clasificar' and other category ids, keyed by category title
+category_cache = TTLCache("feed_categories", maxsize=64, ttl=600)
+
+# Rows of the feeds known to exist, keyed by (feed_url, owner_uid)
+feed_url_cache = TTLCache("feed_urls", maxsize=50000, ttl=300)
+
+# Serialized pages of GET /feeds, keyed by (after, limit)
+feed_page_cache = TTLCache("feed_pages", maxsize=256, ttl=5)
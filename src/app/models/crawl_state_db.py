@@ -0,0 +1,269 @@
+# @ Author: Antonio Llorente. Aitea Tech Becarios
+
+# <antoniollorentecuenca@gmail.com>
+
+# @ Project: Cebolla
+
+# @ Create Time: 2026-10-18 10:30:50
+
+# @ Modified time: 2026-10-18 10:30:50
+
+# @ Description: Module for persisting the incremental crawl state of the
+# dynamic spider in PostgreSQL. It keeps a watermark over `ttrss_entries.id`
+# so that every cycle only queues entries created since the previous run,
+# plus a per-link state table (last scrape time, status and content hash)
+# used to decide which already known links are due for a refresh. The links
+# of a cycle are read in fixed-size pages, each selected by a short keyset
+# query (`WHERE key > $last ORDER BY key LIMIT $n`), so memory does not grow
+# with the size of the tables and no transaction is held across the cycle.
+
+import os
+from datetime import timedelta
+from typing import List, Optional, Set, Tuple
+from pydantic import BaseModel
+from asyncpg import Connection
+
+# Name of the watermark row used by the dynamic news spider
+DEFAULT_WATERMARK = "dynamic_spider"
+
+# Successfully scraped links are re-crawled after this interval
+REFRESH_INTERVAL = timedelta(hours=int(os.getenv("CRAWL_REFRESH_HOURS", "24")))
+
+# Failed links are retried on every cycle until they reach this many attempts
+MAX_ATTEMPTS = int(os.getenv("CRAWL_MAX_ATTEMPTS", "3"))
+
+# Outcomes a later fetch would not change, never refreshed: responses
+# rejected or too large at admission, and documents, which are not extracted
+FINAL_STATUSES = ("rejected", "too_large", "document")
+
+# Links read per page by the keyset queries of a cycle
+LINK_BATCH_SIZE = int(os.getenv("CRAWL_LINK_BATCH_SIZE", "1000"))
+
+
+class LinkScrapeResult(BaseModel):
+    """
+    Pydantic model describing the outcome of scraping a single link.
+    """
+    link: str
+    status: str
+    content_hash: Optional[str] = None
+    # HTTP validators of the page, `(url, etag, last_modified, size)` with
+    # the URL that answered after any redirect, stored once the outcome is
+    # persisted
+    validators: Optional[
+        Tuple[str, Optional[str], Optional[str], int]
+    ] = None
+
+
+async def ensure_crawl_state_tables(conn: Connection) -> None:
+    """
+    Create the crawl watermark and per-link state tables if they are missing.
+
+    Args:
+        conn (Connection): Active database connection.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_watermarks (
+            name TEXT PRIMARY KEY,
+            last_entry_id BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+
+        CREATE TABLE IF NOT EXISTS crawl_link_state (
+            link TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            content_hash TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_scraped TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+
+        CREATE INDEX IF NOT EXISTS crawl_link_state_due_idx
+            ON crawl_link_state (status, last_scraped);
+    """)
+
+
+async def get_watermark(
+    conn: Connection,
+    name: str = DEFAULT_WATERMARK
+) -> int:
+    """
+    Retrieve the last `ttrss_entries.id` processed by a crawler.
+
+    Args:
+        conn (Connection): Active database connection.
+        name (str): Name of the watermark.
+
+    Returns:
+        int: The stored entry id, or 0 if the crawler never ran.
+    """
+    value = await conn.fetchval(
+        "SELECT last_entry_id FROM crawl_watermarks WHERE name = $1", name
+    )
+    return value or 0
+
+
+async def set_watermark(
+    conn: Connection,
+    entry_id: int,
+    name: str = DEFAULT_WATERMARK
+) -> None:
+    """
+    Persist the last `ttrss_entries.id` processed by a crawler.
+
+    Args:
+        conn (Connection): Active database connection.
+        entry_id (int): Highest entry id covered by the finished cycle.
+        name (str): Name of the watermark.
+    """
+    await conn.execute("""
+        INSERT INTO crawl_watermarks (name, last_entry_id, updated_at)
+        VALUES ($1, $2, now())
+        ON CONFLICT (name) DO UPDATE
+        SET last_entry_id = EXCLUDED.last_entry_id,
+            updated_at = EXCLUDED.updated_at
+    """, name, entry_id)
+
+
+async def get_max_entry_id(conn: Connection) -> int:
+    """
+    Retrieve the highest id currently present in the ttrss_entries table.
+
+    Args:
+        conn (Connection): Active database connection.
+
+    Returns:
+        int: The highest entry id, or 0 if the table is empty.
+    """
+    value = await conn.fetchval("SELECT max(id) FROM ttrss_entries")
+    return value or 0
+
+
+async def get_new_entry_links(
+    conn: Connection,
+    after: int,
+    until_id: int,
+    limit: int = LINK_BATCH_SIZE
+) -> Tuple[List[str], Optional[int]]:
+    """
+    Retrieve a page of the links of the entries created since the previous
+    cycle, ordered by entry id. Pages are selected with a keyset condition
+    (`id > after`), so every page is a short index range scan.
+
+    Args:
+        conn (Connection): Active database connection.
+        after (int): Only entries whose id is greater than this one, the
+        watermark of the previous cycle for the first page.
+        until_id (int): Highest entry id covered by this cycle (inclusive).
+        limit (int): Maximum number of links to retrieve.
+
+    Returns:
+        Tuple[List[str], Optional[int]]: The raw entry links, oldest entry
+        first, and the cursor of the next page, or None when there are no
+        more links.
+    """
+    # One extra row tells whether another page follows
+    rows = await conn.fetch("""
+        SELECT id, link FROM ttrss_entries
+        WHERE link IS NOT NULL AND id > $1 AND id <= $2
+        ORDER BY id
+        LIMIT $3
+    """, after, until_id, limit + 1)
+
+    links = [row["link"] for row in rows[:limit]]
+    next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    return links, next_cursor
+
+
+async def get_due_links(
+    conn: Connection,
+    after: str = "",
+    limit: int = LINK_BATCH_SIZE,
+    refresh_after: timedelta = REFRESH_INTERVAL,
+    max_attempts: int = MAX_ATTEMPTS
+) -> Tuple[List[str], Optional[str]]:
+    """
+    Retrieve a page of the known links that must be scraped again: those
+    scraped longer than `refresh_after` ago, unless their outcome is one of
+    `FINAL_STATUSES`, and those that failed fewer than `max_attempts`
+    times. Like `get_new_entry_links`,
+    pages are selected with a keyset condition, on the link.
+
+    Args:
+        conn (Connection): Active database connection.
+        after (str): Only links sorting after this one, "" for the first
+        page.
+        limit (int): Maximum number of links to retrieve.
+        refresh_after (timedelta): Age after which scraped links are due.
+        max_attempts (int): Attempts after which failed links are abandoned.
+
+    Returns:
+        Tuple[List[str], Optional[str]]: The due links and the cursor of
+        the next page, or None when there are no more links.
+    """
+    rows = await conn.fetch("""
+        SELECT link FROM crawl_link_state
+        WHERE link > $1
+          AND status <> ALL($5::text[])
+          AND ((status <> 'failed' AND last_scraped < now() - $2::interval)
+               OR (status = 'failed' AND attempts < $3))
+        ORDER BY link
+        LIMIT $4
+    """, after, refresh_after, max_attempts, limit + 1, list(FINAL_STATUSES))
+
+    links = [row["link"] for row in rows[:limit]]
+    next_cursor = links[-1] if len(rows) > limit else None
+    return links, next_cursor
+
+
+async def stored_links(conn: Connection, links: List[str]) -> Set[str]:
+    """
+    Find which links already have a crawl state, i.e. were scraped before.
+
+    Args:
+        conn (Connection): Active database connection.
+        links (List[str]): The links to look up.
+
+    Returns:
+        Set[str]: The links found in the crawl_link_state table.
+    """
+    if not links:
+        return set()
+    rows = await conn.fetch(
+        "SELECT link FROM crawl_link_state WHERE link = ANY($1::text[])",
+        links
+    )
+    return {row["link"] for row in rows}
+
+
+async def record_scrape_results(
+    conn: Connection,
+    results: List[LinkScrapeResult]
+) -> None:
+    """
+    Upsert the outcome of a crawl cycle into the crawl_link_state table.
+
+    Successful scrapes reset the attempt counter, failures increment it.
+
+    Args:
+        conn (Connection): Active database connection.
+        results (List[LinkScrapeResult]): Outcomes reported by the spider.
+    """
+    if not results:
+        return
+
+    await conn.executemany("""
+        INSERT INTO crawl_link_state (
+            link, status, content_hash, attempts, last_scraped
+        ) VALUES ($1, $2, $3, CASE WHEN $2 = 'failed' THEN 1 ELSE 0 END, now())
+        ON CONFLICT (link) DO UPDATE
+        SET status = EXCLUDED.status,
+            content_hash = COALESCE(
+                EXCLUDED.content_hash, crawl_link_state.content_hash
+            ),
+            attempts = CASE
+                WHEN EXCLUDED.status = 'failed'
+                THEN crawl_link_state.attempts + 1
+                ELSE 0
+            END,
+            last_scraped = EXCLUDED.last_scraped
+    """, [(r.link, r.status, r.content_hash) for r in results])
@@ -0,0 +1,258 @@
+# @ Author: Antonio Llorente. Aitea Tech Becarios
+
+# <antoniollorentecuenca@gmail.com>
+
+# @ Project: Cebolla
+
+# @ Create Time: 2026-10-18 10:30:50
+
+# @ Modified time: 2026-10-18 10:30:50
+
+# @ Description: Module implementing the distributed crawl work queue on
+# PostgreSQL. Links to crawl are enqueued in the `crawl_tasks` table and
+# crawl workers on any node claim them in batches with
+# `FOR UPDATE SKIP LOCKED`, so concurrent workers never claim the same link.
+# A claimed task holds a time-limited lease that its worker extends with
+# heartbeats; tasks whose lease expired (the worker died or hung) become
+# claimable again, and tasks that exhausted their attempts are marked failed.
+
+import os
+from datetime import timedelta
+from typing import List
+from asyncpg import Connection
+from app.models.crawl_state_db import LinkScrapeResult
+
+# Time a claimed task stays reserved without a heartbeat
+LEASE_DURATION = timedelta(
+    seconds=int(os.getenv("CRAWL_TASK_LEASE_SECONDS", "300"))
+)
+
+# Claims after which a task whose lease keeps expiring is abandoned
+MAX_TASK_ATTEMPTS = int(os.getenv("CRAWL_TASK_MAX_ATTEMPTS", "3"))
+
+
+async def ensure_crawl_task_table(conn: Connection) -> None:
+    """
+    Create the crawl_tasks table if it does not exist yet.
+
+    Args:
+        conn (Connection): Active database connection.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_tasks (
+            link TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'pending',
+            lease_owner TEXT,
+            lease_expires TIMESTAMPTZ,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            finished_at TIMESTAMPTZ
+        );
+        CREATE INDEX IF NOT EXISTS crawl_tasks_claimable
+            ON crawl_tasks (enqueued_at)
+            WHERE status IN ('pending', 'leased');
+    """)
+
+
+async def enqueue_crawl_tasks(conn: Connection, links: List[str]) -> int:
+    """
+    Queue links for crawling. Links already pending or leased are left
+    untouched; finished ones are queued again.
+
+    Args:
+        conn (Connection): Active database connection.
+        links (List[str]): The links to crawl.
+
+    Returns:
+        int: Number of links queued.
+    """
+    if not links:
+        return 0
+    rows = await conn.fetch("""
+        INSERT INTO crawl_tasks (link)
+        SELECT unnest($1::text[])
+        ON CONFLICT (link) DO UPDATE
+        SET status = 'pending',
+            lease_owner = NULL,
+            lease_expires = NULL,
+            attempts = 0,
+            enqueued_at = now(),
+            finished_at = NULL
+        WHERE crawl_tasks.status IN ('done', 'failed')
+        RETURNING link
+    """, links)
+    return len(rows)
+
+
+async def claim_crawl_tasks(
+    conn: Connection,
+    owner: str,
+    limit: int,
+    lease: timedelta = LEASE_DURATION,
+    max_attempts: int = MAX_TASK_ATTEMPTS
+) -> List[str]:
+    """
+    Lease up to `limit` claimable tasks to a worker.
+
+    Pending tasks and tasks whose lease expired are claimable. Rows locked
+    by a concurrent claim are skipped instead of waited for, so workers
+    never block each other nor claim the same task.
+
+    Args:
+        conn (Connection): Active database connection.
+        owner (str): Identifier of the claiming worker.
+        limit (int): Maximum number of tasks to claim.
+        lease (timedelta): Duration of the lease.
+        max_attempts (int): Tasks claimed this many times are not claimed
+        again.
+
+    Returns:
+        List[str]: The claimed links, oldest first.
+    """
+    rows = await conn.fetch("""
+        UPDATE crawl_tasks AS t
+        SET status = 'leased',
+            lease_owner = $1,
+            lease_expires = now() + $3::interval,
+            attempts = t.attempts + 1
+        FROM (
+            SELECT link FROM crawl_tasks
+            WHERE (status = 'pending'
+                   OR (status = 'leased' AND lease_expires < now()))
+              AND attempts < $4
+            ORDER BY enqueued_at
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        ) AS claimable
+        WHERE t.link = claimable.link
+        RETURNING t.link, t.enqueued_at
+    """, owner, limit, lease, max_attempts)
+    rows = sorted(rows, key=lambda row: row["enqueued_at"])
+    return [row["link"] for row in rows]
+
+
+async def heartbeat_crawl_tasks(
+    conn: Connection,
+    owner: str,
+    lease: timedelta = LEASE_DURATION
+) -> int:
+    """
+    Extend the leases of every task held by a worker.
+
+    Args:
+        conn (Connection): Active database connection.
+        owner (str): Identifier of the worker.
+        lease (timedelta): New duration of the leases, from now.
+
+    Returns:
+        int: Number of leases extended.
+    """
+    result = await conn.execute("""
+        UPDATE crawl_tasks
+        SET lease_expires = now() + $2::interval
+        WHERE status = 'leased' AND lease_owner = $1
+    """, owner, lease)
+    return int(result.split()[-1])
+
+
+async def complete_crawl_tasks(
+    conn: Connection,
+    owner: str,
+    results: List[LinkScrapeResult]
+) -> int:
+    """
+    Mark the tasks of a worker as done or failed.
+
+    Only tasks still leased by `owner` are updated: a task whose lease
+    expired and was claimed by another worker belongs to that worker.
+
+    Args:
+        conn (Connection): Active database connection.
+        owner (str): Identifier of the worker.
+        results (List[LinkScrapeResult]): Outcome of every crawled link.
+
+    Returns:
+        int: Number of tasks completed.
+    """
+    if not results:
+        return 0
+    rows = await conn.fetch("""
+        UPDATE crawl_tasks AS t
+        SET status = CASE WHEN r.status = 'failed'
+                          THEN 'failed' ELSE 'done' END,
+            lease_owner = NULL,
+            lease_expires = NULL,
+            finished_at = now()
+        FROM unnest($2::text[], $3::text[]) AS r(link, status)
+        WHERE t.link = r.link
+          AND t.status = 'leased'
+          AND t.lease_owner = $1
+        RETURNING t.link
+    """, owner, [r.link for r in results], [r.status for r in results])
+    return len(rows)
+
+
+async def release_crawl_tasks(conn: Connection, owner: str) -> int:
+    """
+    Give back the tasks still leased by a worker, e.g. when it stops.
+
+    Args:
+        conn (Connection): Active database connection.
+        owner (str): Identifier of the worker.
+
+    Returns:
+        int: Number of tasks made pending again.
+    """
+    result = await conn.execute("""
+        UPDATE crawl_tasks
+        SET status = 'pending',
+            lease_owner = NULL,
+            lease_expires = NULL,
+            attempts = GREATEST(attempts - 1, 0)
+        WHERE status = 'leased' AND lease_owner = $1
+    """, owner)
+    return int(result.split()[-1])
+
+
+async def reap_crawl_tasks(
+    conn: Connection,
+    max_attempts: int = MAX_TASK_ATTEMPTS
+) -> int:
+    """
+    Mark as failed the tasks whose lease expired after their last allowed
+    attempt.
+
+    Args:
+        conn (Connection): Active database connection.
+        max_attempts (int): Attempts after which a task is abandoned.
+
+    Returns:
+        int: Number of tasks marked failed.
+    """
+    result = await conn.execute("""
+        UPDATE crawl_tasks
+        SET status = 'failed',
+            lease_owner = NULL,
+            lease_expires = NULL,
+            finished_at = now()
+        WHERE status = 'leased'
+          AND lease_expires < now()
+          AND attempts >= $1
+    """, max_attempts)
+    return int(result.split()[-1])
+
+
+async def count_open_crawl_tasks(conn: Connection) -> int:
+    """
+    Count the tasks still pending or leased.
+
+    Args:
+        conn (Connection): Active database connection.
+
+    Returns:
+        int: Number of unfinished tasks.
+    """
+    return await conn.fetchval("""
+        SELECT count(*) FROM crawl_tasks
+        WHERE status IN ('pending', 'leased')
+    """)
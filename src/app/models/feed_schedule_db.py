@@ -0,0 +1,183 @@
+# @ Author: Antonio Llorente. Aitea Tech Becarios
+
+# <antoniollorentecuenca@gmail.com>
+
+# @ Project: Cebolla
+
+# @ Create Time: 2026-10-18 10:30:50
+
+# @ Modified time: 2026-10-18 10:30:50
+
+# @ Description: Module persisting the polling schedule of the feeds stored in
+# `ttrss_feeds`. Every feed has one row in `feed_schedule` with the polling
+# interval learned from its entries, the time of its next poll, the newest
+# entry seen and its consecutive failures, so the feed scheduler (see
+# `app.scraping.feed_scheduler`) resumes where it stopped after a restart.
+# The learned interval is also written to `ttrss_feeds.update_interval`, so
+# the Tiny Tiny RSS updater ingests every feed at the pace of its entries.
+
+from datetime import datetime
+from typing import Iterable, List, Optional
+from pydantic import BaseModel
+from asyncpg import Connection
+
+
+class FeedSchedule(BaseModel):
+    """
+    Pydantic model for the polling state of a feed.
+    """
+    feed_id: int
+    feed_url: str
+    interval_seconds: float
+    next_poll: Optional[datetime] = None
+    last_polled: Optional[datetime] = None
+    last_entry_at: Optional[datetime] = None
+    failures: int = 0
+    polls: int = 0
+    changes: int = 0
+
+
+SCHEDULE_COLUMNS = """
+    feed_id, feed_url, interval_seconds, next_poll, last_polled,
+    last_entry_at, failures, polls, changes
+"""
+
+
+async def ensure_feed_schedule_table(conn: Connection) -> None:
+    """
+    Create the feed_schedule table if it does not exist yet.
+
+    Args:
+        conn (Connection): Active database connection.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS feed_schedule (
+            feed_id INTEGER PRIMARY KEY,
+            feed_url TEXT NOT NULL,
+            interval_seconds DOUBLE PRECISION NOT NULL,
+            next_poll TIMESTAMPTZ,
+            last_polled TIMESTAMPTZ,
+            last_entry_at TIMESTAMPTZ,
+            failures INTEGER NOT NULL DEFAULT 0,
+            polls INTEGER NOT NULL DEFAULT 0,
+            changes INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS feed_schedule_next_poll_idx
+            ON feed_schedule (next_poll);
+    """)
+
+
+async def load_feed_schedules(
+    conn: Connection,
+    default_interval: float
+) -> List[FeedSchedule]:
+    """
+    Retrieve the schedule of every feed of ttrss_feeds. Feeds never
+    scheduled get `default_interval` and no next poll, so they are due at
+    once.
+
+    Args:
+        conn (Connection): Active database connection.
+        default_interval (float): Interval of the new feeds, in seconds.
+
+    Returns:
+        List[FeedSchedule]: One schedule per stored feed.
+    """
+    rows = await conn.fetch("""
+        SELECT f.id AS feed_id, f.feed_url,
+               COALESCE(s.interval_seconds, $1) AS interval_seconds,
+               s.next_poll, s.last_polled, s.last_entry_at,
+               COALESCE(s.failures, 0) AS failures,
+               COALESCE(s.polls, 0) AS polls,
+               COALESCE(s.changes, 0) AS changes
+        FROM ttrss_feeds AS f
+        LEFT JOIN feed_schedule AS s ON s.feed_id = f.id
+    """, default_interval)
+    return [FeedSchedule(**row) for row in rows]
+
+
+async def save_feed_schedules(
+    conn: Connection,
+    schedules: List[FeedSchedule]
+) -> None:
+    """
+    Upsert the schedule of the polled feeds.
+
+    Args:
+        conn (Connection): Active database connection.
+        schedules (List[FeedSchedule]): The schedules to store.
+    """
+    if not schedules:
+        return
+    await conn.executemany(f"""
+        INSERT INTO feed_schedule ({SCHEDULE_COLUMNS})
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+        ON CONFLICT (feed_id) DO UPDATE
+        SET feed_url = EXCLUDED.feed_url,
+            interval_seconds = EXCLUDED.interval_seconds,
+            next_poll = EXCLUDED.next_poll,
+            last_polled = EXCLUDED.last_polled,
+            last_entry_at = EXCLUDED.last_entry_at,
+            failures = EXCLUDED.failures,
+            polls = EXCLUDED.polls,
+            changes = EXCLUDED.changes
+    """, [
+        (s.feed_id, s.feed_url, s.interval_seconds, s.next_poll,
+         s.last_polled, s.last_entry_at, s.failures, s.polls, s.changes)
+        for s in schedules
+    ])
+
+
+async def apply_feed_intervals(
+    conn: Connection,
+    schedules: List[FeedSchedule],
+    changed: Iterable[int] = ()
+) -> None:
+    """
+    Hand the learned intervals to the Tiny Tiny RSS updater: every feed is
+    updated every `interval_seconds` (rounded to minutes, the unit of
+    `ttrss_feeds.update_interval`), and the feeds whose poll found new
+    entries are marked as never updated, so they are ingested at once.
+
+    Args:
+        conn (Connection): Active database connection.
+        schedules (List[FeedSchedule]): The schedules of the polled feeds.
+        changed (Iterable[int]): Ids of the feeds with new entries.
+    """
+    if not schedules:
+        return
+    changed = set(changed)
+    await conn.executemany("""
+        UPDATE ttrss_feeds
+        SET update_interval = $2,
+            last_updated = CASE WHEN $3 THEN NULL ELSE last_updated END
+        WHERE id = $1
+    """, [
+        (s.feed_id, max(1, round(s.interval_seconds / 60)),
+         s.feed_id in changed)
+        for s in schedules
+    ])
+
+
+async def get_feed_schedules(
+    conn: Connection,
+    limit: int,
+    offset: int = 0
+) -> List[FeedSchedule]:
+    """
+    Retrieve the stored schedules, next due first.
+
+    Args:
+        conn (Connection): Active database connection.
+        limit (int): Maximum number of schedules to retrieve.
+        offset (int): Number of schedules to skip.
+
+    Returns:
+        List[FeedSchedule]: The schedules.
+    """
+    rows = await conn.fetch(f"""
+        SELECT {SCHEDULE_COLUMNS} FROM feed_schedule
+        ORDER BY next_poll NULLS FIRST, feed_id
+        LIMIT $1 OFFSET $2
+    """, limit, offset)
+    return [FeedSchedule(**row) for row in rows]
@@ -10,12 +10,17 @@
 
 # @ Description: Module for handling operations on RSS feed entries in Tiny
 # Tiny RSS using PostgreSQL. Provides data models for input/output and database
-#functions to retrieve and insert feeds.
+#functions to retrieve and insert feeds, either one by one or in bulk.
+# Category ids and known feeds are cached in process (see `app.models.cache`)
+# so hot lookups skip the database.
 
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from pydantic import BaseModel, HttpUrl
 from asyncpg import Connection
 from fastapi import HTTPException
+from app.models.cache import category_cache, feed_page_cache, feed_url_cache
+
+DEFAULT_CATEGORY = 'Sin clasificar'
 
 
 class FeedCreateRequest(BaseModel):
@@ -40,98 +45,292 @@ class FeedResponse(BaseModel):
     owner_uid: int
     cat_id: int
 
+class FeedPage(BaseModel):
+    """
+    Pydantic model for a page of feeds. `next_cursor` is the id to pass as
+    `after` to fetch the next page, or None on the last page.
+    """
+    items: List[FeedResponse]
+    next_cursor: Optional[int] = None
+
 class FeedUrlList(BaseModel):
     urls: List[HttpUrl]
 
+class FeedInsertResult(BaseModel):
+    """
+    Pydantic model describing the outcome of inserting one feed in bulk.
+    """
+    feed_url: str
+    status: str  # "inserted", "duplicate" or "error"
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+# Maximum number of rows sent in a single bulk INSERT statement
+BULK_INSERT_CHUNK = 1000
+
+# Rows fetched per round trip by the server-side cursor of the export
+EXPORT_PREFETCH = 1000
+
+# Columns returned by the feed listing and export, matching FeedResponse
+FEED_COLUMNS = """
+    id, title, feed_url, site_url, owner_uid, COALESCE(cat_id, 0) AS cat_id
+"""
+
 async def get_feeds_from_db(
     conn: Connection,
-    limit: int
-) -> List[FeedResponse]:
+    limit: int,
+    after: int = 0
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
     """
-    Retrieve a limited number of feed records from the ttrss_feeds table.
+    Retrieve a page of feed records from the ttrss_feeds table, ordered by
+    id. Pages are selected with a keyset condition (`id > after`), so every
+    page costs an index range scan no matter how deep it is.
 
     Args:
         conn (Connection): Active database connection.
         limit (int): Maximum number of feeds to retrieve.
+        after (int): Only return feeds whose id is greater than this one.
 
     Returns:
-        List[FeedResponse]: List of feeds as FeedResponse objects.
-    """
-    rows = await conn.fetch("SELECT * FROM ttrss_feeds LIMIT $1", limit)
-    feeds = []
-    for row in rows:
-        cat_id = row['cat_id'] if isinstance(row['cat_id'], int) else 0
-        feed = FeedResponse(
-            id=row['id'],
-            title=row['title'],
-            feed_url=row['feed_url'],
-            site_url=row['site_url'],
-            owner_uid=row['owner_uid'],
-            cat_id=cat_id
-        )
-        feeds.append(feed)
-    return feeds
+        Tuple[List[Dict[str, Any]], Optional[int]]: The feeds and the cursor
+        of the next page, or None when there are no more feeds.
+    """
+    # One extra row tells whether another page follows
+    rows = await conn.fetch(f"""
+        SELECT {FEED_COLUMNS} FROM ttrss_feeds
+        WHERE id > $1
+        ORDER BY id
+        LIMIT $2
+    """, after, limit + 1)
+
+    feeds = [dict(row) for row in rows[:limit]]
+    next_cursor = feeds[-1]['id'] if len(rows) > limit else None
+    return feeds, next_cursor
+
+
+async def iter_feeds(conn: Connection) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream every feed of the ttrss_feeds table, ordered by id, through a
+    server-side cursor, so the table is never loaded in memory at once.
+
+    Args:
+        conn (Connection): Active database connection, held until the
+        iteration ends.
+
+    Yields:
+        Dict[str, Any]: One feed row at a time.
+    """
+    async with conn.transaction(readonly=True):
+        async for row in conn.cursor(
+            f"SELECT {FEED_COLUMNS} FROM ttrss_feeds ORDER BY id",
+            prefetch=EXPORT_PREFETCH
+        ):
+            yield dict(row)
+
+
+async def get_default_category_id(conn: Connection, owner_uid: int) -> int:
+    """
+    Retrieve the id of the 'Sin clasificar' feed category, creating it if
+    it does not exist yet. The id is served from `category_cache` when
+    possible.
+
+    Args:
+        conn (Connection): Active database connection.
+        owner_uid (int): Owner of the category if it has to be created.
+
+    Returns:
+        int: The category id.
+    """
+    cat_id = category_cache.get(DEFAULT_CATEGORY)
+    if cat_id is not None:
+        return cat_id
+
+    category = await conn.fetchrow("""
+        SELECT id FROM ttrss_feed_categories
+        WHERE title = 'Sin clasificar'
+    """)
+
+    if category:
+        cat_id = category['id']
+    else:
+        await conn.execute("""
+            INSERT INTO ttrss_feed_categories (title, owner_uid)
+            VALUES ('Sin clasificar', $1)
+        """, owner_uid)
+
+        cat_id = await conn.fetchval("""
+            SELECT id FROM ttrss_feed_categories
+            WHERE title = 'Sin clasificar'
+        """)
+
+    category_cache.set(DEFAULT_CATEGORY, cat_id)
+    return cat_id
 
 
 async def insert_feed_to_db(
     conn: Connection,
     feed: FeedCreateRequest
-) -> None:
+) -> Dict[str, Any]:
     """
     Insert a new feed into the ttrss_feeds table. Ensures the feed category
-    'Sin clasificar' exists before insertion.
+    'Sin clasificar' exists before insertion. The inserted row is stored in
+    `feed_url_cache`.
 
     Args:
         conn (Connection): Active database connection.
         feed (FeedCreateRequest): Data of the feed to insert.
 
+    Returns:
+        Dict[str, Any]: The inserted row.
+
     Raises:
         HTTPException: If insertion fails or constraints are violated.
     """
     try:
-        category = await conn.fetchrow("""
-            SELECT id FROM ttrss_feed_categories
-            WHERE title = 'Sin clasificar'
-        """)
-
-        if category:
-            cat_id = category['id']
-        else:
-            await conn.execute("""
-                INSERT INTO ttrss_feed_categories (title, owner_uid)
-                VALUES ('Sin clasificar', $1)
-            """, feed.owner_uid)
+        cat_id = await get_default_category_id(conn, feed.owner_uid)
 
-            cat_id = await conn.fetchval("""
-                SELECT id FROM ttrss_feed_categories
-                WHERE title = 'Sin clasificar'
-            """)
-
-        await conn.execute("""
+        row = await conn.fetchrow("""
             INSERT INTO ttrss_feeds (
                 title, feed_url, site_url, owner_uid, cat_id
             ) VALUES ($1, $2, $3, $4, $5)
+            RETURNING id, title, feed_url, site_url, owner_uid, cat_id
         """, feed.title, str(feed.feed_url),
              feed.site_url, feed.owner_uid, cat_id)
 
+        new_feed = dict(row)
+        feed_url_cache.set((new_feed['feed_url'], feed.owner_uid), new_feed)
+        feed_page_cache.invalidate()
+        return new_feed
+
     except Exception as e:
+        # The cached category may have been deleted meanwhile
+        category_cache.invalidate(DEFAULT_CATEGORY)
         raise HTTPException(
             status_code=500,
             detail=f"Error al insertar el feed en la base de datos: {str(e)}"
         )
 
 
-async def get_entry_links(conn: Connection) -> List[str]:
+async def _insert_feed_rows(
+    conn: Connection,
+    feeds: List[FeedCreateRequest],
+    indexes: List[int],
+    cat_id: int
+) -> List[Any]:
+    """
+    Insert the feeds at the given indexes with one statement, inside a
+    savepoint so a failure leaves an enclosing transaction usable.
+
+    Returns:
+        List[Record]: The inserted rows; feeds already stored are skipped.
+    """
+    async with conn.transaction():
+        return await conn.fetch("""
+            INSERT INTO ttrss_feeds (
+                title, feed_url, site_url, owner_uid, cat_id
+            )
+            SELECT v.title, v.feed_url, v.site_url, v.owner_uid, $5
+            FROM unnest(
+                $1::text[], $2::text[], $3::text[], $4::int[]
+            ) AS v(title, feed_url, site_url, owner_uid)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM ttrss_feeds f
+                WHERE f.feed_url = v.feed_url
+                  AND f.owner_uid = v.owner_uid
+            )
+            ON CONFLICT DO NOTHING
+            RETURNING id, title, feed_url, site_url, owner_uid, cat_id
+        """,
+            [feeds[i].title for i in indexes],
+            [str(feeds[i].feed_url) for i in indexes],
+            [feeds[i].site_url for i in indexes],
+            [feeds[i].owner_uid for i in indexes],
+            cat_id
+        )
+
+
+async def insert_feeds_bulk(
+    conn: Connection,
+    feeds: List[FeedCreateRequest]
+) -> List[FeedInsertResult]:
     """
-    Retrieve all non-null entry links from the ttrss_entries table.
+    Insert a batch of feeds into the ttrss_feeds table in a few round trips.
+
+    The 'Sin clasificar' category is resolved once for the whole batch and
+    the rows are sent as arrays to a single `INSERT ... SELECT FROM unnest`
+    per chunk of `BULK_INSERT_CHUNK` feeds. Feeds already stored for the
+    same owner, or repeated inside the batch, are skipped with
+    `ON CONFLICT DO NOTHING` and reported as duplicates; feeds found in
+    `feed_url_cache` are not even sent to the database. A chunk that fails
+    is retried feed by feed, so only the offending feeds report an error.
 
     Args:
         conn (Connection): Active database connection.
+        feeds (List[FeedCreateRequest]): Data of the feeds to insert.
 
     Returns:
-        List[str]: A list of entry URLs from RSS feeds.
+        List[FeedInsertResult]: One outcome per input feed, in input order.
     """
-    rows = await conn.fetch(
-        "SELECT link FROM ttrss_entries WHERE link IS NOT NULL"
-    )
-    return [row["link"] for row in rows]
+    if not feeds:
+        return []
+
+    results = [
+        FeedInsertResult(feed_url=str(feed.feed_url), status="duplicate")
+        for feed in feeds
+    ]
+
+    # Keep the first occurrence of every (feed_url, owner) pair that is not
+    # already known to exist
+    unique = {}
+    for index, feed in enumerate(feeds):
+        key = (str(feed.feed_url), feed.owner_uid)
+        if key in unique:
+            continue
+        known = feed_url_cache.get(key)
+        if known is not None:
+            results[index].id = known['id']
+            continue
+        unique[key] = index
+    indexes = list(unique.values())
+    if not indexes:
+        return results
+
+    try:
+        cat_id = await get_default_category_id(conn, feeds[0].owner_uid)
+    except Exception as e:
+        for result in results:
+            result.status, result.detail = "error", str(e)
+        return results
+
+    for start in range(0, len(indexes), BULK_INSERT_CHUNK):
+        chunk = indexes[start:start + BULK_INSERT_CHUNK]
+        try:
+            rows = await _insert_feed_rows(conn, feeds, chunk, cat_id)
+        except Exception as e:
+            category_cache.invalidate(DEFAULT_CATEGORY)
+            if len(chunk) == 1:
+                results[chunk[0]].status = "error"
+                results[chunk[0]].detail = str(e)
+                continue
+            # Retry the feeds one by one so a single bad row does not fail
+            # the rest of its chunk
+            rows = []
+            for i in chunk:
+                try:
+                    rows.extend(
+                        await _insert_feed_rows(conn, feeds, [i], cat_id)
+                    )
+                except Exception as row_error:
+                    results[i].status = "error"
+                    results[i].detail = str(row_error)
+
+        for row in rows:
+            key = (row['feed_url'], row['owner_uid'])
+            i = unique[key]
+            results[i].status, results[i].id = "inserted", row['id']
+            feed_url_cache.set(key, dict(row))
+        if rows:
+            feed_page_cache.invalidate()
+
+    return results
+
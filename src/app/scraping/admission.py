@@ -0,0 +1,268 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module implements the admission control of the
+# responses downloaded by the spiders.
+#
+# Links do not always point to web pages: PDFs, images, archives, huge pages
+# or endless streams would otherwise be downloaded in full and handed to the
+# CSS selectors. `AdmissionMiddleware` decides at the download stage, from
+# the `headers_received` and `bytes_received` signals, before the body is
+# read:
+#
+# - every response is classified by its `Content-Type`, or by sniffing its
+#   first bytes when the header is missing or generic, as "html", "feed",
+#   "text", "document" (PDF, office files) or "binary" (images, including
+#   SVG, media, archives and any other type not listed);
+# - binary content is rejected at the headers, and so are the responses
+#   whose `Content-Length` exceeds the size cap of their category
+#   (`CONTENT_SIZE_LIMITS`); bodies without a length are aborted as soon as
+#   they outgrow the cap;
+# - documents found behind an article link are not downloaded with the
+#   articles: the request is aborted and parked in a separate low-priority
+#   queue, released `DOCUMENT_CONCURRENCY` at a time only when the spider
+#   has nothing else to download. Other requests reject documents.
+#
+# Aborted requests reach the errback with `meta["admission_status"]` set to
+# "rejected", "too_large" or "deferred".
+
+import os
+from collections import deque
+from typing import Deque, Optional
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider, StopDownload
+from app.utils.metrics import ADMISSION
+
+MIB = 2**20
+
+# Size caps of the response bodies, by category
+CONTENT_SIZE_LIMITS = {
+    "html": int(os.getenv("ADMISSION_HTML_MAX_BYTES", str(5 * MIB))),
+    "feed": int(os.getenv("ADMISSION_FEED_MAX_BYTES", str(10 * MIB))),
+    "text": int(os.getenv("ADMISSION_TEXT_MAX_BYTES", str(2 * MIB))),
+    "document": int(os.getenv("ADMISSION_DOCUMENT_MAX_BYTES", str(50 * MIB)))
+}
+
+# Deferred documents released at once when the spider is idle
+DOCUMENT_CONCURRENCY = int(os.getenv("ADMISSION_DOCUMENT_CONCURRENCY", "4"))
+
+# Categories admitted by every request, documents depend on the request
+PAGE_CATEGORIES = ("html", "feed", "text")
+
+# Only `process_request` runs in priority order, the admission itself runs
+# on signals. 565 sits between Scrapy's AjaxCrawlMiddleware (560) and
+# MetaRefreshMiddleware (580): two middlewares sharing a priority run in an
+# unspecified order
+ADMISSION_MIDDLEWARE = {
+    "app.scraping.admission.AdmissionMiddleware": 565
+}
+
+CONTENT_TYPES = {
+    "text/html": "html",
+    "application/xhtml+xml": "html",
+    "application/rss+xml": "feed",
+    "application/atom+xml": "feed",
+    "application/rdf+xml": "feed",
+    "application/x-rss+xml": "feed",
+    "application/x-atom+xml": "feed",
+    "application/feed+json": "feed",
+    "application/xml": "feed",
+    "text/xml": "feed",
+    "application/pdf": "document",
+    "application/msword": "document",
+    "application/rtf": "document",
+    "application/epub+zip": "document",
+    "application/vnd.ms-excel": "document",
+    "application/vnd.ms-powerpoint": "document"
+}
+
+DOCUMENT_PREFIXES = (
+    "application/vnd.openxmlformats-officedocument.",
+    "application/vnd.oasis.opendocument."
+)
+
+# Media types whose subtypes are all binary, `image/svg+xml` included
+BINARY_PREFIXES = ("image/", "audio/", "video/", "font/")
+
+# Content types that say nothing about the body, which is sniffed instead
+GENERIC_TYPES = ("", "application/octet-stream", "binary/octet-stream",
+                 "application/unknown")
+
+# Leading bytes of the formats recognised when sniffing
+MAGIC_NUMBERS = (
+    (b"%PDF-", "document"),
+    (b"{\\rtf", "document"),
+    (b"\xd0\xcf\x11\xe0", "document"),  # Legacy office files
+    (b"\x89PNG", "binary"),
+    (b"\xff\xd8\xff", "binary"),
+    (b"GIF8", "binary"),
+    (b"PK\x03\x04", "binary"),
+    (b"\x1f\x8b", "binary"),
+    (b"ID3", "binary"),
+    (b"OggS", "binary"),
+    (b"RIFF", "binary")
+)
+
+
+def classify_content_type(value: Optional[bytes]) -> Optional[str]:
+    """
+    Classify a response by its `Content-Type` header.
+
+    Args:
+        value (bytes, optional): The raw header value.
+
+    Returns:
+        Optional[str]: The category, or None if the header is missing or
+        generic and the body must be sniffed.
+    """
+    mime = (value or b"").split(b";", 1)[0].strip().lower()
+    mime = mime.decode("latin-1")
+    if mime in GENERIC_TYPES:
+        return None
+    if mime in CONTENT_TYPES:
+        return CONTENT_TYPES[mime]
+    if mime.startswith(BINARY_PREFIXES):
+        return "binary"
+    if mime.startswith(DOCUMENT_PREFIXES):
+        return "document"
+    if mime.startswith("text/"):
+        return "text"
+    # Feeds are only the types listed, other XML and JSON types are binary
+    return "binary"
+
+
+def sniff_content(data: bytes) -> str:
+    """
+    Classify a response by the first bytes of its body. Bodies of an
+    unknown format are taken as web pages, so the html cap still bounds
+    them.
+    """
+    for magic, category in MAGIC_NUMBERS:
+        if data.startswith(magic):
+            return category
+    head = data[:512].lstrip().lower()
+    if head.startswith(b"<svg") or (
+        head.startswith(b"<?xml") and b"<svg" in head
+    ):
+        return "binary"
+    if head.startswith((b"<?xml", b"<rss", b"<feed", b"<rdf:rdf")):
+        return "feed"
+    if head.startswith(b"{") and b"jsonfeed.org/version" in head:
+        return "feed"
+    return "html"
+
+
+class AdmissionMiddleware:
+    """
+    Scrapy downloader middleware admitting or aborting every response from
+    its headers and first bytes, and holding the queue of deferred
+    documents.
+
+    Requests created with `meta={"admission": "article"}` defer documents to
+    the low-priority queue, and `meta={"admission": "document"}` admits
+    them; other requests reject them.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.documents: Deque = deque()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler)
+        crawler.signals.connect(
+            middleware.on_headers, signal=signals.headers_received
+        )
+        crawler.signals.connect(
+            middleware.on_bytes, signal=signals.bytes_received
+        )
+        crawler.signals.connect(
+            middleware.on_idle, signal=signals.spider_idle
+        )
+        return middleware
+
+    def process_request(self, request, spider):
+        # Also enforced by the download handler, for bodies without signals
+        admitted = PAGE_CATEGORIES
+        if request.meta.get("admission") == "document":
+            admitted += ("document",)
+        request.meta.setdefault(
+            "download_maxsize",
+            max(CONTENT_SIZE_LIMITS[category] for category in admitted)
+        )
+        request.meta.pop("admission_category", None)
+        request.meta["admission_bytes"] = 0
+        return None
+
+    def on_headers(self, headers, body_length, request, spider) -> None:
+        category = classify_content_type(headers.get(b"Content-Type"))
+        encoding = headers.get(b"Content-Encoding", b"identity").lower()
+        if category is None and encoding != b"identity":
+            # A compressed body cannot be sniffed
+            category = "html"
+        if category is not None:
+            self.admit(request, category, body_length)
+
+    def on_bytes(self, data, request, spider) -> None:
+        meta = request.meta
+        if "admission_category" not in meta:
+            self.admit(request, sniff_content(data), -1)
+
+        meta["admission_bytes"] = meta.get("admission_bytes", 0) + len(data)
+        if meta["admission_bytes"] > CONTENT_SIZE_LIMITS.get(
+            meta["admission_category"], 0
+        ):
+            self.stop(request, "too_large")
+
+    def admit(self, request, category: str, body_length: int) -> None:
+        """
+        Admit a response of a category, or abort its download.
+
+        Args:
+            request (scrapy.Request): The request being downloaded.
+            category (str): The category of the response.
+            body_length (int): The announced body size, -1 if unknown.
+
+        Raises:
+            StopDownload: If the response is rejected, too large or
+            deferred.
+        """
+        request.meta["admission_category"] = category
+        profile = request.meta.get("admission")
+        if category == "binary":
+            self.stop(request, "rejected")
+        elif body_length > CONTENT_SIZE_LIMITS[category]:
+            self.stop(request, "too_large")
+        elif category == "document" and profile == "article":
+            self.defer(request)
+        elif category == "document" and profile != "document":
+            self.stop(request, "rejected")
+        ADMISSION.labels(category, "admitted").inc()
+
+    def defer(self, request) -> None:
+        meta = dict(request.meta, admission="document")
+        for key in ("admission_category", "admission_bytes",
+                    "download_maxsize"):
+            meta.pop(key, None)
+        self.documents.append(request.replace(meta=meta, dont_filter=True))
+        self.stop(request, "deferred")
+
+    def stop(self, request, status: str) -> None:
+        request.meta["admission_status"] = status
+        ADMISSION.labels(
+            request.meta.get("admission_category", "unknown"), status
+        ).inc()
+        raise StopDownload(fail=True)
+
+    def on_idle(self, spider) -> None:
+        if not self.documents:
+            return
+        for _ in range(min(DOCUMENT_CONCURRENCY, len(self.documents))):
+            self.crawler.engine.crawl(self.documents.popleft())
+        raise DontCloseSpider
@@ -0,0 +1,112 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module writes the scraped articles to the PostgreSQL
+# `articles` table (see `app.models.articles_db`), where they can be searched
+# with full-text queries.
+#
+# Articles are buffered and upserted in batches of `ARTICLE_BATCH_SIZE`, one
+# round trip per batch instead of one per article:
+#
+# - `ArticleWriter` is used by the continuous crawl, in the API process or a
+#   task worker, with the asyncpg pool of the application. A batch that
+#   fails is raised by `flush()`, so the crawl cycle fails with it;
+# - `ArticlePipeline` is the Scrapy item pipeline of the standalone dynamic
+#   spider, which has no event loop, and writes through psycopg2.
+
+import os
+from typing import Any, Dict, List
+import psycopg2
+from psycopg2.extras import execute_values
+from loguru import logger
+from app.db.session import DB_SETTINGS
+from app.utils.batch_writer import BatchWriter
+from app.utils.metrics import STAGE_SECONDS
+from app.models.articles_db import (
+    ARTICLES_TABLE_SQL,
+    UPSERT_ARTICLES_VALUES_SQL,
+    article_row,
+    upsert_articles
+)
+
+# Articles buffered before they are written in a single batch
+ARTICLE_BATCH_SIZE = int(os.getenv("ARTICLE_BATCH_SIZE", "200"))
+
+
+class ArticleWriter(BatchWriter[Dict[str, Any]]):
+    """
+    Buffers scraped articles and upserts them in batches through an asyncpg
+    pool, without blocking the caller. A batch that fails is raised by
+    `flush`.
+    """
+
+    def __init__(self, pool, batch_size: int = ARTICLE_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.pool = pool
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            async with self.pool.acquire() as conn:
+                with STAGE_SECONDS.labels("db_insert").time():
+                    await upsert_articles(conn, batch)
+        except Exception as e:
+            logger.error("Error writing {} articles: {}", len(batch), e)
+            raise
+
+
+class ArticlePipeline:
+    """
+    Scrapy item pipeline upserting the items of a standalone crawl into the
+    articles table in batches.
+    """
+
+    def __init__(self, batch_size: int = ARTICLE_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.conn = None
+        self.buffer: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.getint(
+            "ARTICLE_BATCH_SIZE", ARTICLE_BATCH_SIZE
+        ))
+
+    def open_spider(self, spider) -> None:
+        self.conn = psycopg2.connect(**DB_SETTINGS)
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(ARTICLES_TABLE_SQL)
+
+    def process_item(self, item, spider):
+        self.buffer.append(dict(item))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+        return item
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        # A statement may not upsert the same URL twice, keep the last item
+        rows = list({
+            row[0]: row for row in map(article_row, self.buffer)
+        }.values())
+        self.buffer = []
+        try:
+            with self.conn, self.conn.cursor() as cursor:
+                execute_values(
+                    cursor, UPSERT_ARTICLES_VALUES_SQL, rows,
+                    page_size=self.batch_size
+                )
+        except psycopg2.Error as e:
+            logger.error("Error writing {} articles: {}", len(rows), e)
+
+    def close_spider(self, spider) -> None:
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
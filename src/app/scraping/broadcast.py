@@ -0,0 +1,163 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: In-memory broadcast channel delivering the items scraped by
+# the crawl jobs to the clients of `/newsSpider/stream` as they are
+# produced.
+#
+# Every item is serialized to JSON once, when it is published, and the same
+# string is handed to every subscriber. Each subscriber has its own bounded
+# buffer of `STREAM_BUFFER_SIZE` items: publishing never waits, and when a
+# client reads slower than the crawl produces, its oldest buffered items are
+# dropped and counted, so a slow client never stalls the crawler nor the
+# other clients. The count of dropped items is reported to the client before
+# the next item it receives. Items are not persisted here, the result store
+# keeps every item for the clients that need all of them.
+
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+from app.utils.metrics import (
+    STREAM_DROPPED,
+    STREAM_PUBLISHED,
+    STREAM_SUBSCRIBERS
+)
+
+# Items buffered for a subscriber before the oldest ones are dropped
+STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", "1000"))
+
+# Maximum number of simultaneous subscribers
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", "100"))
+
+# Seconds between two keep-alive messages of an idle stream
+STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", "15"))
+
+
+class Subscription:
+    """
+    Bounded buffer of the items published to a single subscriber.
+    """
+
+    def __init__(self, channel: "BroadcastChannel", size: int):
+        self.channel = channel
+        self.buffer: Deque[str] = deque(maxlen=max(1, size))
+        self.dropped = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def push(self, message: str) -> None:
+        if len(self.buffer) == self.buffer.maxlen:
+            # The deque discards the oldest item itself
+            self.dropped += 1
+            STREAM_DROPPED.inc()
+        self.buffer.append(message)
+        self._ready.set()
+
+    async def get(
+        self,
+        timeout: Optional[float] = None
+    ) -> Tuple[Optional[str], int]:
+        """
+        Wait for the next item.
+
+        Args:
+            timeout (float, optional): Seconds to wait, forever if not given.
+
+        Returns:
+            Tuple[Optional[str], int]: The JSON of the item, or None on
+            timeout or once `finished`, and the number of items dropped
+            since the previous call.
+        """
+        if not self.buffer and not self.closed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        dropped, self.dropped = self.dropped, 0
+        message = self.buffer.popleft() if self.buffer else None
+        return message, dropped
+
+    @property
+    def finished(self) -> bool:
+        """
+        Whether the channel was closed and every buffered item was read.
+        """
+        return self.closed and not self.buffer
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.channel.unsubscribe(self)
+
+
+class BroadcastChannel:
+    """
+    Publishes every item to all the current subscribers, without waiting.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+        max_subscribers: int = STREAM_MAX_SUBSCRIBERS
+    ):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[Subscription] = set()
+        self.closed = False
+
+    def subscribe(self, buffer_size: Optional[int] = None) -> Subscription:
+        """
+        Register a new subscriber, receiving the items published from now
+        on. Use the subscription as a context manager to unsubscribe.
+
+        Raises:
+            RuntimeError: If the channel is closed or has reached
+            `max_subscribers`.
+        """
+        if self.closed:
+            raise RuntimeError("The broadcast channel is closed")
+        if len(self.subscribers) >= self.max_subscribers:
+            raise RuntimeError("Too many stream subscribers")
+        subscription = Subscription(self, buffer_size or self.buffer_size)
+        self.subscribers.add(subscription)
+        STREAM_SUBSCRIBERS.set(len(self.subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+        STREAM_SUBSCRIBERS.set(len(self.subscribers))
+
+    def publish(self, item: Dict[str, Any]) -> None:
+        """
+        Hand an item to every subscriber. Must be called from the event
+        loop.
+        """
+        if not self.subscribers:
+            return
+        message = json.dumps(item, ensure_ascii=False)
+        for subscription in self.subscribers:
+            subscription.push(message)
+        STREAM_PUBLISHED.inc()
+
+    def close(self) -> None:
+        """
+        End every subscription once its buffer is read, used when the
+        application stops.
+        """
+        self.closed = True
+        for subscription in self.subscribers:
+            subscription.close()
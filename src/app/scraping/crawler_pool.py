@@ -0,0 +1,735 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module implements a pool of long-lived Scrapy crawler
+# worker processes.
+#
+# Starting a `CrawlerProcess` in a fresh child for every crawl cycle means
+# importing Scrapy/Twisted, starting a reactor and pickling the whole URL list
+# each time. Instead, every worker of the `CrawlerPool` keeps one reactor and
+# one never-closing `PoolSpider` alive and receives batches of URLs through
+# its own task queue. Because the crawler is never torn down, its DNS cache
+# and persistent HTTP connection pool are reused across batches.
+#
+# Article pages are fetched conditionally (see `app.scraping.http_cache`):
+# pages answered with 304 are reported as "not_modified" without extraction.
+# The indicators of compromise of every article (see
+# `app.scraping.indicators`) are extracted by the worker, in parallel with
+# the other workers. With `RESPONSE_ARCHIVE_ENABLED`, every worker also
+# archives the raw article pages it downloads (see
+# `app.scraping.response_archive`).
+#
+# Responses are admitted from their headers and first bytes (see
+# `app.scraping.admission`): binary content and oversized bodies are aborted
+# early and reported as "rejected" or "too_large", and documents such as PDFs
+# are downloaded from a low-priority queue once the worker has no article
+# left to fetch, then reported as "document" without extraction.
+#
+# Each worker reports back through a pipe: the outcome of every link, the
+# scraped items, the feed links found on a page (declared feeds and feed-like
+# links to probe, see `app.scraping.feed_discovery`) and the completion of a
+# batch together with its conditional-fetch counters.
+# A reader thread in the API process dispatches those messages to the
+# coroutine awaiting `CrawlerPool.crawl()`, or `CrawlerPool.crawl_stream()`
+# which feeds the workers from an asynchronous iterator of URL batches
+# without ever holding the whole URL list. Dead workers are respawned and
+# the unfinished links of their batches are reported as failed.
+#
+# Every worker records its metrics (pages and bytes per host, download and
+# parse latency) in its own registry, emptied on start of the counts it
+# inherits from the API process, and sends them with every finished batch
+# and once more when it exits; the reader thread merges them into the
+# registry of the API process.
+#
+# Every host is always crawled by the same worker, so the per-host delays of
+# `app.scraping.politeness` hold across the whole pool, and the hosts of a
+# worker are interleaved inside its batches.
+
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from multiprocessing import Pipe, Process, Queue
+from multiprocessing.connection import wait
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+from urllib.parse import urlsplit
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.exceptions import DontCloseSpider
+from scrapy.http import Request, TextResponse
+from scrapy.spiders import Spider
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.log import configure_logging
+from twisted.internet import threads
+from loguru import logger
+from app.scraping.admission import ADMISSION_MIDDLEWARE
+from app.scraping.http_cache import ConditionalFetchStats
+from app.scraping.politeness import (
+    POLITENESS_MIDDLEWARE,
+    POLITENESS_SETTINGS,
+    PolitenessMiddleware
+)
+from app.scraping.feed_discovery import page_feed_links
+from app.scraping.dedup import fingerprint_item
+from app.scraping.indicators import get_indicator_extractor
+from app.scraping.response_archive import ARCHIVE_SETTINGS
+from app.scraping.spider_factory import extract_article
+from app.utils.metrics import (
+    PAGES,
+    REGISTRY,
+    RESPONSE_BYTES,
+    STAGE_SECONDS,
+    WORKER_LIFETIME,
+    WORKER_RESTARTS
+)
+
+# Number of worker processes, defaults to one per available core
+POOL_SIZE = int(os.getenv("CRAWLER_POOL_SIZE", str(os.cpu_count() or 1)))
+
+# Number of URLs sent to a worker in a single batch
+BATCH_SIZE = int(os.getenv("CRAWLER_BATCH_SIZE", "100"))
+
+# Batches a worker may hold at once, so it never idles between two batches
+MAX_INFLIGHT_BATCHES = 2
+
+# Full batches queued for a busy worker by a streamed crawl, beyond which
+# the source is no longer read until the worker takes one
+QUEUED_BATCHES = int(os.getenv("CRAWLER_QUEUED_BATCHES", "4"))
+
+# Seconds a closing worker is given to finish before being terminated
+SHUTDOWN_TIMEOUT = 10
+
+CRAWLER_SETTINGS = {
+    "LOG_ENABLED": False,
+    "USER_AGENT": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36"
+    ),
+    **POLITENESS_SETTINGS,  # Per-host delays, robots.txt and Retry-After
+    **ARCHIVE_SETTINGS,  # Raw article pages, when enabled
+    "RETRY_ENABLED": True,
+    "RETRY_TIMES": 5,  # Retry failed requests up to 5 times
+    "RETRY_HTTP_CODES": [429, 500, 502, 503, 504],
+    "DNSCACHE_ENABLED": True,  # Shared by every batch of the worker
+    "DNSCACHE_SIZE": 50000,
+    "REACTOR_THREADPOOL_MAXSIZE": 20,
+    "DOWNLOADER_MIDDLEWARES": {
+        "app.scraping.http_cache.ConditionalFetchMiddleware": 585,
+        **ADMISSION_MIDDLEWARE,
+        **POLITENESS_MIDDLEWARE
+    }
+}
+
+
+def scrape_article(response) -> Tuple[Dict[str, Any], str]:
+    """
+    Extracts an article page into a scraped item with its near-duplicate
+    fingerprint and indicators of compromise.
+
+    Args:
+        response (scrapy.http.Response): The downloaded or archived page.
+
+    Returns:
+        Tuple[Dict[str, Any], str]: The scraped item and the hash of its
+        text content.
+    """
+    with STAGE_SECONDS.labels("parse").time():
+        data, content_hash = extract_article(response)
+        data["simhash"] = fingerprint_item(data)
+        get_indicator_extractor().process(data)
+    return data, content_hash
+
+
+class PoolSpider(Spider):
+    """
+    Never-closing spider run by a crawler worker.
+
+    The spider pulls batches of `(batch_id, kind, urls, full)` from its task
+    queue
+    in a reactor thread and schedules them on the running engine. A `None`
+    batch stops the worker once the in-flight batches are finished.
+    """
+    name = "pool_spider"
+
+    def __init__(self, worker_id, tasks, conn, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.worker_id = worker_id
+        self.tasks = tasks
+        self.conn = conn
+        self.pending: Dict[int, int] = {}
+        self.cache_stats: Dict[int, ConditionalFetchStats] = {}
+        self.waiting = False
+        self.stopping = False
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.on_idle, signal=signals.spider_idle)
+        crawler.signals.connect(
+            spider.on_dropped, signal=signals.request_dropped
+        )
+        crawler.signals.connect(
+            spider.on_response, signal=signals.response_received
+        )
+        return spider
+
+    @property
+    def politeness(self) -> PolitenessMiddleware:
+        downloader = self.crawler.engine.downloader
+        for middleware in downloader.middleware.middlewares:
+            if isinstance(middleware, PolitenessMiddleware):
+                return middleware
+        raise RuntimeError("PolitenessMiddleware is not enabled")
+
+    def start_requests(self):
+        self.fetch_batch()
+        return iter(())
+
+    def fetch_batch(self) -> None:
+        if self.waiting or self.stopping:
+            return
+        if len(self.pending) >= MAX_INFLIGHT_BATCHES:
+            return
+        self.waiting = True
+        threads.deferToThread(self.tasks.get).addCallback(self.on_batch)
+
+    def on_batch(self, batch) -> None:
+        self.waiting = False
+        if batch is None:
+            self.stopping = True
+            return
+
+        batch_id, kind, urls, full = batch
+        if not urls:
+            self.conn.send(("done", batch_id, None))
+            self.fetch_batch()
+            return
+
+        if kind == "dynamic":
+            # A full crawl downloads and extracts every page again
+            callback = self.parse_article
+            conditional = "off" if full else None
+        else:
+            # Discovery pages are always downloaded in full
+            callback, conditional = self.parse_feeds, "off"
+
+        self.pending[batch_id] = len(urls)
+        self.cache_stats[batch_id] = ConditionalFetchStats()
+        for url in urls:
+            self.crawler.engine.crawl(Request(
+                url,
+                callback=callback,
+                errback=self.on_error,
+                dont_filter=True,
+                meta={
+                    "batch_id": batch_id,
+                    "link": url,
+                    "conditional": conditional,
+                    "archive": kind == "dynamic",
+                    "admission": "article" if kind == "dynamic" else None
+                }
+            ))
+        self.fetch_batch()
+
+    def on_response(self, response, request, spider) -> None:
+        domain = urlparse_cached(request).hostname or ""
+        RESPONSE_BYTES.labels(domain).inc(len(response.body))
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            STAGE_SECONDS.labels("download").observe(latency)
+
+    def settle(
+        self,
+        request,
+        status,
+        content_hash=None,
+        validators=None
+    ) -> None:
+        batch_id = request.meta["batch_id"]
+        PAGES.labels(urlparse_cached(request).hostname or "", status).inc()
+        self.conn.send(("link", batch_id, {
+            "link": request.meta["link"],
+            "status": status,
+            "content_hash": content_hash,
+            "validators": validators
+        }))
+        self.cache_stats[batch_id].record(
+            request.meta.get("conditional"), request.meta.get("bytes_saved", 0)
+        )
+
+        self.pending[batch_id] -= 1
+        if self.pending[batch_id] == 0:
+            del self.pending[batch_id]
+            stats = self.cache_stats.pop(batch_id)
+            self.conn.send(("done", batch_id, {
+                "cache": stats.to_dict(),
+                "domains": self.politeness.drain_touched(),
+                "metrics": REGISTRY.drain()
+            }))
+            self.fetch_batch()
+
+    def parse_article(self, response):
+        if response.status == 304:
+            self.settle(response.request, "not_modified")
+            return
+        if not isinstance(response, TextResponse):
+            # A deferred document, archived but not extracted
+            self.settle(response.request, "document",
+                        hashlib.sha256(response.body).hexdigest())
+            return
+        try:
+            data, content_hash = scrape_article(response)
+        except Exception:
+            self.settle(response.request, "failed")
+            return
+        self.conn.send(("item", response.meta["batch_id"], data))
+        # Stored by the API process once the item is persisted
+        self.settle(response.request, "ok", content_hash,
+                    response.meta.get("validators"))
+
+    def parse_feeds(self, response):
+        try:
+            with STAGE_SECONDS.labels("parse").time():
+                declared, candidates = page_feed_links(response)
+        except Exception:
+            self.settle(response.request, "failed")
+            return
+        if declared or candidates:
+            self.conn.send(("feeds", response.meta["batch_id"], {
+                "link": response.meta["link"],
+                "declared": declared,
+                "candidates": candidates
+            }))
+        self.settle(response.request, "ok")
+
+    def on_error(self, failure) -> None:
+        status = failure.request.meta.get("admission_status")
+        if status == "deferred":
+            # Settled once the document is downloaded from the low-priority
+            # queue
+            return
+        self.settle(failure.request, status or "failed")
+
+    def on_dropped(self, request, spider) -> None:
+        if "batch_id" in request.meta:
+            self.settle(request, "failed")
+
+    def on_idle(self, spider) -> None:
+        if not self.stopping or self.pending:
+            raise DontCloseSpider
+
+
+def run_crawler_worker(worker_id, tasks, conn) -> None:
+    """
+    Entry point of a crawler worker process.
+
+    Configures logging and runs a single `PoolSpider` in a `CrawlerProcess`
+    until a `None` batch is received.
+
+    Args:
+        worker_id (int): Identifier of the worker inside the pool.
+        tasks (Queue): Queue from which URL batches are received.
+        conn (Connection): Pipe end used to report results to the API.
+    """
+    # Forked from the API process: its counts are not ours to report
+    REGISTRY.reset()
+    configure_logging(install_root_handler=False)
+    logging.getLogger('scrapy').propagate = False
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    try:
+        process = CrawlerProcess(settings=CRAWLER_SETTINGS)
+        process.crawl(
+            PoolSpider, worker_id=worker_id, tasks=tasks, conn=conn
+        )
+        process.start()
+    finally:
+        # Counts of the batches left unfinished, which no "done" carries
+        try:
+            conn.send(("metrics", None, REGISTRY.drain()))
+        except (OSError, ValueError):
+            pass
+        conn.close()
+
+
+class _Batch:
+    """
+    A batch of URLs handed to a worker, tracked until every link settles.
+    """
+
+    def __init__(self, batch_id, worker_id, urls, on_message, future):
+        self.batch_id = batch_id
+        self.worker_id = worker_id
+        self.pending = set(urls)
+        self.on_message = on_message
+        self.future = future
+
+
+class _Worker:
+    """
+    API-side handle of a crawler worker process.
+    """
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.tasks = Queue()
+        self.conn, child_conn = Pipe(duplex=False)
+        self.process = Process(
+            target=run_crawler_worker,
+            args=(worker_id, self.tasks, child_conn),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.inflight = 0
+        self.started_at = time.monotonic()
+
+
+class CrawlerPool:
+    """
+    Pool of persistent crawler worker processes fed with batches of URLs.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, batch_size: int = BATCH_SIZE):
+        self.size = max(1, size)
+        self.batch_size = max(1, batch_size)
+        self._workers: Dict[int, _Worker] = {}
+        self._batches: Dict[int, _Batch] = {}
+        self._batch_ids = itertools.count(1)
+        self.domains: Dict[str, Dict[str, Any]] = {}
+        self._capacity = asyncio.Event()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._closing = False
+
+    def start(self) -> None:
+        """
+        Spawn the worker processes and the thread reading their results.
+        Must be called from the running event loop.
+        """
+        self._loop = asyncio.get_running_loop()
+        for worker_id in range(self.size):
+            self._spawn(worker_id)
+        self._reader = threading.Thread(
+            target=self._read_results, name="crawler-pool-reader", daemon=True
+        )
+        self._reader.start()
+        logger.info("Crawler pool started with {} workers", self.size)
+
+    def _spawn(self, worker_id: int) -> None:
+        with self._lock:
+            self._workers[worker_id] = _Worker(worker_id)
+        self._capacity.set()
+
+    def _read_results(self) -> None:
+        closed = set()
+        while not self._closing:
+            with self._lock:
+                conns = {w.conn: w.worker_id for w in self._workers.values()
+                         if w.conn not in closed}
+            if not conns:
+                time.sleep(0.5)
+                continue
+            for conn in wait(list(conns), timeout=0.5):
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    closed.add(conn)
+                    message = ("exit", None, None)
+                self._loop.call_soon_threadsafe(
+                    self._dispatch, conns[conn], message
+                )
+
+    def _dispatch(self, worker_id: int, message) -> None:
+        kind, batch_id, payload = message
+        if kind == "exit":
+            asyncio.create_task(self._on_worker_exit(worker_id))
+            return
+
+        if kind == "metrics":
+            # Sent by an exiting worker
+            REGISTRY.merge(payload)
+            return
+        if kind == "done" and payload:
+            # Merged even when the batch was aborted meanwhile
+            REGISTRY.merge(payload.get("metrics", {}))
+
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return
+        if kind == "done":
+            if payload:
+                self.domains.update(payload.get("domains", {}))
+                batch.on_message("stats", payload)
+            self._finish(batch)
+            return
+        if kind == "link":
+            batch.pending.discard(payload["link"])
+        batch.on_message(kind, payload)
+
+    def _finish(self, batch: _Batch) -> None:
+        self._batches.pop(batch.batch_id, None)
+        worker = self._workers.get(batch.worker_id)
+        if worker is not None:
+            worker.inflight -= 1
+        if not batch.future.done():
+            batch.future.set_result(None)
+        self._capacity.set()
+
+    async def _on_worker_exit(self, worker_id: int) -> None:
+        with self._lock:
+            worker = self._workers.pop(worker_id)
+
+        # Links the worker never settled are reported as failed
+        for batch in [b for b in self._batches.values()
+                      if b.worker_id == worker_id]:
+            for link in batch.pending:
+                batch.on_message("link", {
+                    "link": link, "status": "failed", "content_hash": None
+                })
+            self._finish(batch)
+
+        worker.conn.close()
+        worker.tasks.cancel_join_thread()
+        worker.tasks.close()
+        await asyncio.to_thread(worker.process.join)
+        WORKER_LIFETIME.observe(time.monotonic() - worker.started_at)
+
+        if not self._closing:
+            WORKER_RESTARTS.inc()
+            logger.warning("Crawler worker {} exited, respawning", worker_id)
+            self._spawn(worker_id)
+
+    async def _acquire_worker(self, worker_id: int) -> _Worker:
+        while True:
+            worker = self._workers.get(worker_id)
+            if worker is not None and worker.inflight < MAX_INFLIGHT_BATCHES:
+                return worker
+            self._capacity.clear()
+            await self._capacity.wait()
+
+    def _partition(self, urls: List[str]) -> Dict[int, List[str]]:
+        """
+        Assign every host to a single worker, so its politeness delay is
+        enforced by one downloader, and interleave the hosts of each worker
+        so every batch spreads over as many hosts as possible.
+        """
+        hosts: Dict[str, List[str]] = defaultdict(list)
+        for url in urls:
+            hosts[urlsplit(url).hostname or ""].append(url)
+
+        shards: Dict[int, List[List[str]]] = defaultdict(list)
+        for host, host_urls in hosts.items():
+            shards[zlib.crc32(host.encode("utf8")) % self.size].append(
+                host_urls
+            )
+        return {
+            worker_id: [url for round_ in itertools.zip_longest(*queues)
+                        for url in round_ if url is not None]
+            for worker_id, queues in shards.items()
+        }
+
+    async def _submit(
+        self,
+        worker_id: int,
+        kind: str,
+        urls: List[str],
+        on_message: Callable[[str, Any], None],
+        batches: List[_Batch],
+        full: bool = False
+    ) -> None:
+        for start in range(0, len(urls), self.batch_size):
+            chunk = urls[start:start + self.batch_size]
+            worker = await self._acquire_worker(worker_id)
+            batch = _Batch(
+                next(self._batch_ids), worker_id, chunk,
+                on_message, self._loop.create_future()
+            )
+            self._batches[batch.batch_id] = batch
+            worker.inflight += 1
+            worker.tasks.put((batch.batch_id, kind, chunk, full))
+            batches.append(batch)
+
+    async def crawl(
+        self,
+        kind: str,
+        urls: List[str],
+        on_message: Callable[[str, Any], None],
+        full: bool = False
+    ) -> None:
+        """
+        Crawl a list of URLs on the pool and wait until every link settles.
+
+        All the URLs of a host are crawled by the same worker (see
+        `_partition`), so the per-host delays hold across the whole pool.
+
+        Args:
+            kind (str): "dynamic" to scrape articles, "rss" to discover feeds.
+            urls (List[str]): The URLs to crawl.
+            on_message (Callable): Called with `(kind, payload)` for every
+            message of the crawl: "link" outcomes, scraped "item"s,
+            discovered "feeds" and per-batch "stats".
+            full (bool): Fetch the articles unconditionally, so unchanged
+            pages are extracted again.
+
+        Raises:
+            asyncio.CancelledError: If the crawl is cancelled, the workers
+            running its batches are terminated and respawned.
+        """
+        async def batches() -> AsyncIterator[List[str]]:
+            yield urls
+
+        await self.crawl_stream(kind, batches(), on_message, full)
+
+    async def _feed(
+        self,
+        worker_id: int,
+        kind: str,
+        chunks: asyncio.Queue,
+        on_message: Callable[[str, Any], None],
+        batches: List[_Batch],
+        full: bool = False
+    ) -> None:
+        # Hands the queued batches of a worker to it as it frees capacity,
+        # until the `None` closing the queue
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                return
+            await self._submit(
+                worker_id, kind, chunk, on_message, batches, full
+            )
+
+    async def crawl_stream(
+        self,
+        kind: str,
+        sources: AsyncIterator[List[str]],
+        on_message: Callable[[str, Any], None],
+        full: bool = False
+    ) -> None:
+        """
+        Crawl the URLs of an asynchronous iterator of batches, e.g. pages of
+        rows read from a database, and wait until every link settles.
+
+        The URLs of every source batch are partitioned between the workers
+        and cut into full batches, queued for their worker and sent to it as
+        soon as it has capacity; the remainder of each worker is sent once
+        `sources` is exhausted. A busy worker does not hold the others back:
+        the next source batch is pulled as long as no worker has more than
+        `QUEUED_BATCHES` batches waiting, so at most that many batches per
+        worker and a partial batch per worker are held here, whatever the
+        number of URLs.
+
+        Args:
+            kind (str): "dynamic" to scrape articles, "rss" to discover feeds.
+            sources (AsyncIterator[List[str]]): The batches of URLs to crawl.
+            on_message (Callable): Called with `(kind, payload)` for every
+            message of the crawl, see `crawl`.
+            full (bool): Fetch the articles unconditionally, see `crawl`.
+
+        Raises:
+            asyncio.CancelledError: If the crawl is cancelled, the workers
+            running its batches are terminated and respawned.
+        """
+        batches: List[_Batch] = []
+        pending: Dict[int, List[str]] = defaultdict(list)
+        queues: Dict[int, asyncio.Queue] = {}
+        feeders: List[asyncio.Task] = []
+
+        def queue(worker_id: int) -> asyncio.Queue:
+            if worker_id not in queues:
+                queues[worker_id] = asyncio.Queue(maxsize=QUEUED_BATCHES)
+                feeders.append(asyncio.create_task(self._feed(
+                    worker_id, kind, queues[worker_id], on_message, batches,
+                    full
+                )))
+            return queues[worker_id]
+
+        try:
+            async for urls in sources:
+                for worker_id, shard in self._partition(urls).items():
+                    shard = pending.pop(worker_id, []) + shard
+                    cut = len(shard) - len(shard) % self.batch_size
+                    for start in range(0, cut, self.batch_size):
+                        await queue(worker_id).put(
+                            shard[start:start + self.batch_size]
+                        )
+                    if cut < len(shard):
+                        pending[worker_id] = shard[cut:]
+                # Only the unfinished batches are kept for `_abort`
+                batches[:] = [b for b in batches if not b.future.done()]
+            for worker_id, shard in pending.items():
+                await queue(worker_id).put(shard)
+            for chunks in queues.values():
+                await chunks.put(None)
+            await asyncio.gather(*feeders)
+            await asyncio.gather(*(batch.future for batch in batches))
+        except asyncio.CancelledError:
+            self._abort(batches)
+            raise
+        finally:
+            for feeder in feeders:
+                feeder.cancel()
+
+    def alive_workers(self) -> int:
+        """
+        Return the number of worker processes currently running.
+        """
+        with self._lock:
+            workers = list(self._workers.values())
+        return sum(worker.process.is_alive() for worker in workers)
+
+    def domain_stats(self) -> List[Dict[str, Any]]:
+        """
+        Return the latest politeness state reported for every host, most
+        requested first.
+        """
+        return sorted(self.domains.values(),
+                      key=lambda domain: domain["requests"], reverse=True)
+
+    def _abort(self, batches: List[_Batch]) -> None:
+        worker_ids = set()
+        for batch in batches:
+            if self._batches.pop(batch.batch_id, None) is not None:
+                worker_ids.add(batch.worker_id)
+        for worker_id in worker_ids:
+            worker = self._workers.get(worker_id)
+            if worker is not None:
+                logger.warning("Terminating crawler worker {}", worker_id)
+                worker.process.terminate()
+
+    async def close(self) -> None:
+        """
+        Stop every worker once its in-flight batches are done.
+        """
+        self._closing = True
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.tasks.put(None)
+        for worker in workers:
+            await asyncio.to_thread(worker.process.join, SHUTDOWN_TIMEOUT)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if self._reader is not None:
+            await asyncio.to_thread(self._reader.join, 1)
+        logger.info("Crawler pool closed.")
@@ -0,0 +1,297 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module implements near-duplicate detection of scraped
+# articles.
+#
+# The paragraph text of every item is fingerprinted with a 64-bit SimHash
+# over word 3-shingles: copies of an article (the same post under
+# `/comment-page-1/`, syndicated copies on other sites) get fingerprints that
+# differ in a few bits only. Fingerprints are kept in a persistent SQLite
+# index split in four 16-bit bands. Two fingerprints at a Hamming distance of
+# at most 3 share at least one band, so a lookup is four indexed point
+# queries whatever the size of the corpus, and the index lives on disk rather
+# than in memory.
+#
+# `DEDUP_MODE` selects what happens to a near-duplicate: "tag" (default) adds
+# a `duplicate_of` field with the URL of the first copy, "drop" discards it
+# before it is stored and "off" disables the detection.
+#
+# The continuous crawl checks its items `DEDUP_BATCH_SIZE` at a time with
+# `process_many`, one SQLite transaction per batch run off the event loop.
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from scrapy.exceptions import DropItem
+
+# Local index holding the fingerprint of every stored article
+DEDUP_DB = os.getenv("DEDUP_DB", "data/near_duplicates.sqlite3")
+
+# "tag", "drop" or "off"
+DEDUP_MODE = os.getenv("DEDUP_MODE", "tag")
+
+# Maximum number of differing bits between two near-duplicate fingerprints
+DEDUP_DISTANCE = 3
+
+# Scraped items checked against the index in one transaction
+DEDUP_BATCH_SIZE = int(os.getenv("DEDUP_BATCH_SIZE", "100"))
+
+# Articles with fewer words are too short for a reliable fingerprint
+DEDUP_MIN_WORDS = int(os.getenv("DEDUP_MIN_WORDS", "40"))
+
+SHINGLE_SIZE = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+
+_WORD = re.compile(r"\w+")
+
+# `_BIT[j]` maps every byte value to its j-th bit, so counting the features
+# having a given bit set is a `bytes.translate` plus a `count`, both in C
+_BIT = [bytes((value >> j) & 1 for value in range(256)) for j in range(8)]
+
+
+def simhash(words: Iterable[str]) -> Optional[int]:
+    """
+    Compute the 64-bit SimHash of a sequence of words.
+
+    Args:
+        words (Iterable[str]): The lowercased words of the text.
+
+    Returns:
+        Optional[int]: The fingerprint, or None if the text is too short.
+    """
+    words = list(words)
+    if len(words) < max(DEDUP_MIN_WORDS, SHINGLE_SIZE):
+        return None
+
+    shingles = {
+        " ".join(words[i:i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+    digests = b"".join([
+        hashlib.blake2b(shingle.encode("utf8"), digest_size=8).digest()
+        for shingle in shingles
+    ])
+
+    fingerprint = 0
+    half = len(shingles) / 2
+    for index in range(8):
+        column = digests[index::8]
+        for j in range(8):
+            if column.translate(_BIT[j]).count(1) > half:
+                fingerprint |= 1 << (index * 8 + j)
+    return fingerprint
+
+
+def fingerprint_item(item: Dict[str, Any]) -> Optional[str]:
+    """
+    Fingerprint the paragraph text of a scraped item.
+
+    Returns:
+        Optional[str]: The SimHash as 16 hex digits, or None if the item has
+        too little text.
+    """
+    text = " ".join(item.get("p", [])).lower()
+    fingerprint = simhash(_WORD.findall(text))
+    return None if fingerprint is None else f"{fingerprint:016x}"
+
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class NearDuplicateIndex:
+    """
+    Persistent SimHash index answering "has a near-identical article already
+    been stored?" in constant time per item. Safe to use from several
+    threads, one at a time.
+    """
+
+    def __init__(self, path: str = DEDUP_DB, mode: str = DEDUP_MODE):
+        self.path = path
+        self.mode = mode
+        self.duplicates = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None,
+                check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    url TEXT PRIMARY KEY,
+                    fingerprint INTEGER NOT NULL,
+                    band0 INTEGER NOT NULL,
+                    band1 INTEGER NOT NULL,
+                    band2 INTEGER NOT NULL,
+                    band3 INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            for band in range(BANDS):
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS fingerprints_band{band} "
+                    f"ON fingerprints (band{band})"
+                )
+        return self._conn
+
+    def find(self, url: str, fingerprint: int) -> Optional[str]:
+        """
+        Look for a stored article, other than `url`, whose fingerprint is
+        within `DEDUP_DISTANCE` bits of the given one.
+
+        Returns:
+            Optional[str]: The URL of that article, or None.
+        """
+        bands = [
+            (fingerprint >> (band * BAND_BITS)) & 0xFFFF
+            for band in range(BANDS)
+        ]
+        rows = self.conn.execute(
+            " UNION ".join(
+                "SELECT url, fingerprint FROM fingerprints "
+                f"WHERE band{band} = ?"
+                for band in range(BANDS)
+            ),
+            bands
+        )
+        for other_url, other in rows:
+            if other_url == url:
+                continue
+            if bin((other & (2**64 - 1)) ^ fingerprint).count("1") \
+                    <= DEDUP_DISTANCE:
+                return other_url
+        return None
+
+    def add(self, url: str, fingerprint: int) -> None:
+        bands = [
+            (fingerprint >> (band * BAND_BITS)) & 0xFFFF
+            for band in range(BANDS)
+        ]
+        self.conn.execute("""
+            INSERT INTO fingerprints (
+                url, fingerprint, band0, band1, band2, band3, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (url) DO UPDATE
+            SET fingerprint = excluded.fingerprint,
+                band0 = excluded.band0,
+                band1 = excluded.band1,
+                band2 = excluded.band2,
+                band3 = excluded.band3
+        """, (url, _signed(fingerprint), *bands, time.time()))
+
+    def process(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Check a scraped item against the index, applying `DEDUP_MODE`.
+
+        Items without a `simhash` field are fingerprinted here. Unique items
+        are added to the index; near-duplicates are tagged with
+        `duplicate_of` or dropped.
+
+        Args:
+            item (Dict[str, Any]): The scraped item.
+
+        Returns:
+            Optional[Dict[str, Any]]: The item to store, or None if it was
+            dropped.
+        """
+        return self.process_many([item])[0]
+
+    def process_many(
+        self,
+        items: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Check several items, in order, in a single transaction, see
+        `process`. Blocking, run it off the event loop.
+
+        Args:
+            items (List[Dict[str, Any]]): The scraped items.
+
+        Returns:
+            List[Optional[Dict[str, Any]]]: One result per item, None for
+            the dropped ones.
+        """
+        if self.mode == "off" or not items:
+            return list(items)
+
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN")
+            try:
+                results = [self._check(item) for item in items]
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return results
+
+    def _check(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if "simhash" not in item:
+            item["simhash"] = fingerprint_item(item)
+        if item["simhash"] is None:
+            return item
+
+        fingerprint = int(item["simhash"], 16)
+        original = self.find(item["url"], fingerprint)
+        if original is None:
+            self.add(item["url"], fingerprint)
+            return item
+
+        self.duplicates += 1
+        if self.mode == "drop":
+            return None
+        item["duplicate_of"] = original
+        return item
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class NearDuplicatePipeline:
+    """
+    Scrapy item pipeline applying a `NearDuplicateIndex` to the items of a
+    standalone crawl.
+    """
+
+    def __init__(self, index: NearDuplicateIndex):
+        self.index = index
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(NearDuplicateIndex(
+            crawler.settings.get("DEDUP_DB", DEDUP_DB),
+            crawler.settings.get("DEDUP_MODE", DEDUP_MODE)
+        ))
+
+    def process_item(self, item, spider):
+        if self.index.process(item) is None:
+            raise DropItem(f"Near-duplicate article: {item['url']}")
+        return item
+
+    def close_spider(self, spider) -> None:
+        self.index.close()
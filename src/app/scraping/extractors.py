@@ -0,0 +1,173 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module implements the content extractors used by the
+# news spider to turn an article page into a scraped item.
+#
+# Extractors work on the lxml tree of the page (for Scrapy responses, the tree
+# already parsed by `response.selector`) and return a dictionary with the
+# page title and the text of its h1–h6 headings and paragraphs. They are
+# registered by name with `@register_extractor`, and `ARTICLE_EXTRACTOR`
+# selects the one used by the spiders:
+#
+# - "legacy": one `//tag/text()` query per tag, as the spider used to do.
+#   Every query walks the whole document and only direct text nodes are kept,
+#   so paragraphs containing links come out fragmented.
+# - "single_pass": collects the title, headings and paragraphs in one walk
+#   over the tree, keeping the full text of every element.
+# - "boilerplate": like "single_pass", but skips navigation, site banners,
+#   footers, sidebars, comment sections and similar page chrome. `<header>`
+#   is kept, since articles often hold their h1 in one.
+
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict
+from lxml import etree
+
+# Name of the extractor used by the news spider
+ARTICLE_EXTRACTOR = os.getenv("ARTICLE_EXTRACTOR", "single_pass")
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+TEXT_TAGS = HEADING_TAGS + ("p",)
+
+# Elements never holding article content
+BOILERPLATE_TAGS = frozenset((
+    "nav", "footer", "aside", "form", "script", "style",
+    "noscript", "template", "button", "select", "iframe"
+))
+
+# Class or id values marking page chrome rather than article content
+BOILERPLATE_PATTERN = re.compile(
+    r"\b(nav|navbar|menu|breadcrumbs?|sidebar|widget|footer|banner|"
+    r"cookies?|consent|share|sharing|social|related|comments?|respond|"
+    r"subscribe|newsletter|advert|ads?|promo|popup|modal)\b",
+    re.IGNORECASE
+)
+
+Extractor = Callable[[Any], Dict[str, Any]]
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(name: str) -> Callable[[Extractor], Extractor]:
+    """
+    Decorator registering a content extractor under the given name.
+
+    Args:
+        name (str): Name used to select the extractor.
+    """
+    def decorator(func: Extractor) -> Extractor:
+        EXTRACTORS[name] = func
+        return func
+    return decorator
+
+
+def get_extractor(name: str = ARTICLE_EXTRACTOR) -> Extractor:
+    """
+    Retrieve a registered extractor.
+
+    Args:
+        name (str): Name of the extractor.
+
+    Returns:
+        Extractor: Function mapping an lxml root element to an item.
+
+    Raises:
+        ValueError: If no extractor is registered with that name.
+    """
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown extractor '{name}', "
+            f"expected one of {sorted(EXTRACTORS)}"
+        ) from None
+
+
+def _empty_item() -> Dict[str, Any]:
+    item: Dict[str, Any] = {"title": "Untitled"}
+    for tag in TEXT_TAGS:
+        item[tag] = []
+    return item
+
+
+def _text(element) -> str:
+    # Serializing as text runs in libxml2 and is faster than itertext()
+    return etree.tostring(
+        element, method="text", encoding=str, with_tail=False
+    ).strip()
+
+
+@register_extractor("legacy")
+def extract_legacy(root) -> Dict[str, Any]:
+    item = _empty_item()
+    titles = root.xpath("//title/text()")
+    if titles:
+        item["title"] = titles[0]
+    for tag in TEXT_TAGS:
+        item[tag] = [text.strip() for text in root.xpath(f"//{tag}/text()")
+                     if text.strip()]
+    return item
+
+
+@register_extractor("single_pass")
+def extract_single_pass(root) -> Dict[str, Any]:
+    item = _empty_item()
+    title = None
+    for element in root.iter("title", *TEXT_TAGS):
+        text = _text(element)
+        if element.tag == "title":
+            if title is None:
+                title = text
+        elif text:
+            item[element.tag].append(text)
+    if title:
+        item["title"] = title
+    return item
+
+
+@lru_cache(maxsize=4096)
+def _is_boilerplate_marker(marker: str) -> bool:
+    return BOILERPLATE_PATTERN.search(marker) is not None
+
+
+def _is_boilerplate(element) -> bool:
+    if element.tag in BOILERPLATE_TAGS:
+        return True
+    attrib = element.attrib
+    if not attrib:
+        return False
+    if attrib.get("role") in ("navigation", "banner", "contentinfo"):
+        return True
+    marker = f"{attrib.get('class', '')} {attrib.get('id', '')}"
+    return marker != " " and _is_boilerplate_marker(marker)
+
+
+@register_extractor("boilerplate")
+def extract_boilerplate(root) -> Dict[str, Any]:
+    item = _empty_item()
+    title = None
+    walker = etree.iterwalk(root, events=("start",))
+    for _, element in walker:
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue
+        if tag == "title":
+            if title is None:
+                title = _text(element)
+        elif tag not in ("html", "body") and _is_boilerplate(element):
+            walker.skip_subtree()
+        elif tag in TEXT_TAGS:
+            text = _text(element)
+            if text:
+                item[tag].append(text)
+    if title:
+        item["title"] = title
+    return item
@@ -0,0 +1,388 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: Building blocks of the feed discovery (see
+# `app.scraping.sipder_rss.discover_feeds`).
+#
+# - `page_feed_links()` reads the feeds a page declares in its <link> tags,
+#   matching the exact feed media types, and the <a> links that look like
+#   feeds (`/feed`, `/rss.xml`, `.atom`, FeedBurner, ...). A page that is
+#   itself a feed is declared as such.
+# - `probe_site()` is used for the sites whose pages declare no feed: the
+#   <a> candidates, the usual feed paths of the common CMSs and the feed-like
+#   URLs of `/sitemap.xml` are requested concurrently, and only the first
+#   bytes of every answer are read to sniff its content type and root
+#   element. A ranged GET is used rather than HEAD, which many servers
+#   answer without the real content type.
+# - `FeedDiscoveryCache` keeps the feeds found on every domain in a local
+#   SQLite index for `FEED_DISCOVERY_TTL` seconds (`FEED_DISCOVERY_EMPTY_TTL`
+#   for domains without feeds), so known domains are not crawled again.
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+import httpx
+from app.scraping.urls import canonicalize_url, url_key
+from app.utils.metrics import FEED_PROBES
+
+# Local index of the feeds found on every domain
+FEED_DISCOVERY_DB = os.getenv(
+    "FEED_DISCOVERY_DB", "data/feed_discovery.sqlite3"
+)
+
+# Seconds the feeds found on a domain are trusted before it is crawled again
+FEED_DISCOVERY_TTL = float(os.getenv("FEED_DISCOVERY_TTL", str(7 * 86400)))
+
+# Seconds before a domain where no feed was found is crawled again
+FEED_DISCOVERY_EMPTY_TTL = float(
+    os.getenv("FEED_DISCOVERY_EMPTY_TTL", str(86400))
+)
+
+# Probes sent at the same time, in total and to a single site
+FEED_PROBE_CONCURRENCY = int(os.getenv("FEED_PROBE_CONCURRENCY", "50"))
+FEED_PROBE_PER_SITE = 2
+
+# Seconds allowed to a single probe
+FEED_PROBE_TIMEOUT = float(os.getenv("FEED_PROBE_TIMEOUT", "5"))
+
+# Bytes of an answer read to sniff it, and of a sitemap to scan
+SNIFF_BYTES = 4096
+SITEMAP_BYTES = 65536
+
+# <a> and sitemap candidates probed at most per site
+MAX_LINK_CANDIDATES = 5
+
+# Usual feed locations of WordPress, Ghost, Hugo, Jekyll, Blogger, Drupal...
+FEED_PROBE_PATHS = (
+    "/feed", "/rss", "/rss.xml", "/atom.xml", "/feed.xml", "/index.xml",
+    "/?feed=rss2", "/feeds/posts/default", "/blog/feed", "/news/feed"
+)
+
+FEED_TYPES = frozenset((
+    "application/rss+xml", "application/atom+xml", "application/rdf+xml",
+    "application/feed+json"
+))
+
+# Generic types, only trusted on a <link rel="alternate">
+XML_TYPES = frozenset(("application/xml", "text/xml"))
+
+# Types never sniffed: the body cannot be a feed
+_BINARY_TYPES = ("image/", "audio/", "video/", "font/", "application/pdf",
+                 "application/zip", "application/javascript", "text/css")
+
+FEED_HREF_PATTERN = re.compile(
+    r"(?:^|/)(?:feeds?|rss|atom)(?:/|\.xml|\.rss|\.atom|$)"
+    r"|\.(?:rss|atom)$|feeds\.feedburner\.com|[?&]feed=(?:rss|atom)",
+    re.I
+)
+
+# Root element of a document, after the prolog
+_ROOT_ELEMENT = re.compile(
+    rb"^\s*(?:<\?.*?\?>\s*|<!--.*?-->\s*|<!DOCTYPE[^>]*>\s*)*<([\w:.-]+)",
+    re.S | re.I
+)
+_FEED_ROOTS = frozenset((b"rss", b"feed", b"rdf:rdf"))
+_JSON_FEED = re.compile(rb'"version"\s*:\s*"https?://jsonfeed\.org')
+_SITEMAP_LOC = re.compile(rb"<loc>\s*([^<\s]+)\s*</loc>", re.I)
+
+
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+def sniff_feed(head: bytes, content_type: Optional[str] = None) -> bool:
+    """
+    Tell whether the first bytes of a document are those of a feed.
+
+    The root element decides (`rss`, `feed` or `rdf:RDF`), since many
+    servers send feeds as `text/html` or `text/plain`; JSON Feeds are
+    recognized by their version URL.
+
+    Args:
+        head (bytes): The first bytes of the document.
+        content_type (str, optional): Its Content-Type header.
+
+    Returns:
+        bool: True if the document is an RSS, Atom, RDF or JSON feed.
+    """
+    if _media_type(content_type).startswith(_BINARY_TYPES):
+        return False
+    head = head.lstrip(b"\xef\xbb\xbf")
+    if head.lstrip()[:1] == b"{":
+        return bool(_JSON_FEED.search(head))
+    match = _ROOT_ELEMENT.match(head)
+    return bool(match) and match.group(1).lower() in _FEED_ROOTS
+
+
+def site_root(url: str) -> str:
+    """
+    Return the root URL (scheme and host) of a page.
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+def site_domain(url: str) -> str:
+    """
+    Return the host, and port, a page is cached under.
+    """
+    return urlsplit(url).netloc.lower()
+
+
+def page_feed_links(response) -> Tuple[List[str], List[str]]:
+    """
+    Extract the feeds of a downloaded page.
+
+    Args:
+        response (scrapy.http.Response): The downloaded page.
+
+    Returns:
+        Tuple[List[str], List[str]]: The canonical URLs of the feeds the
+        page declares, and of at most `MAX_LINK_CANDIDATES` <a> links that
+        look like feeds and must be probed.
+    """
+    content_type = response.headers.get(b"Content-Type", b"").decode("latin1")
+    if sniff_feed(response.body[:SNIFF_BYTES], content_type):
+        return [canonicalize_url(response.url)], []
+    if not hasattr(response, "selector"):
+        return [], []
+
+    declared: Dict[str, str] = {}
+    candidates: Dict[str, str] = {}
+    for element in response.selector.root.iter("link", "a"):
+        href = (element.get("href") or "").strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:")):
+            continue
+        if element.tag == "link":
+            media = _media_type(element.get("type"))
+            rel = (element.get("rel") or "").lower().split()
+            if not (media in FEED_TYPES
+                    or (media in XML_TYPES and "alternate" in rel)):
+                continue
+            found = declared
+        elif FEED_HREF_PATTERN.search(href):
+            found = candidates
+        else:
+            continue
+        url = canonicalize_url(response.urljoin(href))
+        found.setdefault(url_key(url), url)
+
+    links = [url for key, url in candidates.items() if key not in declared]
+    return list(declared.values()), links[:MAX_LINK_CANDIDATES]
+
+
+async def _read_head(response: httpx.Response, size: int) -> bytes:
+    head = b""
+    async for chunk in response.aiter_bytes():
+        head += chunk
+        if len(head) >= size:
+            break
+    return head[:size]
+
+
+async def sniff_url(
+    client: httpx.AsyncClient,
+    url: str,
+    limit: asyncio.Semaphore
+) -> Optional[Tuple[str, bytes]]:
+    """
+    Request the first bytes of a URL and tell whether it is a feed.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTP client.
+        url (str): The URL to probe.
+        limit (asyncio.Semaphore): Bounds the probes sent at the same time.
+
+    Returns:
+        Optional[Tuple[str, bytes]]: The canonical URL of the feed, after
+        redirects, and its first bytes; None if the URL is not a feed.
+    """
+    try:
+        async with limit:
+            async with client.stream(
+                "GET", url, headers={"Range": f"bytes=0-{SNIFF_BYTES - 1}"}
+            ) as response:
+                if response.status_code not in (200, 206):
+                    FEED_PROBES.labels("not_feed").inc()
+                    return None
+                content_type = response.headers.get("Content-Type")
+                if _media_type(content_type).startswith(_BINARY_TYPES):
+                    FEED_PROBES.labels("not_feed").inc()
+                    return None
+                head = await _read_head(response, SNIFF_BYTES)
+    except (httpx.HTTPError, UnicodeError):
+        FEED_PROBES.labels("error").inc()
+        return None
+
+    if not sniff_feed(head, content_type):
+        FEED_PROBES.labels("not_feed").inc()
+        return None
+    FEED_PROBES.labels("feed").inc()
+    return canonicalize_url(str(response.url)), head
+
+
+async def sitemap_links(
+    client: httpx.AsyncClient,
+    root: str,
+    limit: asyncio.Semaphore
+) -> List[str]:
+    """
+    Return the feed-like URLs listed at the start of the sitemap of a site.
+    """
+    url = urljoin(root, "/sitemap.xml")
+    headers = {"Range": f"bytes=0-{SITEMAP_BYTES - 1}"}
+    try:
+        async with limit:
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.status_code not in (200, 206):
+                    return []
+                head = await _read_head(response, SITEMAP_BYTES)
+    except (httpx.HTTPError, UnicodeError):
+        return []
+
+    links = []
+    for match in _SITEMAP_LOC.finditer(head):
+        url = match.group(1).decode("utf8", "replace")
+        if FEED_HREF_PATTERN.search(url):
+            links.append(url)
+    return links[:MAX_LINK_CANDIDATES]
+
+
+async def probe_site(
+    client: httpx.AsyncClient,
+    root: str,
+    candidates: Iterable[str],
+    limit: asyncio.Semaphore
+) -> List[str]:
+    """
+    Find the feeds of a site whose pages declare none.
+
+    The <a> candidates, the usual feed paths and the feed-like URLs of the
+    sitemap are probed concurrently, at most `FEED_PROBE_PER_SITE` at a
+    time on the site.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTP client.
+        root (str): The root URL of the site.
+        candidates (Iterable[str]): Feed-like links found on its pages.
+        limit (asyncio.Semaphore): Bounds the probes sent at the same time,
+        to every site.
+
+    Returns:
+        List[str]: The canonical URLs of the distinct feeds found, <a>
+        candidates first.
+    """
+    site_limit = asyncio.Semaphore(FEED_PROBE_PER_SITE)
+
+    async def sniff(url: str) -> Optional[Tuple[str, bytes]]:
+        async with site_limit:
+            return await sniff_url(client, url, limit)
+
+    async def from_sitemap() -> List[Optional[Tuple[str, bytes]]]:
+        async with site_limit:
+            links = await sitemap_links(client, root, limit)
+        return await asyncio.gather(*(sniff(url) for url in links))
+
+    urls = list(dict.fromkeys(
+        list(candidates) + [urljoin(root, path) for path in FEED_PROBE_PATHS]
+    ))
+    *answers, sitemap_answers = await asyncio.gather(
+        *(sniff(url) for url in urls), from_sitemap()
+    )
+
+    # Paths such as /feed, /feed/ and /?feed=rss2 often serve the same feed
+    feeds: Dict[str, str] = {}
+    seen_heads = set()
+    for answer in list(answers) + list(sitemap_answers):
+        if answer is None:
+            continue
+        url, head = answer
+        if head in seen_heads:
+            continue
+        seen_heads.add(head)
+        feeds.setdefault(url_key(url), url)
+    return list(feeds.values())
+
+
+class FeedDiscoveryCache:
+    """
+    Persistent `domain -> feeds` index stored in SQLite, with a TTL.
+
+    Connections are opened lazily, like those of
+    `app.scraping.http_cache.ValidatorStore`.
+    """
+
+    def __init__(
+        self,
+        path: str = FEED_DISCOVERY_DB,
+        ttl: float = FEED_DISCOVERY_TTL,
+        empty_ttl: float = FEED_DISCOVERY_EMPTY_TTL
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS discovered_feeds (
+                    domain TEXT PRIMARY KEY,
+                    feeds TEXT NOT NULL,
+                    checked_at REAL NOT NULL
+                )
+            """)
+        return self._conn
+
+    def get(self, domain: str) -> Optional[List[str]]:
+        """
+        Return the feeds found on a domain, or None if the domain was never
+        checked or its entry expired.
+        """
+        row = self.conn.execute(
+            "SELECT feeds, checked_at FROM discovered_feeds WHERE domain = ?",
+            (domain,)
+        ).fetchone()
+        if row is None:
+            return None
+        feeds = json.loads(row[0])
+        ttl = self.ttl if feeds else self.empty_ttl
+        if time.time() - row[1] > ttl:
+            return None
+        return feeds
+
+    def put(self, domain: str, feeds: List[str]) -> None:
+        """
+        Store the feeds found on a domain, possibly none.
+        """
+        self.conn.execute("""
+            INSERT INTO discovered_feeds (domain, feeds, checked_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT (domain) DO UPDATE
+            SET feeds = excluded.feeds, checked_at = excluded.checked_at
+        """, (domain, json.dumps(feeds), time.time()))
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,450 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: Adaptive polling scheduler of the feeds stored in
+# `ttrss_feeds`.
+#
+# Every feed is polled at its own interval, learned from the publication
+# times of its entries: the median gap between the recent entries, scaled by
+# `FEED_POLL_FACTOR` and smoothed over the polls, so a feed publishing every
+# ten minutes is polled every few minutes and a blog updated once a month is
+# polled a few times a week. Polls finding nothing new (304 or no newer
+# entry) stretch the interval by `FEED_BACKOFF`; failures are retried with an
+# exponential backoff that leaves the learned interval untouched. Intervals
+# are kept between `FEED_MIN_INTERVAL` and `FEED_MAX_INTERVAL`, and the next
+# poll is jittered by ±10% so feeds do not fall due together.
+#
+# The feeds wait in a heap ordered by the time of their next poll. Only the
+# feeds that are due are fetched (with `validate_feeds`, so the stored
+# validators are sent), at most `FEED_POLL_BUDGET` per minute: a token bucket
+# refilled continuously lets short bursts through and holds the rest in the
+# heap, where the feeds due first are polled first. The scheduler sleeps
+# until the next feed is due, so busy feeds are polled as soon as their
+# interval elapses. The schedules are stored in `feed_schedule` (see
+# `app.models.feed_schedule_db`) after every batch, and the feed list is
+# reloaded from the database every `FEED_SCHEDULE_RELOAD` seconds.
+#
+# The entries themselves are ingested by the Tiny Tiny RSS updater: the
+# learned intervals are written to `ttrss_feeds.update_interval`, and the
+# feeds whose poll found new entries are queued for an immediate update.
+
+import asyncio
+import heapq
+import multiprocessing
+import os
+import random
+import statistics
+import time
+import httpx
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from loguru import logger
+from app.models.feed_schedule_db import (
+    FeedSchedule,
+    apply_feed_intervals,
+    load_feed_schedules,
+    save_feed_schedules
+)
+from app.scraping.http_cache import ConditionalFetchStats, ValidatorStore
+from app.scraping.sipder_rss import (
+    FEED_CONCURRENCY,
+    FEED_TIMEOUT,
+    FEED_USER_AGENT,
+    validate_feeds
+)
+from app.utils.metrics import (
+    FEED_POLL_LAG,
+    FEED_POLLS,
+    FEEDS_DUE,
+    FEEDS_SCHEDULED
+)
+
+# Start the scheduler with the API
+FEED_SCHEDULER_ENABLED = os.getenv(
+    "FEED_SCHEDULER_ENABLED", "false"
+).lower() in ("1", "true", "yes")
+
+# Bounds of the polling interval of a feed, in seconds
+FEED_MIN_INTERVAL = float(os.getenv("FEED_MIN_INTERVAL", "900"))
+FEED_MAX_INTERVAL = float(os.getenv("FEED_MAX_INTERVAL", str(7 * 86400)))
+
+# Polling interval of the feeds never polled, in seconds
+FEED_DEFAULT_INTERVAL = float(os.getenv("FEED_DEFAULT_INTERVAL", "3600"))
+
+# Maximum number of feeds polled per minute
+FEED_POLL_BUDGET = float(os.getenv("FEED_POLL_BUDGET", "120"))
+
+# Share of the gap between entries used as the polling interval. Lower values
+# see new entries sooner at the price of more empty polls.
+FEED_POLL_FACTOR = float(os.getenv("FEED_POLL_FACTOR", "0.5"))
+
+# Weight of the latest estimate in the smoothed interval
+FEED_INTERVAL_SMOOTHING = float(os.getenv("FEED_INTERVAL_SMOOTHING", "0.5"))
+
+# Factor stretching the interval after a poll that found nothing new
+FEED_BACKOFF = float(os.getenv("FEED_BACKOFF", "1.5"))
+
+# Seconds before the first retry of a failed feed, doubled on every failure
+FEED_RETRY_INTERVAL = float(os.getenv("FEED_RETRY_INTERVAL", "300"))
+
+# Seconds between two reloads of the feed list from the database
+FEED_SCHEDULE_RELOAD = float(os.getenv("FEED_SCHEDULE_RELOAD", "600"))
+
+# Number of processes parsing the polled feeds
+FEED_SCHEDULER_WORKERS = int(os.getenv("FEED_SCHEDULER_WORKERS", "2"))
+
+
+def _clamp(interval: float) -> float:
+    return min(FEED_MAX_INTERVAL, max(FEED_MIN_INTERVAL, interval))
+
+
+def entry_gap(timestamps: Sequence[float], now: float) -> Optional[float]:
+    """
+    Estimate the time between two entries of a feed.
+
+    Args:
+        timestamps (Sequence[float]): Publication times of the recent
+        entries, in epoch seconds.
+        now (float): The current time, in epoch seconds.
+
+    Returns:
+        Optional[float]: The median gap between the entries, or the time
+        since the newest one if the feed has been quiet for longer. None if
+        the feed has fewer than two dated entries.
+    """
+    times = sorted(set(timestamps), reverse=True)
+    if len(times) < 2:
+        return None
+    gap = statistics.median(
+        newer - older for newer, older in zip(times, times[1:])
+    )
+    return max(gap, now - times[0])
+
+
+def learn_interval(
+    schedule: FeedSchedule,
+    timestamps: Sequence[float],
+    now: float
+) -> float:
+    """
+    Polling interval of a feed after a poll that found new entries.
+
+    Args:
+        schedule (FeedSchedule): The schedule of the feed.
+        timestamps (Sequence[float]): Publication times of its entries.
+        now (float): The current time, in epoch seconds.
+
+    Returns:
+        float: The new interval, in seconds.
+    """
+    gap = entry_gap(timestamps, now)
+    if gap is None:
+        return schedule.interval_seconds
+    target = gap * FEED_POLL_FACTOR
+    if not schedule.changes:
+        # Nothing learned yet, the default interval is only a guess
+        return _clamp(target)
+    return _clamp(
+        (1 - FEED_INTERVAL_SMOOTHING) * schedule.interval_seconds
+        + FEED_INTERVAL_SMOOTHING * target
+    )
+
+
+def update_schedule(
+    schedule: FeedSchedule,
+    summary: Optional[Dict],
+    failed: bool,
+    now: float
+) -> str:
+    """
+    Update the schedule of a feed after a poll.
+
+    Args:
+        schedule (FeedSchedule): The schedule to update.
+        summary (Optional[Dict]): The summary of the parsed feed (see
+        `summarize_feed`), None if it was not modified.
+        failed (bool): Whether the poll failed.
+        now (float): The time of the poll, in epoch seconds.
+
+    Returns:
+        str: The outcome of the poll: "changed", "unchanged" or "error".
+    """
+    schedule.polls += 1
+    schedule.last_polled = datetime.fromtimestamp(now, timezone.utc)
+    if failed:
+        schedule.failures += 1
+        delay = min(
+            FEED_MAX_INTERVAL,
+            FEED_RETRY_INTERVAL * 2 ** (schedule.failures - 1)
+        )
+        schedule.next_poll = datetime.fromtimestamp(
+            now + delay, timezone.utc
+        )
+        return "error"
+
+    schedule.failures = 0
+    timestamps = summary["timestamps"] if summary else []
+    newest = max(timestamps, default=None)
+    last = (
+        schedule.last_entry_at.timestamp() if schedule.last_entry_at
+        else None
+    )
+    if newest is not None and (last is None or newest > last):
+        outcome = "changed"
+        schedule.interval_seconds = learn_interval(schedule, timestamps, now)
+        schedule.last_entry_at = datetime.fromtimestamp(newest, timezone.utc)
+        schedule.changes += 1
+    elif summary is None or newest is not None:
+        outcome = "unchanged"
+        schedule.interval_seconds = _clamp(
+            schedule.interval_seconds * FEED_BACKOFF
+        )
+    else:
+        # No dated entries: nothing to learn from, keep the interval
+        outcome = "unchanged"
+
+    schedule.next_poll = datetime.fromtimestamp(
+        now + schedule.interval_seconds * random.uniform(0.9, 1.1),
+        timezone.utc
+    )
+    return outcome
+
+
+class FeedScheduler:
+    """
+    Polls the stored feeds when they are due, within a global budget.
+    """
+
+    def __init__(self, pool, budget: float = FEED_POLL_BUDGET):
+        """
+        Args:
+            pool: The asyncpg pool used to read and store the schedules.
+            budget (float): Maximum number of feeds polled per minute.
+        """
+        self.pool = pool
+        self.rate = budget / 60
+        self.capacity = max(1.0, budget)
+        self.tokens = self.capacity
+        self.schedules: Dict[int, FeedSchedule] = {}
+        self.heap: List[Tuple[float, int]] = []
+        self.polling: Set[int] = set()
+        self.stats = ConditionalFetchStats()
+        self._refilled = time.monotonic()
+        self._reload_at = 0.0
+        self._wake = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._parsers: Optional[ProcessPoolExecutor] = None
+        self._validators: Optional[ValidatorStore] = None
+
+    def start(self) -> None:
+        """
+        Start the scheduling loop in the background.
+        """
+        self._client = httpx.AsyncClient(
+            timeout=FEED_TIMEOUT,
+            follow_redirects=True,
+            headers={"User-Agent": FEED_USER_AGENT}
+        )
+        # Spawned, not forked from the multithreaded API process
+        self._parsers = ProcessPoolExecutor(
+            max_workers=FEED_SCHEDULER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._validators = ValidatorStore()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """
+        Stop the scheduling loop and the polls in progress, and release the
+        HTTP client, the parser processes and the validator index.
+        """
+        tasks = [task for task in (self._task, *self._tasks) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+        if self._parsers is not None:
+            # Joining the processes blocks, keep it off the event loop
+            await asyncio.to_thread(
+                self._parsers.shutdown, cancel_futures=True
+            )
+        if self._validators is not None:
+            self._validators.close()
+
+    def _push(self, schedule: FeedSchedule) -> None:
+        due = schedule.next_poll.timestamp() if schedule.next_poll else 0.0
+        heapq.heappush(self.heap, (due, schedule.feed_id))
+
+    def _is_current(self, due: float, feed_id: int) -> bool:
+        # Entries are not removed from the heap when a schedule changes, the
+        # outdated ones are skipped when they come up
+        schedule = self.schedules.get(feed_id)
+        if schedule is None or feed_id in self.polling:
+            return False
+        return due == (
+            schedule.next_poll.timestamp() if schedule.next_poll else 0.0
+        )
+
+    async def reload(self) -> None:
+        """
+        Read the feed list and the stored schedules from the database.
+        Feeds added since the last reload are due at once, feeds removed are
+        dropped.
+        """
+        async with self.pool.acquire() as conn:
+            schedules = await load_feed_schedules(conn, FEED_DEFAULT_INTERVAL)
+        loaded = {schedule.feed_id: schedule for schedule in schedules}
+        for feed_id in list(self.schedules):
+            if feed_id not in loaded:
+                del self.schedules[feed_id]
+        for feed_id, schedule in loaded.items():
+            known = self.schedules.get(feed_id)
+            if known is not None:
+                known.feed_url = schedule.feed_url
+                continue
+            self.schedules[feed_id] = schedule
+            if feed_id not in self.polling:
+                self._push(schedule)
+        FEEDS_SCHEDULED.set(len(self.schedules))
+        logger.info(f"Feed scheduler tracking {len(self.schedules)} feeds")
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._refilled) * self.rate
+        )
+        self._refilled = now
+
+    def take_due(self, now: float) -> List[FeedSchedule]:
+        """
+        Pop the due feeds the budget allows to poll now.
+
+        Args:
+            now (float): The current time, in epoch seconds.
+
+        Returns:
+            List[FeedSchedule]: The feeds to poll, the most overdue first.
+        """
+        self._refill()
+        room = FEED_CONCURRENCY - len(self.polling)
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            if not self._is_current(*self.heap[0]):
+                heapq.heappop(self.heap)
+                continue
+            if self.tokens < 1 or len(due) >= room:
+                break
+            _, feed_id = heapq.heappop(self.heap)
+            self.tokens -= 1
+            due.append(self.schedules[feed_id])
+        FEEDS_DUE.set(sum(
+            1 for entry in self.heap
+            if entry[0] <= now and self._is_current(*entry)
+        ) if self.heap and self.heap[0][0] <= now else 0)
+        return due
+
+    def _sleep_time(self, now: float) -> float:
+        wait = self._reload_at - now
+        if self.heap and self.heap[0][0] > now:
+            wait = min(wait, self.heap[0][0] - now)
+        elif self.heap and self.tokens < 1:
+            wait = min(wait, (1 - self.tokens) / self.rate)
+        # Otherwise every poll slot is busy, a finished poll wakes the loop
+        return max(0.0, wait)
+
+    async def _run(self) -> None:
+        while True:
+            now = time.time()
+            if now >= self._reload_at:
+                try:
+                    await self.reload()
+                except Exception as e:
+                    logger.error(f"❌ Error loading the feed schedules: {e}")
+                self._reload_at = now + FEED_SCHEDULE_RELOAD
+
+            batch = self.take_due(now)
+            if batch:
+                self.polling.update(s.feed_id for s in batch)
+                task = asyncio.create_task(self._poll(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(), self._sleep_time(time.time())
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, batch: List[FeedSchedule]) -> None:
+        """
+        Fetch a batch of due feeds, update their schedules and store them.
+        """
+        started = time.time()
+        for schedule in batch:
+            due = (
+                schedule.next_poll.timestamp() if schedule.next_poll
+                else started
+            )
+            FEED_POLL_LAG.observe(max(0.0, started - due))
+
+        results = {}
+        try:
+            fetched = []
+            async for feed_url, summary, answer in validate_feeds(
+                [schedule.feed_url for schedule in batch],
+                self._validators, self.stats, self._client, self._parsers
+            ):
+                results[feed_url] = summary
+                if summary is not None:
+                    fetched.append((
+                        feed_url, answer["etag"], answer["modified"],
+                        answer["size"]
+                    ))
+            await asyncio.to_thread(self._validators.put_many, fetched)
+
+            now = time.time()
+            changed = []
+            for schedule in batch:
+                # Feeds that failed are not yielded by validate_feeds
+                outcome = update_schedule(
+                    schedule, results.get(schedule.feed_url),
+                    schedule.feed_url not in results, now
+                )
+                FEED_POLLS.labels(outcome).inc()
+                if outcome == "changed":
+                    changed.append(schedule.feed_id)
+                    logger.info(
+                        f"Feed updated: {schedule.feed_url}, next poll in "
+                        f"{schedule.interval_seconds / 60:.0f} min"
+                    )
+
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    await save_feed_schedules(conn, batch)
+                    await apply_feed_intervals(conn, batch, changed)
+        except Exception as e:
+            logger.error(f"❌ Error polling scheduled feeds: {e}")
+        finally:
+            for schedule in batch:
+                self.polling.discard(schedule.feed_id)
+                if (schedule.next_poll is None
+                        or schedule.next_poll.timestamp() <= started):
+                    # The poll did not finish, retry later
+                    schedule.next_poll = datetime.fromtimestamp(
+                        started + FEED_RETRY_INTERVAL, timezone.utc
+                    )
+                if schedule.feed_id in self.schedules:
+                    self._push(schedule)
+            self._wake.set()
@@ -0,0 +1,273 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module implements HTTP conditional fetching for article
+# pages and feeds.
+#
+# The `ETag` and `Last-Modified` validators of every downloaded page or feed
+# are kept in a local SQLite index shared by the crawler workers. The next
+# time the same URL is fetched, `If-None-Match`/`If-Modified-Since` headers
+# are sent and a `304 Not Modified` answer short-circuits the download and the
+# extraction. The validators of an article page are only stored once its
+# item is persisted, so a page whose extraction or write failed is fetched in
+# full again. `ConditionalFetchStats` counts hits, misses and the bytes saved
+# so every crawl run can report what the cache avoided.
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# Local index holding the validators of every fetched URL
+VALIDATOR_DB = os.getenv("HTTP_VALIDATOR_DB", "data/http_validators.sqlite3")
+
+
+class ValidatorStore:
+    """
+    Persistent `url -> (etag, last_modified, size)` index stored in SQLite.
+
+    The database runs in WAL mode so several crawler processes can read and
+    write it concurrently. Connections are opened lazily, so a store created
+    before forking is safe to use in the child, and may be used from worker
+    threads (e.g. through `asyncio.to_thread`), one at a time.
+    """
+
+    def __init__(self, path: str = VALIDATOR_DB):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None,
+                check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS validators (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+            """)
+        return self._conn
+
+    def get(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], int]]:
+        """
+        Retrieve the validators stored for a URL.
+
+        Args:
+            url (str): The fetched URL.
+
+        Returns:
+            Optional[Tuple]: `(etag, last_modified, size)` or None if the URL
+            has no stored validator.
+        """
+        with self._lock:
+            return self.conn.execute(
+                "SELECT etag, last_modified, size FROM validators "
+                "WHERE url = ?", (url,)
+            ).fetchone()
+
+    def put(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        size: int = 0
+    ) -> None:
+        """
+        Store the validators of a URL, or forget them if the server sent none.
+
+        Args:
+            url (str): The fetched URL.
+            etag (str, optional): Value of the `ETag` header.
+            last_modified (str, optional): Value of the `Last-Modified` header.
+            size (int): Size of the downloaded body, used to estimate the
+            bandwidth saved by later 304 answers.
+        """
+        self.put_many([(url, etag, last_modified, size)])
+
+    def put_many(
+        self,
+        rows: Iterable[Tuple[str, Optional[str], Optional[str], int]]
+    ) -> None:
+        """
+        Store the validators of several URLs in a single transaction, see
+        `put`.
+
+        Args:
+            rows (Iterable[Tuple]): `(url, etag, last_modified, size)` rows.
+        """
+        now = time.time()
+        stored, forgotten = [], []
+        for url, etag, last_modified, size in rows:
+            if etag or last_modified:
+                stored.append((url, etag, last_modified, size, now))
+            else:
+                forgotten.append((url,))
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "DELETE FROM validators WHERE url = ?", forgotten
+                )
+                conn.executemany("""
+                    INSERT INTO validators (
+                        url, etag, last_modified, size, updated_at
+                    ) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (url) DO UPDATE
+                    SET etag = excluded.etag,
+                        last_modified = excluded.last_modified,
+                        size = excluded.size,
+                        updated_at = excluded.updated_at
+                """, stored)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ConditionalFetchStats:
+    """
+    Counters of a conditional fetching run.
+
+    - hits: validators were sent and the server answered 304.
+    - misses: validators were sent but the content had changed.
+    - uncached: no validator was known for the URL.
+    - bytes_saved: size of the bodies the 304 answers avoided downloading.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        self.bytes_saved = 0
+
+    def record(self, status: Optional[str], bytes_saved: int = 0) -> None:
+        if status == "hit":
+            self.hits += 1
+            self.bytes_saved += bytes_saved
+        elif status == "miss":
+            self.misses += 1
+        elif status == "uncached":
+            self.uncached += 1
+
+    def merge(self, other: Dict[str, int]) -> None:
+        self.hits += other.get("hits", 0)
+        self.misses += other.get("misses", 0)
+        self.uncached += other.get("uncached", 0)
+        self.bytes_saved += other.get("bytes_saved", 0)
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncached": self.uncached,
+            "bytes_saved": self.bytes_saved
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses, "
+            f"{self.uncached} uncached, {self.bytes_saved / 1024:.1f} KB saved"
+        )
+
+
+class ConditionalFetchMiddleware:
+    """
+    Scrapy downloader middleware sending stored validators with every
+    request and reading the validators of every response.
+
+    The outcome is written to `request.meta["conditional"]` ("hit", "miss"
+    or "uncached") together with `request.meta["bytes_saved"]`, and 304
+    answers are allowed through to the spider callback. The validators of a
+    200 answer are left in `request.meta["validators"]` as
+    `(url, etag, last_modified, size)`, to be stored with `ValidatorStore`
+    once the page is persisted. The URL is the one that answered: after a
+    redirect, the validators belong to its target, not to the URL first
+    requested. Requests created with
+    `meta={"conditional": "off"}` are left untouched.
+    """
+
+    def __init__(self, store: ValidatorStore):
+        self.store = store
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(ValidatorStore(
+            crawler.settings.get("HTTP_VALIDATOR_DB", VALIDATOR_DB)
+        ))
+
+    def process_request(self, request, spider):
+        # Retries keep the outcome, redirects are evaluated for the new URL
+        if request.meta.get("conditional") == "off":
+            return None
+        if request.meta.get("conditional_url") == request.url:
+            return None
+
+        request.meta["conditional_url"] = request.url
+        request.headers.pop(b"If-None-Match", None)
+        request.headers.pop(b"If-Modified-Since", None)
+
+        validators = self.store.get(request.url)
+        if validators is None:
+            request.meta["conditional"] = "uncached"
+            return None
+
+        etag, last_modified, size = validators
+        if etag:
+            request.headers[b"If-None-Match"] = etag
+        if last_modified:
+            request.headers[b"If-Modified-Since"] = last_modified
+        request.meta["conditional"] = "miss"
+        request.meta["bytes_saved"] = size
+        request.meta["handle_httpstatus_list"] = (
+            list(request.meta.get("handle_httpstatus_list", [])) + [304]
+        )
+        return None
+
+    def process_response(self, request, response, spider):
+        if request.meta.get("conditional") == "off":
+            return response
+
+        if response.status == 304:
+            if request.meta.get("conditional") == "miss":
+                request.meta["conditional"] = "hit"
+            return response
+
+        if response.status == 200:
+            request.meta["validators"] = (
+                response.url,
+                _header(response, b"ETag"),
+                _header(response, b"Last-Modified"),
+                len(response.body)
+            )
+        return response
+
+
+def _header(response, name: bytes) -> Optional[str]:
+    value = response.headers.get(name)
+    return value.decode("latin-1") if value else None
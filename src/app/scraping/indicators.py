@@ -0,0 +1,306 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module extracts indicators of compromise and the
+# vendors and products mentioned by every scraped article.
+#
+# The text of an article (title, headers and paragraphs) is scanned once:
+#
+# - a single compiled pattern finds CVE ids, IPv4 and IPv6 addresses, MD5,
+#   SHA-1 and SHA-256 hashes and domain names, after defanged notations
+#   (`example[.]com`, `hxxp://`) are restored;
+# - an Aho-Corasick automaton over words finds every keyword of the vendor
+#   and product list (`KEYWORDS_FILE`), multi-word names included, in a
+#   single pass whatever the number of keywords.
+#
+# Domains are kept only when they end in a public suffix and do not look like
+# a file name. The indicators are added to the item as `indicators` by the
+# crawler workers, or by `IndicatorPipeline` in a standalone crawl, and are
+# stored with the article (see `app.models.articles_db`).
+
+import ipaddress
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import tldextract
+from loguru import logger
+
+# Vendor and product names, one per line, aliases separated by "|"
+KEYWORDS_FILE = os.getenv(
+    "INDICATOR_KEYWORDS_FILE",
+    "src/app/static/docs/keywords_ciberseguridad_ot_it.txt"
+)
+
+TEXT_FIELDS = ("title", "h1", "h2", "h3", "h4", "h5", "h6", "p")
+
+# Suffixes that are public suffixes but far more often file extensions
+FILE_EXTENSIONS = frozenset((
+    "py", "sh", "md", "pl", "rs", "so", "ps", "cc", "cs", "ai", "mp", "bz",
+    "gz", "zip", "rar", "exe", "dll", "sys", "bat", "cmd", "jar", "apk",
+    "doc", "docx", "xls", "xlsm", "pdf", "txt", "log", "tmp", "bin", "img",
+    "iso", "lnk", "vbs", "hta", "js", "php", "asp", "aspx", "jsp", "html",
+    "htm", "png", "jpg", "gif", "json", "xml", "yml", "yaml", "ini", "cfg"
+))
+
+_DEFANGED_DOT = re.compile(r"\[\.\]|\(\.\)|\{\.\}|\[dot\]|\(dot\)", re.I)
+_DEFANGED_SCHEME = re.compile(r"\bhxxp(s?)(?:\[:\]|:)//", re.I)
+
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+
+# One pass finds every kind of indicator. Matches only start at the
+# beginning of a word, and possessive quantifiers keep failed attempts from
+# backtracking, so most positions are rejected after a single check.
+INDICATOR_PATTERN = re.compile(rf"""
+    (?<![\w.:-])(?:
+        (?P<cve>CVE-\d{{4}}-\d{{4,7}}\b)
+      | (?P<hash>[0-9a-f]{{32}}(?:[0-9a-f]{{8}}(?:[0-9a-f]{{24}})?)?\b)
+      | (?P<ipv4>{_OCTET}(?:\.{_OCTET}){{3}}(?!\w|\.\d))
+      | (?P<ipv6>(?:[0-9a-f]{{0,4}}:){{2,7}}[0-9a-f]{{1,4}}(?![\w:]))
+      | (?P<domain>(?:[a-z0-9][a-z0-9-]{{0,62}}+\.)+[a-z]{{2,24}}\b)
+    )
+""", re.I | re.X)
+
+_HASH_TYPES = {32: "md5", 40: "sha1", 64: "sha256"}
+
+_WORD = re.compile(r"\w+")
+
+INDICATOR_KINDS = (
+    "cve", "ipv4", "ipv6", "domain", "md5", "sha1", "sha256", "keyword"
+)
+
+
+@lru_cache(maxsize=1)
+def _suffixes() -> tldextract.TLDExtract:
+    # Bundled public suffix list, never fetched from the network
+    return tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+
+def _is_domain(candidate: str) -> bool:
+    if candidate.rsplit(".", 1)[-1] in FILE_EXTENSIONS:
+        return False
+    parts = _suffixes()(candidate)
+    return bool(parts.domain and parts.suffix)
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton matching a set of keywords on word boundaries.
+
+    Keywords and text are split into lowercase words, and the automaton
+    moves on whole words, so a text is scanned once in linear time whatever
+    the number of keywords.
+    """
+
+    def __init__(self, keywords: Dict[str, str]):
+        """
+        Args:
+            keywords (Dict[str, str]): Maps every name or alias to the
+            canonical keyword reported when it is found.
+        """
+        self.goto: List[Dict[str, int]] = [{}]
+        self.output: List[Tuple[str, ...]] = [()]
+        for alias, keyword in keywords.items():
+            words = _WORD.findall(alias.lower())
+            if not words:
+                continue
+            state = 0
+            for word in words:
+                next_state = self.goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][word] = next_state
+                    self.goto.append({})
+                    self.output.append(())
+                state = next_state
+            if keyword not in self.output[state]:
+                self.output[state] += (keyword,)
+        self.fail = self._build_failure_links()
+        self.vocabulary = frozenset(
+            word for transitions in self.goto for word in transitions
+        )
+
+    def _build_failure_links(self) -> List[int]:
+        fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for word, child in self.goto[state].items():
+                queue.append(child)
+                link = fail[state]
+                while link and word not in self.goto[link]:
+                    link = fail[link]
+                fail[child] = self.goto[link].get(word, 0)
+                if fail[child] == child:
+                    fail[child] = 0
+                # A match also reports the keywords ending in its suffix
+                self.output[child] += tuple(
+                    keyword for keyword in self.output[fail[child]]
+                    if keyword not in self.output[child]
+                )
+        return fail
+
+    def __len__(self) -> int:
+        return len(self.goto) - 1
+
+    def find(self, words: Iterable[str]) -> List[str]:
+        """
+        Return the keywords found in a sequence of lowercase words, in order
+        of first occurrence.
+        """
+        words = words if isinstance(words, list) else list(words)
+        # A word outside every keyword sends the automaton back to its root,
+        # so only the runs of keyword words need to be walked
+        vocabulary = self.vocabulary.intersection(words)
+        if not vocabulary:
+            return []
+
+        goto, fail, output = self.goto, self.fail, self.output
+        found: Dict[str, None] = {}
+        state, previous = 0, -2
+        for index in [i for i, word in enumerate(words) if word in vocabulary]:
+            if index != previous + 1:
+                state = 0
+            previous = index
+            word = words[index]
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if output[state]:
+                found.update(dict.fromkeys(output[state]))
+        return list(found)
+
+
+def load_keywords(path: str = KEYWORDS_FILE) -> Dict[str, str]:
+    """
+    Read a keyword file: one vendor or product per line, with optional
+    aliases separated by "|". Blank lines and lines starting with "#" are
+    ignored.
+
+    Returns:
+        Dict[str, str]: Every name and alias mapped to its canonical name,
+        the first one of its line.
+    """
+    keywords = {}
+    try:
+        with open(path, "r", encoding="utf8") as file:
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                names = [name.strip() for name in line.split("|")]
+                for name in names:
+                    if name:
+                        keywords[name] = names[0]
+    except FileNotFoundError:
+        logger.warning("Keyword file {} not found", path)
+    return keywords
+
+
+class IndicatorExtractor:
+    """
+    Extracts the indicators of compromise and keywords of scraped items.
+    """
+
+    def __init__(self, keywords: Optional[Dict[str, str]] = None):
+        self.automaton = KeywordAutomaton(
+            load_keywords() if keywords is None else keywords
+        )
+
+    def extract_text(self, text: str) -> Dict[str, List[str]]:
+        """
+        Extract the indicators of a text.
+
+        Returns:
+            Dict[str, List[str]]: The distinct values found for every kind
+            of indicator (see `INDICATOR_KINDS`), in order of appearance.
+            Kinds without any value are left out.
+        """
+        # Indicators never contain spaces: only the few chunks of the text
+        # that may hold one are scanned
+        candidates = " ".join([
+            chunk for chunk in text.split()
+            if "." in chunk or ":" in chunk or "dot" in chunk
+            or len(chunk) >= 32 or "VE-" in chunk or "ve-" in chunk
+        ])
+        candidates = _DEFANGED_SCHEME.sub(
+            r"http\1://", _DEFANGED_DOT.sub(".", candidates)
+        )
+        found: Dict[str, Dict[str, None]] = {}
+        for match in INDICATOR_PATTERN.finditer(candidates):
+            kind = match.lastgroup
+            value = match.group()
+            if kind == "cve":
+                value = value.upper()
+            elif kind == "hash":
+                kind = _HASH_TYPES.get(len(value))
+                value = value.lower()
+            elif kind == "ipv6":
+                try:
+                    value = ipaddress.IPv6Address(value).compressed
+                except ValueError:
+                    continue
+            elif kind == "domain":
+                value = value.lower()
+                if not _is_domain(value):
+                    continue
+            found.setdefault(kind, {})[value] = None
+
+        keywords = self.automaton.find(_WORD.findall(text.lower()))
+        if keywords:
+            found["keyword"] = dict.fromkeys(keywords)
+        return {kind: list(values) for kind, values in found.items()}
+
+    def extract(self, item: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        Extract the indicators of a scraped item from its title, headers
+        and paragraphs.
+        """
+        texts = []
+        for field in TEXT_FIELDS:
+            value = item.get(field)
+            if isinstance(value, str):
+                texts.append(value)
+            elif value:
+                texts.extend(value)
+        return self.extract_text("\n".join(texts))
+
+    def process(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add the `indicators` of an item to it and return it.
+        """
+        item["indicators"] = self.extract(item)
+        return item
+
+
+@lru_cache(maxsize=1)
+def get_indicator_extractor() -> IndicatorExtractor:
+    """
+    Return the extractor of the process, built once from `KEYWORDS_FILE`.
+    """
+    extractor = IndicatorExtractor()
+    logger.debug("Keyword automaton built with {} states",
+                 len(extractor.automaton))
+    return extractor
+
+
+class IndicatorPipeline:
+    """
+    Scrapy item pipeline adding the `indicators` of the items of a
+    standalone crawl.
+    """
+
+    def __init__(self, extractor: IndicatorExtractor):
+        self.extractor = extractor
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(get_indicator_extractor())
+
+    def process_item(self, item, spider):
+        return self.extractor.process(item)
@@ -0,0 +1,244 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module implements the background job subsystem used to
+# run the news crawler without blocking the FastAPI event loop.
+#
+# A `CrawlJobManager` starts every crawl as an asyncio task and returns a job
+# ID immediately. Each job tracks its status and progress (cycles, pages done
+# and failed, throughput, conditional-fetch hits, fetches prevented by the
+# seen-URL frontier) while `run_dynamic_spider_from_db()` waits for the
+# crawler pool asynchronously. Jobs can be listed, inspected and cancelled,
+# which also stops the crawler workers running the job's batches. The items
+# scraped by the jobs are published to a broadcast channel as they arrive
+# (see `app.scraping.broadcast`).
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from loguru import logger
+from app.models.crawl_state_db import LinkScrapeResult
+from app.scraping.broadcast import BroadcastChannel
+from app.scraping.http_cache import ConditionalFetchStats
+from app.scraping.spider_factory import run_dynamic_spider_from_db
+
+# Maximum number of finished jobs kept in memory for status polling
+MAX_FINISHED_JOBS = 50
+
+
+class CrawlJobResponse(BaseModel):
+    """
+    Pydantic model representing the status and progress of a crawl job.
+    """
+    job_id: str
+    status: str
+    force_full: bool
+    cycles: int
+    pages_queued: int
+    pages_done: int
+    pages_failed: int
+    pages_per_second: float
+    cache_hits: int
+    cache_misses: int
+    cache_uncached: int
+    bytes_saved: int
+    fetches_prevented: int
+    started_at: float
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+class CrawlJob:
+    """
+    In-memory state of a single crawl job.
+    """
+
+    def __init__(self, force_full: bool = False):
+        self.job_id = uuid.uuid4().hex
+        self.status = "pending"
+        self.force_full = force_full
+        self.cycles = 0
+        self.pages_queued = 0
+        self.pages_done = 0
+        self.pages_failed = 0
+        self.cache = ConditionalFetchStats()
+        self.fetches_prevented = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def on_cycle(self) -> None:
+        self.cycles += 1
+
+    def on_result(self, result: LinkScrapeResult) -> None:
+        if result.status == "failed":
+            self.pages_failed += 1
+        else:
+            self.pages_done += 1
+
+    def on_stats(self, stats: Dict[str, Any]) -> None:
+        self.cache.merge(stats.get("cache", {}))
+        self.fetches_prevented += stats.get("frontier", {}).get("prevented", 0)
+        self.pages_queued += stats.get("queued", 0)
+
+    def to_response(self) -> CrawlJobResponse:
+        end = self.finished_at or time.time()
+        elapsed = max(end - self.started_at, 1e-6)
+        return CrawlJobResponse(
+            job_id=self.job_id,
+            status=self.status,
+            force_full=self.force_full,
+            cycles=self.cycles,
+            pages_queued=self.pages_queued,
+            pages_done=self.pages_done,
+            pages_failed=self.pages_failed,
+            pages_per_second=round(
+                (self.pages_done + self.pages_failed) / elapsed, 3
+            ),
+            cache_hits=self.cache.hits,
+            cache_misses=self.cache.misses,
+            cache_uncached=self.cache.uncached,
+            bytes_saved=self.cache.bytes_saved,
+            fetches_prevented=self.fetches_prevented,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            error=self.error
+        )
+
+
+class CrawlJobManager:
+    """
+    Starts, tracks and cancels crawl jobs running in the background.
+
+    Only one crawl job runs at a time, since concurrent jobs would queue the
+    same links and race on the crawl watermark.
+    """
+
+    def __init__(self, channel: Optional[BroadcastChannel] = None):
+        """
+        Args:
+            channel (BroadcastChannel, optional): Channel receiving every
+            item scraped by the jobs.
+        """
+        self._jobs: "OrderedDict[str, CrawlJob]" = OrderedDict()
+        self.channel = channel
+
+    @property
+    def active_job(self) -> Optional[CrawlJob]:
+        for job in self._jobs.values():
+            if not job.finished:
+                return job
+        return None
+
+    def start(
+        self,
+        pool,
+        crawlers,
+        store,
+        force_full: bool = False
+    ) -> CrawlJob:
+        """
+        Start a new crawl job in the background.
+
+        Args:
+            pool (asyncpg.pool.Pool): The connection pool used by the crawl.
+            crawlers (CrawlerPool): The warm crawler workers running the crawl.
+            store (ResultStore): The store receiving the scraped items.
+            force_full (bool): Re-crawl every entry on the first cycle.
+
+        Returns:
+            CrawlJob: The newly created job.
+
+        Raises:
+            RuntimeError: If another crawl job is still running.
+        """
+        active = self.active_job
+        if active is not None:
+            raise RuntimeError(f"Crawl job {active.job_id} is already running")
+
+        job = CrawlJob(force_full=force_full)
+        self._jobs[job.job_id] = job
+        self._prune()
+        job.task = asyncio.create_task(self._run(job, pool, crawlers, store))
+        logger.info("Crawl job {} started (full={})", job.job_id, force_full)
+        return job
+
+    async def _run(self, job: CrawlJob, pool, crawlers, store) -> None:
+        job.status = "running"
+        try:
+            await run_dynamic_spider_from_db(
+                pool,
+                crawlers,
+                store,
+                force_full=job.force_full,
+                on_cycle=job.on_cycle,
+                on_result=job.on_result,
+                on_stats=job.on_stats,
+                on_item=self.channel.publish if self.channel else None
+            )
+            job.status = "completed"
+            logger.success("Crawl job {} completed", job.job_id)
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            logger.warning("Crawl job {} cancelled", job.job_id)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.exception("Crawl job {} failed: {}", job.job_id, e)
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[CrawlJob]:
+        return list(self._jobs.values())
+
+    async def cancel(self, job_id: str) -> Optional[CrawlJob]:
+        """
+        Cancel a running job and wait until its crawler workers are stopped.
+
+        Args:
+            job_id (str): Identifier of the job to cancel.
+
+        Returns:
+            Optional[CrawlJob]: The cancelled job, or None if it is unknown.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+        if not job.finished:
+            job.status = "cancelled"
+            job.finished_at = time.time()
+        return job
+
+    async def shutdown(self) -> None:
+        """
+        Cancel every running job, used when the application stops.
+        """
+        for job in self.list():
+            if not job.finished:
+                await self.cancel(job.job_id)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
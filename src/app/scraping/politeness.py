@@ -0,0 +1,284 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module implements per-domain politeness for the
+# crawlers.
+#
+# Scrapy already keeps one download slot per host, but a global
+# `DOWNLOAD_DELAY` with autothrottle treats every host alike and a FIFO
+# scheduler feeds the downloader whole runs of links of the same site. Here
+# every host gets its own delay instead:
+#
+# - a base delay (`DOMAIN_DELAY`), raised to the `Crawl-delay` or
+#   `Request-rate` that the host's `robots.txt` declares for our user agent,
+#   fetched once per host before its first request;
+# - a backoff set from `Retry-After` on 429/503 answers (or doubled when the
+#   header is missing), which decays again on successful answers.
+#
+# The resulting delay is written to the host's download slot, so the
+# downloader never sends it two requests closer than that.
+#
+# `DownloaderAwarePriorityQueue` dequeues first the hosts with the fewest
+# active downloads, so a batch interleaves all its domains and throughput
+# grows with the number of distinct hosts while each one sees a polite rate.
+# The per-domain state (delays, latency, throttling) is reported through
+# `PolitenessMiddleware.drain_touched()`.
+
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+from protego import Protego
+from scrapy import signals
+from scrapy.http import Request
+from scrapy.http.request import NO_CALLBACK
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet.defer import Deferred
+
+# Minimum seconds between two requests to the same host
+DOMAIN_DELAY = float(os.getenv("CRAWLER_DOMAIN_DELAY", "2.0"))
+
+# Upper bound of any per-host delay, whatever robots.txt or Retry-After say
+MAX_DOMAIN_DELAY = float(os.getenv("CRAWLER_MAX_DOMAIN_DELAY", "120"))
+
+# Requests downloaded at the same time, in total and per host
+CONCURRENT_REQUESTS = int(os.getenv("CRAWLER_CONCURRENT_REQUESTS", "64"))
+CONCURRENT_REQUESTS_PER_DOMAIN = int(
+    os.getenv("CRAWLER_CONCURRENT_REQUESTS_PER_DOMAIN", "1")
+)
+
+# Weight of the last response in the per-host latency average
+LATENCY_SMOOTHING = 0.3
+
+THROTTLE_CODES = (429, 503)
+
+POLITENESS_SETTINGS = {
+    "DOWNLOAD_DELAY": DOMAIN_DELAY,
+    "RANDOMIZE_DOWNLOAD_DELAY": True,
+    "AUTOTHROTTLE_ENABLED": False,  # Replaced by the per-host delays
+    "CONCURRENT_REQUESTS": CONCURRENT_REQUESTS,
+    "CONCURRENT_REQUESTS_PER_DOMAIN": CONCURRENT_REQUESTS_PER_DOMAIN,
+    "SCHEDULER_PRIORITY_QUEUE": "scrapy.pqueues.DownloaderAwarePriorityQueue"
+}
+
+# Must run after RetryMiddleware (550) in process_response order, so the
+# 429/503 answers are seen before they are retried. 595 sits between
+# Scrapy's HttpCompressionMiddleware (590) and RedirectMiddleware (600), and
+# clear of ConditionalFetchMiddleware (585): two middlewares sharing a
+# priority run in an unspecified order
+POLITENESS_MIDDLEWARE = {"app.scraping.politeness.PolitenessMiddleware": 595}
+
+
+def parse_retry_after(value: Optional[bytes]) -> Optional[float]:
+    """
+    Parse a `Retry-After` header, given in seconds or as an HTTP date.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the header is missing
+        or invalid.
+    """
+    if not value:
+        return None
+    value = value.decode("latin-1").strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class DomainState:
+    """
+    Politeness state of a single host.
+    """
+
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.robots_delay: Optional[float] = None
+        self.robots_checked = False
+        self.backoff = 0.0
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.updated_at = time.time()
+
+    @property
+    def delay(self) -> float:
+        base = max(DOMAIN_DELAY, self.robots_delay or 0.0)
+        return min(max(base, self.backoff), MAX_DOMAIN_DELAY)
+
+    def on_response(self, status: int, latency: Optional[float],
+                    retry_after: Optional[float]) -> None:
+        self.requests += 1
+        self.updated_at = time.time()
+        if latency is not None:
+            self.latency = latency if self.latency is None else (
+                LATENCY_SMOOTHING * latency
+                + (1 - LATENCY_SMOOTHING) * self.latency
+            )
+
+        if status in THROTTLE_CODES:
+            self.throttled += 1
+            if retry_after is not None:
+                self.backoff = min(retry_after, MAX_DOMAIN_DELAY)
+            else:
+                self.backoff = min(max(self.delay * 2, 1.0), MAX_DOMAIN_DELAY)
+        elif self.backoff:
+            # Halve the backoff on every successful answer
+            self.backoff = self.backoff / 2 if self.backoff / 2 > 0.1 else 0.0
+
+    def on_error(self) -> None:
+        self.requests += 1
+        self.errors += 1
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        latency = None if self.latency is None else round(self.latency, 3)
+        return {
+            "domain": self.domain,
+            "delay": round(self.delay, 3),
+            "robots_delay": self.robots_delay,
+            "backoff": round(self.backoff, 3),
+            "latency": latency,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "updated_at": self.updated_at
+        }
+
+
+class PolitenessMiddleware:
+    """
+    Scrapy downloader middleware enforcing the per-host delays.
+
+    Requests of a host wait for its `robots.txt` on first contact; after
+    that, every response updates the host state and the delay of its
+    download slot. Requests created with `meta={"politeness": "off"}` skip
+    the robots.txt lookup.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.user_agent = crawler.settings.get("USER_AGENT", "Scrapy")
+        self.domains: Dict[str, DomainState] = {}
+        self._robots_waiters: Dict[str, List[Deferred]] = {}
+        self._touched: set = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler)
+        crawler.signals.connect(
+            middleware.on_reached_downloader,
+            signal=signals.request_reached_downloader
+        )
+        return middleware
+
+    def state(self, request) -> DomainState:
+        domain = urlparse_cached(request).hostname or ""
+        state = self.domains.get(domain)
+        if state is None:
+            state = self.domains[domain] = DomainState(domain)
+        self._touched.add(domain)
+        return state
+
+    def _slot(self, request):
+        key = request.meta.get("download_slot")
+        downloader = self.crawler.engine.downloader
+        return downloader.slots.get(key) if key is not None else None
+
+    def on_reached_downloader(self, request, spider) -> None:
+        # The slot exists from here on, apply the host delay before queueing
+        slot = self._slot(request)
+        if slot is not None:
+            slot.delay = self.state(request).delay
+
+    def process_request(self, request, spider):
+        if request.meta.get("politeness") == "off":
+            return None
+        url = urlparse_cached(request)
+        if url.scheme not in ("http", "https"):
+            return None
+        state = self.state(request)
+        if state.robots_checked:
+            return None
+
+        waiters = self._robots_waiters.get(state.domain)
+        if waiters is None:
+            waiters = self._robots_waiters[state.domain] = []
+            self._fetch_robots(f"{url.scheme}://{url.netloc}/robots.txt",
+                               state)
+        waiter = Deferred()
+        waiters.append(waiter)
+        return waiter
+
+    def _fetch_robots(self, robots_url: str, state: DomainState) -> None:
+        request = Request(
+            robots_url,
+            priority=1000,
+            callback=NO_CALLBACK,
+            meta={
+                "politeness": "off",
+                "conditional": "off",
+                "dont_obey_robotstxt": True,
+                "dont_retry": True
+            }
+        )
+
+        def on_robots(response) -> None:
+            if response.status == 200:
+                robots = Protego.parse(
+                    response.body.decode("utf-8", errors="ignore")
+                )
+                delays = [robots.crawl_delay(self.user_agent) or 0.0]
+                rate = robots.request_rate(self.user_agent)
+                if rate is not None and rate.requests:
+                    delays.append(rate.seconds / rate.requests)
+                state.robots_delay = max(delays) or None
+
+        def release(_) -> None:
+            state.robots_checked = True
+            for waiter in self._robots_waiters.pop(state.domain, []):
+                waiter.callback(None)
+
+        deferred = self.crawler.engine.download(request)
+        deferred.addCallback(on_robots)
+        # An unreachable or unparsable robots.txt declares no delay
+        deferred.addBoth(release)
+
+    def process_response(self, request, response, spider):
+        state = self.state(request)
+        if request.meta.get("politeness") != "off":
+            state.on_response(
+                response.status,
+                request.meta.get("download_latency"),
+                parse_retry_after(response.headers.get(b"Retry-After"))
+                if response.status in THROTTLE_CODES else None
+            )
+        slot = self._slot(request)
+        if slot is not None:
+            slot.delay = state.delay
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if request.meta.get("politeness") != "off":
+            self.state(request).on_error()
+        return None
+
+    def drain_touched(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the state of the hosts used since the previous call.
+        """
+        touched = {domain: self.domains[domain].to_dict()
+                   for domain in self._touched if domain in self.domains}
+        self._touched.clear()
+        return touched
@@ -0,0 +1,234 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: Offline re-extraction of the archived article pages.
+#
+# Runs the article extraction of the news spider (extractor, near-duplicate
+# fingerprint and indicators of compromise, see
+# `app.scraping.crawler_pool.scrape_article`) over the raw responses of the
+# archive (see `app.scraping.response_archive`), without any network access,
+# and writes the items to a result store of their own. By default only the
+# latest archived version of every URL is replayed. Archived documents (PDFs
+# and other non-text bodies, see `app.scraping.admission`) are counted apart
+# and not extracted, as in the live crawl.
+#
+# The records to replay are picked from the memory-mapped indexes and split
+# into chunks of consecutive records of a segment; the chunks are extracted
+# by a pool of processes, each reading its records through a single file
+# handle, while the parent process writes the items. Run it from the `src`
+# directory with:
+#
+#     python -m app.scraping.replay --processes 8
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+from scrapy.http import Headers, Request, TextResponse
+from scrapy.responsetypes import responsetypes
+from loguru import logger
+from app.scraping.crawler_pool import scrape_article
+from app.scraping.response_archive import (
+    RESPONSE_ARCHIVE_DIR,
+    ArchivedResponse,
+    ResponseArchive
+)
+from app.scraping.result_store import ResultStore
+
+# Result store receiving the re-extracted items
+REPLAY_RESULT_DIR = os.getenv("REPLAY_RESULT_DIR", "data/replay_results")
+
+# Records extracted by a worker in one task
+REPLAY_CHUNK_SIZE = int(os.getenv("REPLAY_CHUNK_SIZE", "200"))
+
+Chunk = Tuple[str, List[Tuple[int, int]]]
+
+
+def plan_replay(
+    archive: ResponseArchive,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    all_versions: bool = False
+) -> List[Chunk]:
+    """
+    Pick the records to replay from the archive indexes.
+
+    Args:
+        archive (ResponseArchive): The archive to replay.
+        since (float, optional): Only records fetched at or after this UNIX
+        timestamp.
+        until (float, optional): Only records fetched at or before this UNIX
+        timestamp.
+        all_versions (bool): Replay every archived version of a URL, not
+        only the latest one.
+
+    Returns:
+        List[Chunk]: `(segment, [(offset, length), ...])` chunks of at most
+        `REPLAY_CHUNK_SIZE` records, in file order.
+    """
+    picked: Dict[Any, Tuple[float, str, int, int]] = {}
+    for segment, key, fetched_at, offset, length in archive.entries(
+        since, until
+    ):
+        if all_versions:
+            key = (segment, offset)
+        elif key in picked and picked[key][0] >= fetched_at:
+            continue
+        picked[key] = (fetched_at, segment, offset, length)
+
+    segments: Dict[str, List[Tuple[int, int]]] = {}
+    for _, segment, offset, length in picked.values():
+        segments.setdefault(segment, []).append((offset, length))
+
+    chunks = []
+    for segment, spans in sorted(segments.items()):
+        spans.sort()
+        for start in range(0, len(spans), REPLAY_CHUNK_SIZE):
+            chunks.append((segment, spans[start:start + REPLAY_CHUNK_SIZE]))
+    return chunks
+
+
+def to_response(archived: ArchivedResponse):
+    """
+    Rebuild the Scrapy response of an archived record.
+    """
+    headers = Headers()
+    for name, value in archived.headers:
+        headers.appendlist(name, value)
+    cls = responsetypes.from_args(
+        headers=headers, url=archived.url, body=archived.body
+    )
+    return cls(
+        url=archived.url,
+        status=archived.status,
+        headers=headers,
+        body=archived.body,
+        request=Request(archived.url)
+    )
+
+
+def replay_chunk(
+    directory: str,
+    chunk: Chunk
+) -> Tuple[List[Dict], int, int]:
+    """
+    Extract the records of a chunk. Runs in a worker process.
+
+    Returns:
+        Tuple[List[Dict], int, int]: The scraped items, stamped with the
+        fetch time of their record, the number of records that failed and
+        the number of documents, which are not extracted.
+    """
+    items, failed, documents = [], 0, 0
+    segment, spans = chunk
+    for archived in ResponseArchive(directory).read_many(segment, spans):
+        response = to_response(archived)
+        if not isinstance(response, TextResponse):
+            documents += 1
+            continue
+        try:
+            data, _ = scrape_article(response)
+        except Exception:
+            failed += 1
+            continue
+        data["fetched_at"] = archived.fetched_at
+        items.append(data)
+    return items, failed, documents
+
+
+def replay_archive(
+    store: ResultStore,
+    directory: str = RESPONSE_ARCHIVE_DIR,
+    processes: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    all_versions: bool = False
+) -> Dict[str, Any]:
+    """
+    Re-extract the archived article pages into a result store.
+
+    Args:
+        store (ResultStore): The store receiving the items.
+        directory (str): Directory of the archive.
+        processes (int, optional): Number of extraction processes, one per
+        core if not given.
+        since (float, optional): Only records fetched at or after this UNIX
+        timestamp.
+        until (float, optional): Only records fetched at or before this UNIX
+        timestamp.
+        all_versions (bool): Replay every archived version of a URL.
+
+    Returns:
+        Dict[str, Any]: The number of records replayed, items extracted,
+        records failed and documents skipped, and the elapsed seconds.
+    """
+    start = time.perf_counter()
+    chunks = plan_replay(ResponseArchive(directory), since, until,
+                         all_versions)
+    records = sum(len(spans) for _, spans in chunks)
+    logger.info("Replaying {} archived responses in {} chunks",
+                records, len(chunks))
+
+    stats = {"records": records, "items": 0, "failed": 0, "documents": 0}
+    with ProcessPoolExecutor(max_workers=processes) as workers:
+        futures = [
+            workers.submit(replay_chunk, directory, chunk)
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            items, failed, documents = future.result()
+            for item in items:
+                store.append(item)
+            stats["items"] += len(items)
+            stats["failed"] += failed
+            stats["documents"] += documents
+    store.commit()
+
+    stats["seconds"] = time.perf_counter() - start
+    logger.info(
+        "Replayed {items} items ({failed} failed, {documents} documents) "
+        "in {seconds:.1f}s", **stats
+    )
+    return stats
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Re-extract the archived article pages offline."
+    )
+    parser.add_argument("--archive", default=RESPONSE_ARCHIVE_DIR,
+                        help="archive directory")
+    parser.add_argument("--output", default=REPLAY_RESULT_DIR,
+                        help="result store receiving the items")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="extraction processes (default: one per core)")
+    parser.add_argument("--since", type=float, default=None,
+                        help="only records fetched after this timestamp")
+    parser.add_argument("--until", type=float, default=None,
+                        help="only records fetched before this timestamp")
+    parser.add_argument("--all-versions", action="store_true",
+                        help="replay every version of a URL, not the latest")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    store = ResultStore(args.output)
+    try:
+        replay_archive(
+            store, args.archive, args.processes, args.since, args.until,
+            args.all_versions
+        )
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
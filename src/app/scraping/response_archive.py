@@ -0,0 +1,516 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module implements the opt-in archive of the raw article
+# responses downloaded by the news spider, so improved extractors can be run
+# again over past crawls without fetching the pages again (see
+# `app.scraping.replay`).
+#
+# With `RESPONSE_ARCHIVE_ENABLED`, every article page answered with a 200 is
+# appended as a WARC/1.0 "response" record, compressed as its own gzip
+# member, to append-only segment files (`<writer>-000001.warc.gz`, ...).
+# Every crawler process writes its own segments, so no locking is needed,
+# and a new segment is started once the active one reaches
+# `ARCHIVE_SEGMENT_MAX_BYTES`. The segments are regular `.warc.gz` files
+# readable by the usual WARC tools.
+#
+# Next to every segment, a binary index holds one fixed-size entry per record
+# (a 64-bit hash of the URL, the fetch time, and the offset and length of the
+# compressed record). An entry is only written once its record is flushed,
+# so readers never see a half-written record. While a segment is written its
+# index is kept in write order (`.log`); once the segment is full or the
+# crawler stops, the index is sorted by URL hash and fetch time (`.idx`).
+# Readers memory-map the indexes: URLs are looked up with a binary search in
+# the sorted ones and a scan of the few active ones, and each record is read
+# with a single seek.
+
+import gzip
+import hashlib
+import mmap
+import os
+import socket
+import struct
+import time
+import uuid
+from datetime import datetime, timezone
+from http import HTTPStatus
+from typing import Iterator, List, Optional, Tuple
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from app.utils.metrics import ARCHIVE_BYTES, ARCHIVE_RECORDS, STAGE_SECONDS
+
+# Archive the raw article responses
+RESPONSE_ARCHIVE_ENABLED = os.getenv(
+    "RESPONSE_ARCHIVE_ENABLED", "false"
+).lower() in ("1", "true", "yes")
+
+# Directory holding the segments and their indexes
+RESPONSE_ARCHIVE_DIR = os.getenv("RESPONSE_ARCHIVE_DIR", "data/archive")
+
+# A new segment is started once the active one reaches this size
+ARCHIVE_SEGMENT_MAX_BYTES = int(
+    os.getenv("ARCHIVE_SEGMENT_MAX_BYTES", str(128 * 2**20))
+)
+
+# gzip level of the records, from 1 (fastest) to 9 (smallest)
+ARCHIVE_COMPRESSION_LEVEL = int(os.getenv("ARCHIVE_COMPRESSION_LEVEL", "6"))
+
+# Index entry: URL hash, fetch time, record offset, record length
+INDEX_ENTRY = struct.Struct("<QdQI")
+
+# Scrapy settings of the archive, the extension does nothing unless enabled
+ARCHIVE_SETTINGS = {
+    "RESPONSE_ARCHIVE_ENABLED": RESPONSE_ARCHIVE_ENABLED,
+    "RESPONSE_ARCHIVE_DIR": RESPONSE_ARCHIVE_DIR,
+    "EXTENSIONS": {
+        "app.scraping.response_archive.ResponseArchiveExtension": 500
+    }
+}
+
+# Response headers describing the transfer, not the archived body
+TRANSFER_HEADERS = (b"content-length", b"content-encoding",
+                    b"transfer-encoding")
+
+SEGMENT_SUFFIX = ".warc.gz"
+
+
+def archive_key(url: str) -> int:
+    """
+    Hash of a URL used as the key of the index entries.
+    """
+    digest = hashlib.blake2b(url.encode("utf8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class ArchivedResponse:
+    """
+    A response read back from the archive.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        fetched_at: float,
+        status: int,
+        headers: List[Tuple[bytes, bytes]],
+        body: bytes
+    ):
+        self.url = url
+        self.fetched_at = fetched_at
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+def encode_record(
+    url: str,
+    fetched_at: float,
+    status: int,
+    headers: List[Tuple[bytes, bytes]],
+    body: bytes
+) -> bytes:
+    """
+    Encode a response as a gzip-compressed WARC response record.
+
+    Args:
+        url (str): The URL of the response.
+        fetched_at (float): The fetch time, as a UNIX timestamp.
+        status (int): The HTTP status.
+        headers (List[Tuple[bytes, bytes]]): The response headers. Those
+        describing the transfer (length, encodings) are replaced, since the
+        body is stored decoded.
+        body (bytes): The decoded response body.
+
+    Returns:
+        bytes: The compressed record.
+    """
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ""
+    lines = [f"HTTP/1.1 {status} {reason}".encode("latin-1")]
+    lines.extend(
+        name + b": " + value for name, value in headers
+        if name.lower() not in TRANSFER_HEADERS
+    )
+    lines.append(b"Content-Length: %d" % len(body))
+    block = b"\r\n".join(lines) + b"\r\n\r\n" + body
+
+    date = datetime.fromtimestamp(fetched_at, timezone.utc)
+    warc_headers = (
+        "WARC/1.0\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        f"WARC-Date: {date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')}\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        "Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(block)}\r\n\r\n"
+    ).encode("utf8")
+    return gzip.compress(
+        warc_headers + block + b"\r\n\r\n",
+        compresslevel=ARCHIVE_COMPRESSION_LEVEL,
+        mtime=0
+    )
+
+
+def decode_record(data: bytes) -> ArchivedResponse:
+    """
+    Decode a record written by `encode_record`.
+
+    Raises:
+        ValueError: If the record is malformed.
+    """
+    raw = gzip.decompress(data)
+    head, _, rest = raw.partition(b"\r\n\r\n")
+    fields = {}
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        fields[name.strip().lower()] = value.strip().decode("utf8")
+    block = rest[:int(fields[b"content-length"])]
+
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    status_line, *header_lines = http_head.split(b"\r\n")
+    headers = []
+    for line in header_lines:
+        name, _, value = line.partition(b":")
+        headers.append((name.strip(), value.strip()))
+    fetched_at = datetime.strptime(
+        fields[b"warc-date"], "%Y-%m-%dT%H:%M:%S.%fZ"
+    ).replace(tzinfo=timezone.utc).timestamp()
+    return ArchivedResponse(
+        fields[b"warc-target-uri"], fetched_at,
+        int(status_line.split(b" ")[1]), headers, body
+    )
+
+
+class ResponseArchiveWriter:
+    """
+    Appends responses to the segments of a single writer process.
+    """
+
+    def __init__(
+        self,
+        directory: str = RESPONSE_ARCHIVE_DIR,
+        prefix: Optional[str] = None
+    ):
+        """
+        Args:
+            directory (str): Directory of the archive.
+            prefix (str, optional): Name of the segments of this writer,
+            unique per host, process and start time if not given.
+        """
+        self.directory = directory
+        self.prefix = prefix or (
+            f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+        )
+        self.number = 0
+        self.size = 0
+        self._data = None
+        self._index = None
+
+    def _base(self) -> str:
+        return os.path.join(
+            self.directory, f"{self.prefix}-{self.number:06d}"
+        )
+
+    def _open_segment(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self.number += 1
+        self.size = 0
+        self._data = open(self._base() + SEGMENT_SUFFIX, "wb")
+        self._index = open(self._base() + ".log", "wb")
+
+    def append(
+        self,
+        url: str,
+        status: int,
+        headers: List[Tuple[bytes, bytes]],
+        body: bytes,
+        fetched_at: Optional[float] = None
+    ) -> None:
+        """
+        Append a response to the active segment.
+
+        Args:
+            url (str): The URL of the response.
+            status (int): The HTTP status.
+            headers (List[Tuple[bytes, bytes]]): The response headers.
+            body (bytes): The decoded response body.
+            fetched_at (float, optional): The fetch time, now if not given.
+        """
+        if self._data is None:
+            self._open_segment()
+        elif self.size >= ARCHIVE_SEGMENT_MAX_BYTES:
+            self._seal()
+            self._open_segment()
+
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with STAGE_SECONDS.labels("archive").time():
+            record = encode_record(url, fetched_at, status, headers, body)
+            self._data.write(record)
+            self._data.flush()
+            self._index.write(INDEX_ENTRY.pack(
+                archive_key(url), fetched_at, self.size, len(record)
+            ))
+            self._index.flush()
+        self.size += len(record)
+        ARCHIVE_RECORDS.inc()
+        ARCHIVE_BYTES.inc(len(record))
+
+    def _seal(self) -> None:
+        # Sort the index of the finished segment for binary searches
+        self._data.close()
+        self._index.close()
+        self._data = self._index = None
+        base = self._base()
+        with open(base + ".log", "rb") as file:
+            entries = sorted(
+                INDEX_ENTRY.iter_unpack(_whole_entries(file.read()))
+            )
+        with open(base + ".idx.tmp", "wb") as file:
+            for entry in entries:
+                file.write(INDEX_ENTRY.pack(*entry))
+        os.replace(base + ".idx.tmp", base + ".idx")
+        os.remove(base + ".log")
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._seal()
+
+
+def _whole_entries(data) -> memoryview:
+    # Ignore an entry cut short by a crash of its writer
+    view = memoryview(data)
+    return view[:len(view) - len(view) % INDEX_ENTRY.size]
+
+
+class _IndexMap:
+    """
+    Read-only memory map of a segment index.
+    """
+
+    def __init__(self, path: str):
+        self.sorted = path.endswith(".idx")
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(
+            self._file.fileno(), 0, access=mmap.ACCESS_READ
+        ) if size else None
+        self.count = size // INDEX_ENTRY.size
+
+    def __getitem__(self, position: int) -> Tuple[int, float, int, int]:
+        return INDEX_ENTRY.unpack_from(
+            self._map, position * INDEX_ENTRY.size
+        )
+
+    def __iter__(self) -> Iterator[Tuple[int, float, int, int]]:
+        if self._map is not None:
+            yield from INDEX_ENTRY.iter_unpack(_whole_entries(self._map))
+
+    def find(self, key: int) -> Iterator[Tuple[int, float, int, int]]:
+        """
+        Yield the entries of a URL hash.
+        """
+        if not self.sorted:
+            yield from (entry for entry in self if entry[0] == key)
+            return
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self[middle][0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        while low < self.count and self[low][0] == key:
+            yield self[low]
+            low += 1
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "_IndexMap":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ResponseArchive:
+    """
+    Reads the records of an archive, written by any number of writers.
+    """
+
+    def __init__(self, directory: str = RESPONSE_ARCHIVE_DIR):
+        self.directory = directory
+
+    def segments(self) -> List[str]:
+        """
+        Return the names of the segments, oldest first for every writer.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name[:-len(SEGMENT_SUFFIX)] for name in names
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _index(self, segment: str) -> Optional[_IndexMap]:
+        base = os.path.join(self.directory, segment)
+        # A sealed index wins over a log left by a writer killed mid-seal
+        for suffix in (".idx", ".log"):
+            if os.path.exists(base + suffix):
+                return _IndexMap(base + suffix)
+        return None
+
+    def entries(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Iterator[Tuple[str, int, float, int, int]]:
+        """
+        Yield the index entries of every record, segment by segment.
+
+        Args:
+            since (float, optional): Only records fetched at or after this
+            UNIX timestamp.
+            until (float, optional): Only records fetched at or before this
+            UNIX timestamp.
+
+        Yields:
+            Tuple: `(segment, url_hash, fetched_at, offset, length)`.
+        """
+        for segment in self.segments():
+            index = self._index(segment)
+            if index is None:
+                continue
+            with index:
+                for key, fetched_at, offset, length in index:
+                    if since is not None and fetched_at < since:
+                        continue
+                    if until is not None and fetched_at > until:
+                        continue
+                    yield segment, key, fetched_at, offset, length
+
+    def lookup(self, url: str) -> List[Tuple[float, str, int, int]]:
+        """
+        Find every archived version of a URL.
+
+        Returns:
+            List[Tuple[float, str, int, int]]: `(fetched_at, segment,
+            offset, length)` of every version, oldest first.
+        """
+        key = archive_key(url)
+        versions = []
+        for segment in self.segments():
+            index = self._index(segment)
+            if index is None:
+                continue
+            with index:
+                versions.extend(
+                    (fetched_at, segment, offset, length)
+                    for _, fetched_at, offset, length in index.find(key)
+                )
+        return sorted(versions)
+
+    def get(
+        self,
+        url: str,
+        at: Optional[float] = None
+    ) -> Optional[ArchivedResponse]:
+        """
+        Read the latest version of a URL fetched at or before `at`.
+
+        Args:
+            url (str): The URL of the response.
+            at (float, optional): UNIX timestamp, the latest version if not
+            given.
+
+        Returns:
+            Optional[ArchivedResponse]: The response, or None if the URL was
+            not archived by then.
+        """
+        for fetched_at, segment, offset, length in reversed(
+            self.lookup(url)
+        ):
+            if at is not None and fetched_at > at:
+                continue
+            response = self.read(segment, offset, length)
+            # Guard against a collision of the 64-bit hashes
+            if response.url == url:
+                return response
+        return None
+
+    def read(self, segment: str, offset: int, length: int) -> ArchivedResponse:
+        path = os.path.join(self.directory, segment + SEGMENT_SUFFIX)
+        with open(path, "rb") as file:
+            file.seek(offset)
+            return decode_record(file.read(length))
+
+    def read_many(
+        self,
+        segment: str,
+        spans: List[Tuple[int, int]]
+    ) -> Iterator[ArchivedResponse]:
+        """
+        Read several records of a segment through a single file handle.
+
+        Args:
+            segment (str): The segment name.
+            spans (List[Tuple[int, int]]): `(offset, length)` of the records,
+            read in offset order.
+        """
+        path = os.path.join(self.directory, segment + SEGMENT_SUFFIX)
+        with open(path, "rb") as file:
+            for offset, length in sorted(spans):
+                file.seek(offset)
+                yield decode_record(file.read(length))
+
+
+class ResponseArchiveExtension:
+    """
+    Scrapy extension archiving the responses of the requests flagged with
+    `meta["archive"]`, when `RESPONSE_ARCHIVE_ENABLED` is set.
+    """
+
+    def __init__(self, writer: ResponseArchiveWriter):
+        self.writer = writer
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("RESPONSE_ARCHIVE_ENABLED"):
+            raise NotConfigured
+        extension = cls(ResponseArchiveWriter(crawler.settings.get(
+            "RESPONSE_ARCHIVE_DIR", RESPONSE_ARCHIVE_DIR
+        )))
+        crawler.signals.connect(
+            extension.on_response, signal=signals.response_received
+        )
+        crawler.signals.connect(
+            extension.on_closed, signal=signals.spider_closed
+        )
+        return extension
+
+    def on_response(self, response, request, spider) -> None:
+        if response.status != 200 or not request.meta.get("archive"):
+            return
+        headers = [
+            (name, value)
+            for name, values in response.headers.items()
+            for value in values
+        ]
+        self.writer.append(response.url, response.status, headers,
+                           response.body)
+
+    def on_closed(self, spider) -> None:
+        self.writer.close()
+
@@ -0,0 +1,323 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: This module implements the append-only store holding the
+# items scraped by the news spider.
+#
+# Items are appended as JSON lines to rotating segment files
+# (`segment-000001.jsonl`, ...). A small manifest (`index.json`) records, for
+# every segment, the number of committed records and bytes, the time range of
+# its items and a sparse offset index (one entry every `INDEX_INTERVAL`
+# records). The manifest is replaced atomically and readers never read past
+# the committed size, so they can page through the corpus while a crawl is
+# writing without ever seeing a half-written line. Reads are streamed segment
+# by segment, so paging and filtering by URL or time range never load the
+# whole corpus into memory.
+#
+# When the writer runs inside an event loop, the `fsync` of the segment and
+# the manifest rewrite of every commit, segment rotations included, run in a
+# worker thread, on a snapshot of the manifest taken in the loop.
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# Directory holding the segments and the manifest
+RESULT_STORE_DIR = os.getenv("RESULT_STORE_DIR", "data/results")
+
+# A new segment is started once the active one reaches this size
+SEGMENT_MAX_BYTES = int(os.getenv("RESULT_SEGMENT_MAX_BYTES", str(16 * 2**20)))
+
+# Records between two entries of the sparse offset index
+INDEX_INTERVAL = 256
+
+# Records appended between two automatic manifest commits
+COMMIT_INTERVAL = 100
+
+MANIFEST_NAME = "index.json"
+
+
+def encode_cursor(segment: int, offset: int) -> str:
+    return f"{segment}:{offset}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[int, int]:
+    """
+    Decodes a pagination cursor returned by `ResultStore.read`.
+
+    Raises:
+        ValueError: If the cursor is malformed or negative.
+    """
+    if not cursor:
+        return 0, 0
+    segment, offset = cursor.split(":")
+    segment, offset = int(segment), int(offset)
+    if segment < 0 or offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return segment, offset
+
+
+class ResultStore:
+    """
+    Append-only, segmented JSONL store with paged reads.
+
+    A single writer (the API process running the crawl jobs) appends items;
+    any number of readers page through the committed records.
+    """
+
+    def __init__(self, directory: str = RESULT_STORE_DIR):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self._file = None
+        self._uncommitted = 0
+        self._manifest: Optional[Dict[str, Any]] = None
+        # Commits are published in snapshot order, whatever thread runs them
+        self._lock = threading.Lock()
+        self._snapshots = 0
+        self._published = 0
+        # Segment handles of the snapshots not synced yet, by snapshot
+        self._unsynced: Dict[int, int] = {}
+        self._commits: Set[asyncio.Task] = set()
+
+    # Writer
+
+    def _open_writer(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._manifest = self.load_manifest()
+        if not self._manifest["segments"]:
+            self._new_segment()
+            return
+
+        # Drop whatever a crashed writer left past the committed size
+        active = self._manifest["segments"][-1]
+        path = os.path.join(self.directory, active["name"])
+        self._file = open(path, "ab")
+        self._file.truncate(active["bytes"])
+        self._file.seek(active["bytes"])
+
+    def _new_segment(self) -> None:
+        segments = self._manifest["segments"]
+        number = segments[-1]["segment"] + 1 if segments else 1
+        segment = {
+            "segment": number,
+            "name": f"segment-{number:06d}.jsonl",
+            "records": 0,
+            "bytes": 0,
+            "first_ts": None,
+            "last_ts": None,
+            "offsets": []
+        }
+        segments.append(segment)
+        if self._file is not None:
+            self._file.close()
+        self._file = open(os.path.join(self.directory, segment["name"]), "wb")
+
+    def append(self, item: Dict[str, Any]) -> None:
+        """
+        Append an item, stamping it with its `fetched_at` time.
+
+        Args:
+            item (Dict[str, Any]): The scraped item.
+        """
+        if self._file is None:
+            self._open_writer()
+
+        active = self._manifest["segments"][-1]
+        if active["bytes"] >= SEGMENT_MAX_BYTES:
+            # The full segment is synced before the manifest moves on, and
+            # its handle outlives the file closed here
+            self._schedule_commit()
+            self._new_segment()
+            active = self._manifest["segments"][-1]
+
+        ts = item.setdefault("fetched_at", time.time())
+        line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf8")
+
+        if active["records"] % INDEX_INTERVAL == 0:
+            active["offsets"].append([active["records"], active["bytes"], ts])
+        self._file.write(line)
+        active["records"] += 1
+        active["bytes"] += len(line)
+        active["first_ts"] = active["first_ts"] or ts
+        active["last_ts"] = ts
+
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_INTERVAL:
+            self._schedule_commit()
+
+    def _schedule_commit(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.commit()
+            return
+        task = loop.create_task(
+            asyncio.to_thread(self._publish, *self._snapshot())
+        )
+        self._commits.add(task)
+        task.add_done_callback(self._commits.discard)
+
+    def _snapshot(self) -> Tuple[int, str]:
+        """
+        Flush the active segment and capture the manifest to publish. The
+        snapshot keeps its own handle on the segment, so the writer may
+        close it meanwhile.
+        """
+        self._file.flush()
+        self._uncommitted = 0
+        with self._lock:
+            self._snapshots += 1
+            self._unsynced[self._snapshots] = os.dup(self._file.fileno())
+            return self._snapshots, json.dumps(self._manifest)
+
+    def _publish(self, number: int, manifest: str) -> None:
+        with self._lock:
+            if number <= self._published:
+                return
+            # Earlier snapshots may still wait for their thread, and their
+            # segment must be synced before this manifest covers it
+            fds = [self._unsynced.pop(n) for n in sorted(self._unsynced)
+                   if n <= number]
+            try:
+                for fd in fds:
+                    os.fsync(fd)
+            finally:
+                for fd in fds:
+                    os.close(fd)
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, "w", encoding="utf8") as file:
+                file.write(manifest)
+            os.replace(tmp_path, self.manifest_path)
+            self._published = number
+
+    def commit(self) -> None:
+        """
+        Flush the active segment and publish the appended records to readers.
+        """
+        if self._file is None:
+            return
+        self._publish(*self._snapshot())
+
+    async def commit_async(self) -> None:
+        """
+        Like `commit`, but syncs the segment and rewrites the manifest in a
+        worker thread. Waits for the commits started by `append` too, and
+        raises their errors.
+        """
+        if self._commits:
+            await asyncio.gather(*self._commits)
+        if self._file is None:
+            return
+        await asyncio.to_thread(self._publish, *self._snapshot())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.commit()
+            self._file.close()
+            self._file = None
+
+    # Readers
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """
+        Load the committed manifest, or an empty one if nothing was written.
+        """
+        try:
+            with open(self.manifest_path, "r", encoding="utf8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {"segments": []}
+
+    def _scan(
+        self,
+        segment_no: int = 0,
+        offset: int = 0,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        """
+        Yield `(segment, next_offset, item)` for every committed record from
+        the given position, skipping segments outside the time range.
+        """
+        for segment in self.load_manifest()["segments"]:
+            if segment["segment"] < segment_no or not segment["records"]:
+                continue
+            if since is not None and segment["last_ts"] < since:
+                continue
+            if until is not None and segment["first_ts"] > until:
+                continue
+
+            start = offset if segment["segment"] == segment_no else 0
+            if since is not None:
+                # Jump to the last indexed record older than `since`
+                for _, byte_offset, ts in segment["offsets"]:
+                    if ts > since:
+                        break
+                    start = max(start, byte_offset)
+
+            path = os.path.join(self.directory, segment["name"])
+            with open(path, "rb") as file:
+                file.seek(start)
+                position = start
+                while position < segment["bytes"]:
+                    line = file.readline()
+                    if not line:
+                        break
+                    position += len(line)
+                    yield segment["segment"], position, json.loads(line)
+
+    def read(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        url: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Read a page of committed items.
+
+        Args:
+            cursor (str, optional): Cursor returned by the previous page.
+            limit (int): Maximum number of items to return.
+            url (str, optional): Only return items scraped from this URL.
+            since (float, optional): Only items fetched at or after this
+            UNIX timestamp.
+            until (float, optional): Only items fetched at or before this
+            UNIX timestamp.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The items and the
+            cursor of the next page, or None when the end was reached.
+        """
+        segment_no, offset = decode_cursor(cursor)
+        items = []
+        for segment, position, item in self._scan(segment_no, offset,
+                                                  since, until):
+            if url is not None and item.get("url") != url:
+                continue
+            fetched_at = item.get("fetched_at", 0)
+            if since is not None and fetched_at < since:
+                continue
+            if until is not None and fetched_at > until:
+                continue
+            items.append(item)
+            if len(items) >= limit:
+                return items, encode_cursor(segment, position)
+        return items, None
+
+    def iter_items(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every committed item, oldest first.
+        """
+        for _, _, item in self._scan():
+            yield item
@@ -12,21 +12,79 @@
 # links from a list of provided URLs. It uses the `feedparser` library to parse
 # the RSS feeds and extract key metadata, such as the feed title and site URL.
 # The extracted feed URLs and metadata are then stored in a PostgreSQL database
-# through asyncpg. The spider runs asynchronously with the help of a
-# multiprocessing approach, allowing the extraction process to be handled
-# concurrently for multiple URLs. This module also includes functionality
-# to read URLs from a file and periodically fetch and process new RSS feeds
-# from the URLs stored in a database.
+# through asyncpg. The discovery runs on the warm worker processes of a
+# `CrawlerPool`, allowing the extraction process to be handled concurrently
+# for multiple URLs without blocking the API, and the discovered feeds are
+# validated concurrently with an async HTTP client and a pool of parser
+# processes. Sites declaring no feed are probed at the usual feed paths, and
+# the feeds found on every domain are cached (see
+# `app.scraping.feed_discovery`). This module also includes functionality to
+# read URLs from a file and periodically fetch and process new RSS feeds from
+# the URLs stored in a database. Discovery, downloads, parsing and inserts
+# are reported as metrics (see `app.utils.metrics`).
 
+import asyncio
+import calendar
+import multiprocessing
+import os
+import time
 import feedparser
+import httpx
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import AsyncExitStack
 from scrapy.crawler import CrawlerProcess
 from scrapy.spiders import Spider
-from app.models.ttrss_postgre_db import insert_feed_to_db, FeedCreateRequest
-from multiprocessing import Process, Queue
+from app.models.ttrss_postgre_db import insert_feeds_bulk, FeedCreateRequest
+from app.scraping.admission import ADMISSION_MIDDLEWARE
+from app.scraping.feed_discovery import (
+    FEED_PROBE_CONCURRENCY,
+    FEED_PROBE_TIMEOUT,
+    FeedDiscoveryCache,
+    page_feed_links,
+    probe_site,
+    site_domain,
+    site_root
+)
+from app.scraping.http_cache import ConditionalFetchStats, ValidatorStore
+from app.scraping.politeness import POLITENESS_MIDDLEWARE, POLITENESS_SETTINGS
+from app.scraping.urls import canonicalize_url, url_key
+from app.utils.metrics import (
+    FEED_DISCOVERY_CACHE,
+    FEED_FETCHES,
+    FEEDS_DISCOVERED,
+    FEEDS_STORED,
+    STAGE_SECONDS
+)
 from scrapy.utils.log import configure_logging
-from typing import List, Type
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
 from loguru import logger
 
+# Maximum number of feeds downloaded at the same time
+FEED_CONCURRENCY = int(os.getenv("FEED_FETCH_CONCURRENCY", "20"))
+
+# Seconds allowed to download a single feed
+FEED_TIMEOUT = float(os.getenv("FEED_FETCH_TIMEOUT", "15"))
+
+# Number of processes parsing the downloaded feeds
+FEED_PARSE_WORKERS = int(
+    os.getenv("FEED_PARSE_WORKERS", str(os.cpu_count() or 1))
+)
+
+# Parser pool shared by every validation run, see `feed_parsers`
+_feed_parsers: Optional[ProcessPoolExecutor] = None
+
+# Number of validated feeds written to the database in one bulk insert
+FEED_INSERT_BATCH = int(os.getenv("FEED_INSERT_BATCH", "200"))
+
+# Number of entry timestamps kept from every parsed feed
+FEED_TIMESTAMPS = int(os.getenv("FEED_TIMESTAMPS", "50"))
+
+FEED_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+
 def read_urls_from_file(file_path) -> List[str] | List:
     """
     Reads a list of URLs from a text file.
@@ -50,6 +108,21 @@ def read_urls_from_file(file_path) -> List[str] | List:
         logger.error(f"Error reading file: {e}")
         return []
 
+def extract_feed_links(response) -> List[str]:
+    """
+    Extracts the RSS/Atom/XML feed links advertised by a web page.
+
+    Args:
+        response (scrapy.http.Response): The downloaded web page.
+
+    Returns:
+        List[str]: Canonical absolute URLs of the feeds declared in the
+        page's <link> tags (see `app.scraping.feed_discovery`), or of the
+        page itself if it is a feed.
+    """
+    declared, _ = page_feed_links(response)
+    return declared
+
 def create_rss_spider(urls, results)-> Type[Spider]:
     """
     Dynamically creates a Scrapy spider class to extract RSS/Atom/XML feed
@@ -59,7 +132,8 @@ def create_rss_spider(urls, results)-> Type[Spider]:
     - Visit each URL in the provided `urls` list.
     - Inspect <link> tags in the HTML response.
     - Identify links with RSS, Atom, or XML MIME types.
-    - Normalize and collect unique feed URLs into the shared `results` list.
+    - Canonicalize and collect unique feed URLs into the shared `results`
+      list.
 
     Args:
         urls (List[str]): A list of web page URLs to scan for RSS feeds.
@@ -69,19 +143,19 @@ def create_rss_spider(urls, results)-> Type[Spider]:
     Returns:
         Type[Spider]: A Scrapy spider class configured to extract feed URLs.
     """
+    seen = set()
+
     class RSSSpider(Spider):
         name = "rss_spider"
         start_urls = urls
 
         def parse(self, response):
-            for link in response.css("link"):
-                href = link.attrib.get("href", "")
-                type_ = link.attrib.get("type", "")
-                if "rss" in type_ or "atom" in type_ or "application/xml" in type_:
-                    full_url = response.urljoin(href)
-                    if full_url not in results:
-                        results.append(full_url)
-                        logger.info(f"RSS found: {full_url}")
+            for full_url in extract_feed_links(response):
+                key = url_key(full_url)
+                if key not in seen:
+                    seen.add(key)
+                    results.append(full_url)
+                    logger.info(f"RSS found: {full_url}")
     return RSSSpider
 
 def run_rss_spider(urls, queue) -> None:
@@ -110,8 +184,11 @@ def run_rss_spider(urls, queue) -> None:
             "AppleWebKit/537.36 (KHTML, like Gecko) "
             "Chrome/122.0.0.0 Safari/537.36"
         ),
-        "DOWNLOAD_DELAY": 2.0,
-        "AUTOTHROTTLE_ENABLED": True,
+        **POLITENESS_SETTINGS,  # Per-host delays, robots.txt and Retry-After
+        "DOWNLOADER_MIDDLEWARES": {
+            **ADMISSION_MIDDLEWARE,  # Only pages, within their size caps
+            **POLITENESS_MIDDLEWARE
+        },
         "RETRY_ENABLED": True,
         "RETRY_TIMES": 5,
         "RETRY_HTTP_CODES": [429, 500, 502, 503, 504],
@@ -122,20 +199,334 @@ def run_rss_spider(urls, queue) -> None:
     process.start()
     queue.put(results)
 
-async def extract_rss_and_save(pool, file_path) -> None:
+def summarize_feed(content: bytes) -> Dict[str, Any]:
+    """
+    Parses a downloaded feed and keeps only the metadata needed to store it.
+
+    Runs in a worker process, so only this small summary, and not the whole
+    parsed feed, is sent back to the API process.
+
+    Args:
+        content (bytes): The raw body of the feed.
+
+    Returns:
+        Dict[str, Any]: The feed title, site link, number of entries, the
+        publication times of the newest `FEED_TIMESTAMPS` entries (epoch
+        seconds, newest first) and the seconds spent parsing.
+    """
+    start = time.perf_counter()
+    feed = feedparser.parse(content)
+    timestamps = []
+    for entry in feed.entries:
+        published = entry.get("published_parsed") or entry.get(
+            "updated_parsed"
+        )
+        if published:
+            timestamps.append(calendar.timegm(published))
+    return {
+        "title": feed.feed.get("title", "Untitled"),
+        "link": feed.feed.get("link", "No site"),
+        "entries": len(feed.entries),
+        "timestamps": sorted(timestamps, reverse=True)[:FEED_TIMESTAMPS],
+        "parse_seconds": time.perf_counter() - start
+    }
+
+async def fetch_feed(
+    client: httpx.AsyncClient,
+    feed_url: str,
+    validators: ValidatorStore,
+    stats: ConditionalFetchStats
+) -> Tuple[Optional[bytes], Dict[str, Any]]:
+    """
+    Downloads a feed, sending the validators stored for it.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTP client.
+        feed_url (str): The feed URL to fetch.
+        validators (ValidatorStore): The persistent validator index.
+        stats (ConditionalFetchStats): Counters to update.
+
+    Returns:
+        Tuple[Optional[bytes], Dict[str, Any]]: The body, or None if the
+        server answered 304 Not Modified, and the validators of the answer.
+    """
+    stored = await asyncio.to_thread(validators.get, feed_url)
+    headers = {}
+    if stored:
+        etag, modified, size = stored
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+
+    response = await client.get(feed_url, headers=headers)
+    STAGE_SECONDS.labels("download").observe(
+        response.elapsed.total_seconds()
+    )
+    if response.status_code == 304:
+        FEED_FETCHES.labels("not_modified").inc()
+        stats.record("hit", stored[2] if stored else 0)
+        return None, {}
+
+    response.raise_for_status()
+    FEED_FETCHES.labels("ok").inc()
+    stats.record("miss" if stored else "uncached")
+    return response.content, {
+        "etag": response.headers.get("ETag"),
+        "modified": response.headers.get("Last-Modified"),
+        "size": len(response.content)
+    }
+
+def feed_parsers() -> ProcessPoolExecutor:
+    """
+    Returns the long-lived pool of `FEED_PARSE_WORKERS` processes parsing
+    the downloaded feeds, started on first use.
+
+    The workers are spawned rather than forked: forking the API process
+    would copy its threads, locks and open connections into every worker.
+
+    Returns:
+        ProcessPoolExecutor: The shared parser pool.
+    """
+    global _feed_parsers
+    if _feed_parsers is None:
+        _feed_parsers = ProcessPoolExecutor(
+            max_workers=FEED_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _feed_parsers
+
+
+async def shutdown_feed_parsers() -> None:
+    """
+    Shuts down the shared parser pool, if it was started, waiting for its
+    processes in a thread so the event loop is not blocked.
+    """
+    global _feed_parsers
+    parsers, _feed_parsers = _feed_parsers, None
+    if parsers is not None:
+        await asyncio.to_thread(parsers.shutdown, cancel_futures=True)
+
+
+async def validate_feeds(
+    feed_urls: List[str],
+    validators: ValidatorStore,
+    stats: ConditionalFetchStats,
+    client: Optional[httpx.AsyncClient] = None,
+    parsers: Optional[Executor] = None
+) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]], Dict[str, Any]]]:
+    """
+    Fetches and parses feeds concurrently, yielding them as they complete.
+
+    Downloads run on an async HTTP client limited to `FEED_CONCURRENCY`
+    simultaneous requests and `FEED_TIMEOUT` seconds each, and parsing runs
+    in a pool of `FEED_PARSE_WORKERS` processes, so neither blocks the
+    event loop.
+
+    Args:
+        feed_urls (List[str]): The feed URLs to validate.
+        validators (ValidatorStore): The persistent validator index.
+        stats (ConditionalFetchStats): Conditional-fetch counters to update.
+        client (httpx.AsyncClient, optional): A long-lived client to reuse,
+        one is opened and closed if not given.
+        parsers (Executor, optional): The parser pool to use, the shared
+        `feed_parsers` pool if not given.
+
+    Yields:
+        Tuple: `(feed_url, summary, validators)`, where the summary is None
+        for unchanged (304) feeds. Feeds that fail are logged and skipped.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(FEED_CONCURRENCY)
+
+    async with AsyncExitStack() as stack:
+        if client is None:
+            client = await stack.enter_async_context(httpx.AsyncClient(
+                timeout=FEED_TIMEOUT,
+                follow_redirects=True,
+                headers={"User-Agent": FEED_USER_AGENT}
+            ))
+        if parsers is None:
+            parsers = feed_parsers()
+
+        async def validate(feed_url):
+            try:
+                async with semaphore:
+                    content, answer = await fetch_feed(
+                        client, feed_url, validators, stats
+                    )
+                if content is None:
+                    return feed_url, None, answer
+                summary = await loop.run_in_executor(
+                    parsers, summarize_feed, content
+                )
+                STAGE_SECONDS.labels("feedparser").observe(
+                    summary["parse_seconds"]
+                )
+                return feed_url, summary, answer
+            except Exception as e:
+                FEED_FETCHES.labels("error").inc()
+                logger.error(f"❌ Error processing {feed_url}: {e}")
+                return feed_url, None, None
+
+        tasks = [asyncio.create_task(validate(url)) for url in feed_urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                feed_url, summary, answer = await next_done
+                if answer is not None:
+                    yield feed_url, summary, answer
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+def store_feed_validators(
+    feed_url: str,
+    feed,
+    validators: ValidatorStore
+) -> None:
+    """
+    Stores the ETag/Last-Modified validators returned with a parsed feed.
+
+    Args:
+        feed_url (str): The fetched feed URL.
+        feed (feedparser.FeedParserDict): The parsed feed.
+        validators (ValidatorStore): The persistent validator index.
+    """
+    if feed.get("status") == 200:
+        # feedparser does not expose the size of the downloaded body
+        validators.put(feed_url, feed.get("etag"), feed.get("modified"))
+
+async def discover_feeds(
+    crawlers,
+    urls,
+    cache: Optional[FeedDiscoveryCache] = None,
+    refresh: bool = False
+) -> List[str]:
+    """
+    Discovers RSS/Atom feed URLs from a list of websites using the warm
+    crawler pool.
+
+    The feeds found on a domain are cached (see
+    `app.scraping.feed_discovery`), so only the domains that are new, or
+    whose entry expired, are crawled. Their pages are scanned for declared
+    feeds and feed-like links; the domains whose pages declare none are then
+    probed at the usual feed paths. Domains whose pages could not be
+    downloaded are not cached and are tried again by the next run.
+
+    Args:
+        crawlers (CrawlerPool): The pool of warm crawler worker processes.
+        urls (List[str]): A list of web page URLs to scan for feeds.
+        cache (FeedDiscoveryCache, optional): The discovery cache, the
+        default one is opened and closed if not given.
+        refresh (bool): Ignore the cached results and crawl every domain.
+
+    Returns:
+        List[str]: The unique feed URLs, in discovery order.
+    """
+    results = {}
+
+    def add(full_url: str) -> None:
+        key = url_key(full_url)
+        if key not in results:
+            results[key] = full_url
+            FEEDS_DISCOVERED.inc()
+            logger.info(f"RSS found: {full_url}")
+
+    domains: Dict[str, List[str]] = {}
+    for url in dict.fromkeys(canonicalize_url(url) for url in urls):
+        domains.setdefault(site_domain(url), []).append(url)
+
+    own_cache = cache is None
+    cache = FeedDiscoveryCache() if own_cache else cache
+    try:
+        pages = []
+        for domain, domain_pages in domains.items():
+            feeds = None if refresh else cache.get(domain)
+            if feeds is None:
+                FEED_DISCOVERY_CACHE.labels("miss").inc()
+                pages.extend(domain_pages)
+                continue
+            FEED_DISCOVERY_CACHE.labels("hit").inc()
+            for full_url in feeds:
+                add(full_url)
+
+        crawled: Dict[str, Dict[str, Any]] = {}
+
+        def on_message(kind, payload) -> None:
+            if kind not in ("link", "feeds"):
+                return
+            state = crawled.setdefault(site_domain(payload["link"]), {
+                "ok": False, "declared": {}, "candidates": {}
+            })
+            if kind == "link":
+                state["ok"] = state["ok"] or payload["status"] == "ok"
+                return
+            for full_url in payload["declared"]:
+                state["declared"][full_url] = None
+            for full_url in payload["candidates"]:
+                state["candidates"][full_url] = None
+
+        if pages:
+            await crawlers.crawl("rss", pages, on_message)
+
+        found = {
+            domain: list(state["declared"])
+            for domain, state in crawled.items() if state["ok"]
+        }
+        undeclared = [domain for domain, feeds in found.items() if not feeds]
+        if undeclared:
+            limit = asyncio.Semaphore(FEED_PROBE_CONCURRENCY)
+            async with httpx.AsyncClient(
+                timeout=FEED_PROBE_TIMEOUT,
+                follow_redirects=True,
+                headers={"User-Agent": FEED_USER_AGENT}
+            ) as client:
+                probed = await asyncio.gather(*(
+                    probe_site(
+                        client, site_root(domains[domain][0]),
+                        crawled[domain]["candidates"], limit
+                    )
+                    for domain in undeclared
+                ))
+            found.update(zip(undeclared, probed))
+
+        for domain, feeds in found.items():
+            cache.put(domain, feeds)
+            for full_url in feeds:
+                add(full_url)
+    finally:
+        if own_cache:
+            cache.close()
+    return list(results.values())
+
+async def extract_rss_and_save(
+    pool,
+    file_path,
+    crawlers,
+    refresh: bool = False
+) -> None:
     """
     Extracts RSS/Atom feed URLs from a list of websites and stores valid feeds in a PostgreSQL database.
 
     This function:
     - Reads website URLs from a local file.
-    - Uses a multiprocessing Scrapy spider to discover RSS/Atom feeds from those websites.
-    - Parses each discovered feed using `feedparser`.
+    - Uses the warm crawler pool to discover RSS/Atom feeds from those websites.
+      Domains checked recently are answered from the discovery cache.
+    - Downloads the discovered feeds concurrently with an async HTTP client,
+      sending the stored ETag/Last-Modified validators and skipping
+      unchanged (304) feeds, and parses them with `feedparser` in a pool of
+      worker processes.
     - Extracts metadata such as the title and site URL.
-    - Constructs a `FeedCreateRequest` and inserts the feed into the database via `insert_feed_to_db`.
+    - Constructs a `FeedCreateRequest` per validated feed and inserts them
+      into the database in batches of `FEED_INSERT_BATCH` via
+      `insert_feeds_bulk`, skipping feeds that are already stored.
 
     Args:
         pool: An `asyncpg.pool.Pool` object used to acquire database connections.
         file_path (str): The file path containing a list of website URLs to process.
+        crawlers (CrawlerPool): The pool of warm crawler worker processes.
+        refresh (bool): Ignore the discovery cache and crawl every website.
 
     Returns:
         Coroutine[Any, Any, None]: An asynchronous coroutine that performs the feed extraction and saving process.
@@ -145,34 +536,69 @@ async def extract_rss_and_save(pool, file_path) -> None:
         print("No URLs found to process.")
         return
 
-    queue = Queue()
-    p = Process(target=run_rss_spider, args=(urls, queue))
-    p.start()
-    p.join()
+    results = await discover_feeds(crawlers, urls, refresh=refresh)
+    validators = ValidatorStore()
+    cache_stats = ConditionalFetchStats()
+    batch: List[Tuple[str, FeedCreateRequest, Dict[str, Any]]] = []
 
-    results = queue.get()
+    async def flush() -> None:
+        async with pool.acquire() as conn:
+            with STAGE_SECONDS.labels("db_insert").time():
+                outcomes = await insert_feeds_bulk(
+                    conn, [feed_data for _, feed_data, _ in batch]
+                )
+        # Validators are keyed on the URL they were fetched with, which
+        # `str(HttpUrl)` may normalise differently
+        stored = []
+        for (feed_url, _, answer), outcome in zip(batch, outcomes):
+            FEEDS_STORED.labels(outcome.status).inc()
+            if outcome.status == "error":
+                logger.error(
+                    f"❌ Error processing {feed_url}: {outcome.detail}"
+                )
+                continue
+            stored.append((
+                feed_url, answer["etag"], answer["modified"], answer["size"]
+            ))
+            if outcome.status == "inserted":
+                logger.info(f"✅ Feed inserted: {feed_url}")
+            else:
+                logger.info(f"Feed already stored: {feed_url}")
+        await asyncio.to_thread(validators.put_many, stored)
+        batch.clear()
 
-    async with pool.acquire() as conn:
-        for feed_url in results:
+    # The SQLite connection is closed on a failed insert or a cancellation
+    # too
+    try:
+        async for feed_url, summary, answer in validate_feeds(
+            results, validators, cache_stats
+        ):
             try:
-                feed = feedparser.parse(feed_url)
-                if not feed.entries:
+                if summary is None:
+                    logger.info(f"Feed not modified: {feed_url}")
+                    continue
+                if not summary["entries"]:
                     logger.warning(f"⚠️  No entries found in {feed_url}")
                     continue
 
-                title = feed.feed.get("title", "Untitled")
-                site_url = feed.feed.get("link", "No site")
-
                 feed_data = FeedCreateRequest(
-                    title=title,
+                    title=summary["title"],
                     feed_url=feed_url,
-                    site_url=site_url,
+                    site_url=summary["link"],
                     owner_uid=1,
                     cat_id=0
                 )
-
-                await insert_feed_to_db(conn, feed_data)
-                logger.info(f"✅ Feed inserted: {feed_url}")
+                batch.append((feed_url, feed_data, answer))
 
             except Exception as e:
                 logger.error(f"❌ Error processing {feed_url}: {e}")
+                continue
+
+            if len(batch) >= FEED_INSERT_BATCH:
+                await flush()
+
+        if batch:
+            await flush()
+    finally:
+        validators.close()
+    logger.info("Feed conditional fetch: {}", cache_stats)
@@ -11,26 +11,128 @@
 # pages using Scrapy.
 # It includes a factory function that builds a custom Spider class on the fly,
 # based on a list of input URLs. The spider extracts key structural content
-# such as titles, headers (h1-h6), and paragraph text.
+# such as titles, headers (h1-h6), and paragraph text, using the extractor
+# selected in `app.scraping.extractors`.
 #
 # The module also manages the execution of the spider:
 # - Once via `run_dynamic_spider()` with a static list of URLs
 # - Continuously via `run_dynamic_spider_from_db()`, which pulls fresh URLs
-#   from a PostgreSQL database using an asyncpg connection pool.
+#   from a PostgreSQL database using an asyncpg connection pool and hands them
+#   in batches to the warm workers of a `CrawlerPool`. Only entries created
+#   since the last cycle, or links due for a refresh, are queued; the outcome
+#   of every link is reported back and persisted as crawl state. The links
+#   are read in pages of short keyset queries through a bounded queue and
+#   the outcomes written in batches, so memory stays flat whatever the size
+#   of the ttrss_entries table.
 #
 # Extracted data is saved locally in JSON format for further processing or a
-# nalysis.
+# nalysis: `result.json` for one-shot runs, and the segmented JSONL result
+# store (see `app.scraping.result_store`) for the continuous crawl.
 from scrapy.spiders import Spider
+from scrapy.http import Request, TextResponse
 from scrapy.crawler import CrawlerProcess
-from app.models.ttrss_postgre_db import get_entry_links
-from multiprocessing import Process
-import time
+from app.scraping.admission import ADMISSION_MIDDLEWARE
+from app.scraping.dedup import DEDUP_BATCH_SIZE, NearDuplicateIndex
+from app.scraping.articles import ArticleWriter
+from app.scraping.extractors import get_extractor
+from app.scraping.frontier import (
+    FRONTIER_CAPACITY,
+    FRONTIER_ERROR_RATE,
+    BloomFilter,
+    SeenUrlFrontier
+)
+from app.scraping.http_cache import ConditionalFetchStats, ValidatorStore
+from app.scraping.politeness import POLITENESS_MIDDLEWARE, POLITENESS_SETTINGS
+from app.scraping.response_archive import ARCHIVE_SETTINGS
+from app.scraping.urls import url_key
+from app.utils.batch_writer import BatchWriter
+from app.models.crawl_tasks_db import (
+    LEASE_DURATION,
+    claim_crawl_tasks,
+    complete_crawl_tasks,
+    count_open_crawl_tasks,
+    enqueue_crawl_tasks,
+    heartbeat_crawl_tasks,
+    reap_crawl_tasks,
+    release_crawl_tasks
+)
+from app.models.crawl_state_db import (
+    LINK_BATCH_SIZE,
+    LinkScrapeResult,
+    get_due_links,
+    get_max_entry_id,
+    get_new_entry_links,
+    get_watermark,
+    record_scrape_results,
+    set_watermark,
+    stored_links
+)
+import asyncio
+import hashlib
 import logging
+import os
+import socket
+import uuid
 from scrapy.utils.log import configure_logging
-from typing import Type, Coroutine, Any
+from typing import (
+    Type,
+    Coroutine,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple
+)
 from loguru import logger
 
-def create_dynamic_spider(urls)-> Type[Spider]:
+# Seconds to wait between two crawl cycles
+CYCLE_DELAY = 5
+
+# Queue the links of every cycle in the shared crawl_tasks table, so the
+# task workers of other nodes crawl them too
+CRAWL_DISTRIBUTED = os.getenv("CRAWL_DISTRIBUTED", "false").lower() in (
+    "1", "true", "yes"
+)
+
+# Links claimed from the crawl queue at once by a node
+TASK_CLAIM_SIZE = int(os.getenv("CRAWL_TASK_CLAIM_SIZE", "200"))
+
+# Seconds between two lease heartbeats, well below the lease duration
+HEARTBEAT_INTERVAL = LEASE_DURATION.total_seconds() / 3
+
+# Seconds to wait before polling the crawl queue again when nothing is
+# claimable
+TASK_IDLE_DELAY = 5
+
+# Batches of links read ahead from the database while the crawl runs
+LINK_QUEUE_SIZE = int(os.getenv("CRAWL_LINK_QUEUE_SIZE", "4"))
+
+def extract_article(response) -> Tuple[Dict[str, Any], str]:
+    """
+    Extracts the title, headers (h1–h6) and paragraphs of an article page.
+
+    Args:
+        response (scrapy.http.Response): The downloaded page.
+
+    Returns:
+        Tuple[Dict[str, Any], str]: The scraped item and a SHA-256 hash of
+        its text content, used to detect changes between crawls.
+    """
+    data = {"url": response.url}
+    data.update(get_extractor()(response.selector.root))
+
+    texts = [data["title"]]
+    for tag in ["h1", "h2", "h3", "h4", "h5", "h6", "p"]:
+        texts.extend(data[tag])
+
+    content = "\n".join(texts)
+    return data, hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def create_dynamic_spider(urls, queue=None)-> Type[Spider]:
     """
     Creates a dynamic Scrapy spider class for extracting content from a list
     of URLs.
@@ -40,8 +142,14 @@ def create_dynamic_spider(urls)-> Type[Spider]:
       - The page title
       - All text content inside header tags (h1–h6) and paragraph tags (p)
 
+    When a `queue` is given, the outcome of every URL (status and a hash of
+    the extracted content) is pushed into it so the parent process can
+    persist the crawl state.
+
     Args:
         urls (list[str]): A list of URLs to crawl.
+        queue (Queue, optional): A multiprocessing queue receiving one
+        outcome dictionary per crawled URL.
 
     Returns:
         Type[Spider]: A dynamically created Scrapy Spider class.
@@ -50,22 +158,45 @@ def create_dynamic_spider(urls)-> Type[Spider]:
         name = "dynamic_spider"
         start_urls = urls
 
-        def parse(self, response):
-            data = {
-                "url": response.url,
-                "title": response.css("title::text").get(default="Untitled")
-            }
+        def start_requests(self):
+            for url in self.start_urls:
+                yield Request(url, callback=self.parse, errback=self.on_error,
+                              meta={"link": url, "archive": True,
+                                    "admission": "article"})
 
-            for tag in ["h1", "h2", "h3", "h4", "h5", "h6", "p"]:
-                elements = response.css(f"{tag}::text").getall()
-                clean_elements = [e.strip() for e in elements if e.strip()]
-                data[tag] = clean_elements
+        def report(self, link, status, content_hash=None):
+            if queue is not None:
+                queue.put({
+                    "link": link,
+                    "status": status,
+                    "content_hash": content_hash
+                })
+
+        def on_error(self, failure):
+            meta = failure.request.meta
+            status = meta.get("admission_status")
+            # Deferred documents are reported once downloaded
+            if status != "deferred":
+                self.report(meta.get("link", failure.request.url),
+                            status or "failed")
+
+        def parse(self, response):
+            if not isinstance(response, TextResponse):
+                self.report(
+                    response.meta.get("link", response.url), "document",
+                    hashlib.sha256(response.body).hexdigest()
+                )
+                return
+            data, content_hash = extract_article(response)
+            self.report(
+                response.meta.get("link", response.url), "ok", content_hash
+            )
 
             yield data
 
     return DynamicSpider
 
-def run_dynamic_spider(urls)-> None:
+def run_dynamic_spider(urls, queue=None)-> None:
     """
     Runs a dynamically generated Scrapy spider to scrape content from a list
     of URLs.
@@ -77,18 +208,28 @@ def run_dynamic_spider(urls)-> None:
     Features configured:
         - Disables default Scrapy logging to avoid console clutter.
         - Sets a realistic user-agent string for better scraping reliability.
-        - Enables a download delay and auto-throttling to reduce server load.
+        - Applies per-host delays (robots.txt crawl-delay, Retry-After) and
+          interleaves the hosts to reduce the load on every server.
         - Configures retries for transient HTTP errors (e.g., 429, 503).
-        - Saves scraped data into a local JSON file ("result.json").
+        - Aborts binary and oversized responses from their headers, and
+          downloads documents such as PDFs only once the articles are done
+          (see `app.scraping.admission`).
+        - Archives the raw pages when `RESPONSE_ARCHIVE_ENABLED` is set.
+        - Extracts the indicators of compromise of every article.
+        - Saves scraped data into a local JSON file ("result.json") and
+          upserts it in batches into the articles table.
 
     Args:
         urls (list[str]): A list of web URLs to be scraped.
+        queue (Queue, optional): A multiprocessing queue receiving the
+        outcome of every URL, followed by a `None` sentinel once the crawl
+        has finished.
     """
     configure_logging(install_root_handler=False)
     logging.getLogger('scrapy').propagate = False
     logging.getLogger().setLevel(logging.CRITICAL)
 
-    DynamicSpider = create_dynamic_spider(urls)
+    DynamicSpider = create_dynamic_spider(urls, queue)
 
     process = CrawlerProcess(settings={
         "LOG_ENABLED": False,
@@ -96,11 +237,20 @@ def run_dynamic_spider(urls)-> None:
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
             "(KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36"
         ),
-        "DOWNLOAD_DELAY": 2.0,  # 2 seconds between requests
-        "AUTOTHROTTLE_ENABLED": True,  # Adjusts delay based on load
+        **POLITENESS_SETTINGS,  # Per-host delays, robots.txt and Retry-After
+        **ARCHIVE_SETTINGS,  # Raw article pages, when enabled
+        "DOWNLOADER_MIDDLEWARES": {
+            **ADMISSION_MIDDLEWARE,
+            **POLITENESS_MIDDLEWARE
+        },
         "RETRY_ENABLED": True,
         "RETRY_TIMES": 5,  # Retry failed requests up to 5 times
         "RETRY_HTTP_CODES": [429, 500, 502, 503, 504],
+        "ITEM_PIPELINES": {
+            "app.scraping.indicators.IndicatorPipeline": 200,
+            "app.scraping.dedup.NearDuplicatePipeline": 300,
+            "app.scraping.articles.ArticlePipeline": 400
+        },
         "FEEDS": {
             "result.json": {
                 "format": "json",
@@ -113,38 +263,564 @@ def run_dynamic_spider(urls)-> None:
     process.crawl(DynamicSpider)
     process.start()
 
+    if queue is not None:
+        queue.put(None)
+
+
+class LinkQueue:
+    """
+    Reads batches of links ahead of the crawl into a bounded queue, so the
+    database round trips overlap the crawl while at most `size` batches are
+    held in memory. Iterate it inside `async with`, which stops the reader
+    when the crawl ends or fails.
+    """
+
+    def __init__(
+        self,
+        sources: AsyncIterator[List[str]],
+        size: int = LINK_QUEUE_SIZE
+    ):
+        self.sources = sources
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, size))
+        self._reader: Optional[asyncio.Task] = None
+
+    async def _read(self) -> None:
+        try:
+            async for urls in self.sources:
+                await self.queue.put(urls)
+        except Exception as e:
+            # Raised by the consumer in place of the next batch
+            await self.queue.put(e)
+            return
+        await self.queue.put(None)
+
+    async def __aenter__(self) -> "LinkQueue":
+        self._reader = asyncio.create_task(self._read())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._reader.cancel()
+        try:
+            await self._reader
+        except asyncio.CancelledError:
+            pass
+
+    def __aiter__(self) -> "LinkQueue":
+        return self
+
+    async def __anext__(self) -> List[str]:
+        urls = await self.queue.get()
+        if urls is None:
+            raise StopAsyncIteration
+        if isinstance(urls, Exception):
+            raise urls
+        return urls
 
-def run_dynamic_spider_from_db(pool)-> Coroutine[Any, Any, None]:
+
+async def store_validators(
+    validators: ValidatorStore,
+    results: List[LinkScrapeResult]
+) -> None:
+    """
+    Store the HTTP validators of the persisted link outcomes, so the pages
+    are fetched conditionally from now on. They are stored under the URL
+    that answered, so a redirected link never sends the validators of its
+    target. Runs off the event loop.
+    """
+    rows = [
+        result.validators
+        for result in results if result.validators is not None
+    ]
+    if rows:
+        await asyncio.to_thread(validators.put_many, rows)
+
+
+class ScrapeResultWriter(BatchWriter[LinkScrapeResult]):
+    """
+    Buffers the link outcomes of a crawl and persists them in batches as
+    crawl state, recording the written links in the seen-URL frontier.
+
+    The articles scraped before a batch of outcomes are written first, and
+    the HTTP validators of the batch are only stored once both writes
+    succeeded, so a page that could not be persisted is downloaded in full
+    and extracted again by the next crawl.
+    """
+
+    def __init__(
+        self,
+        pool,
+        frontier: Optional[SeenUrlFrontier] = None,
+        articles: Optional[ArticleWriter] = None,
+        validators: Optional[ValidatorStore] = None,
+        batch_size: int = LINK_BATCH_SIZE
+    ):
+        super().__init__(batch_size)
+        self.pool = pool
+        self.frontier = frontier
+        self.articles = articles
+        self.validators = validators
+
+    async def _write(self, batch: List[LinkScrapeResult]) -> None:
+        if self.articles is not None:
+            # The items of these links were added before their outcome
+            await self.articles.flush()
+        async with self.pool.acquire() as conn:
+            await record_scrape_results(conn, batch)
+        if self.validators is not None:
+            await store_validators(self.validators, batch)
+        if self.frontier is not None:
+            self.frontier.mark_seen(result.link for result in batch)
+
+
+async def stream_links(
+    crawlers,
+    batches: AsyncIterator[List[str]],
+    store,
+    dedup: NearDuplicateIndex,
+    articles: Optional[ArticleWriter] = None,
+    on_result: Optional[Callable[[LinkScrapeResult], None]] = None,
+    on_stats: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
+    full: bool = False
+) -> None:
+    """
+    Crawls batches of article URLs on the crawler pool as they are
+    produced, storing the scraped items that are not dropped as
+    near-duplicates in the result store and, when a writer is given, in the
+    searchable articles table.
+
+    Args:
+        crawlers (CrawlerPool): The pool of warm crawler worker processes.
+        batches (AsyncIterator[List[str]]): The batches of URLs to crawl.
+        store (ResultStore): The append-only store receiving scraped items.
+        dedup (NearDuplicateIndex): The near-duplicate index.
+        articles (ArticleWriter, optional): Batched writer of the articles
+        table.
+        on_result (Callable, optional): Called with every link outcome.
+        on_stats (Callable, optional): Called with the counters reported by
+        every finished batch.
+        on_item (Callable, optional): Called with every stored item, as
+        soon as it is scraped.
+        full (bool): Fetch every page unconditionally and extract it again.
+    """
+    cache_stats = ConditionalFetchStats()
+    # Items and link outcomes, in arrival order, waiting for the index
+    pending: List[Tuple[str, Any]] = []
+    segments: Set[asyncio.Task] = set()
+    errors: List[Exception] = []
+    index_lock = asyncio.Lock()
+
+    async def settle(messages: List[Tuple[str, Any]]) -> None:
+        # Segments are checked one at a time, in order, and the outcome of
+        # a link is only reported after the items scraped before it
+        async with index_lock:
+            try:
+                kept = iter(await asyncio.to_thread(dedup.process_many, [
+                    payload for kind, payload in messages if kind == "item"
+                ]))
+            except Exception as e:
+                # Raised once the crawl ends, before its watermark moves
+                errors.append(e)
+                return
+            for kind, payload in messages:
+                if kind == "link":
+                    if on_result is not None:
+                        on_result(LinkScrapeResult(**payload))
+                    continue
+                item = next(kept)
+                if item is not None:
+                    store.append(item)
+                    if articles is not None:
+                        articles.add(item)
+                    if on_item is not None:
+                        on_item(item)
+
+    def start_segment() -> None:
+        messages = pending[:]
+        pending.clear()
+        task = asyncio.create_task(settle(messages))
+        segments.add(task)
+        task.add_done_callback(segments.discard)
+
+    def on_message(kind: str, payload: Any) -> None:
+        if kind in ("item", "link"):
+            pending.append((kind, payload))
+            if len(pending) >= DEDUP_BATCH_SIZE:
+                start_segment()
+        elif kind == "stats":
+            cache_stats.merge(payload.get("cache", {}))
+            if on_stats is not None:
+                on_stats(payload)
+
+    try:
+        await crawlers.crawl_stream("dynamic", batches, on_message, full)
+    finally:
+        if pending:
+            start_segment()
+        await asyncio.gather(*segments)
+        await store.commit_async()
+        if articles is not None:
+            await articles.flush()
+    if errors:
+        raise errors[0]
+    logger.info("Conditional fetch: {}", cache_stats)
+    logger.info("Near-duplicates found: {}", dedup.duplicates)
+
+
+async def crawl_links(
+    crawlers,
+    urls: List[str],
+    store,
+    dedup: NearDuplicateIndex,
+    articles: Optional[ArticleWriter] = None,
+    on_result: Optional[Callable[[LinkScrapeResult], None]] = None,
+    on_stats: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
+    full: bool = False
+) -> List[LinkScrapeResult]:
+    """
+    Crawls a list of article URLs on the crawler pool, see `stream_links`.
+
+    Returns:
+        List[LinkScrapeResult]: The outcome of every URL.
+    """
+    results = []
+
+    def collect(result: LinkScrapeResult) -> None:
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    async def batches() -> AsyncIterator[List[str]]:
+        yield urls
+
+    await stream_links(
+        crawlers, batches(), store, dedup, articles, collect, on_stats,
+        on_item, full
+    )
+    return results
+
+
+async def cycle_links(
+    pool,
+    frontier: SeenUrlFrontier,
+    since_id: int,
+    until_id: int,
+    full: bool = False,
+    on_stats: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> AsyncIterator[List[str]]:
+    """
+    Streams the URLs of a crawl cycle in batches: the links of the entries
+    created since the previous cycle, canonicalized and filtered through
+    the seen-URL frontier (its hits confirmed against the crawl state),
+    then the known links due for a refresh or a retry. Every page of links
+    is read by its own short query on a connection of the pool, so none is
+    held while the batches are crawled.
+
+    A URL is queued once per cycle, even if its crawl state changes while
+    the due links are paged through. The keys of the queued URLs are kept in
+    a Bloom filter of fixed size, so memory does not grow with the cycle:
+    its hits on new links are confirmed against the crawl state like those
+    of the frontier, and a due link hit by a false positive stays due and
+    is refreshed on the next cycle.
+
+    Args:
+        pool (asyncpg.pool.Pool): The asyncpg connection pool.
+        frontier (SeenUrlFrontier): The seen-URL frontier.
+        since_id (int): Watermark of the previous cycle (exclusive).
+        until_id (int): Highest entry id covered by this cycle (inclusive).
+        full (bool): Re-fetch known pages, only variants are skipped.
+        on_stats (Callable, optional): Called for every batch with the
+        fetches prevented by the frontier and the number of queued URLs.
+
+    Yields:
+        List[str]: The URLs to crawl, never empty.
+    """
+    queued = BloomFilter(FRONTIER_CAPACITY, FRONTIER_ERROR_RATE)
+
+    async def confirm(urls: List[str]) -> Set[str]:
+        async with pool.acquire() as conn:
+            return await stored_links(conn, urls)
+
+    def report(urls: List[str], prevented: int = 0) -> None:
+        if on_stats is not None:
+            on_stats({"frontier": {"prevented": prevented},
+                      "queued": len(urls)})
+
+    after_id: Optional[int] = since_id
+    while after_id is not None:
+        async with pool.acquire() as conn:
+            links, after_id = await get_new_entry_links(
+                conn, after_id, until_id
+            )
+        prevented = frontier.prevented
+        urls = await frontier.filter_new(
+            links, skip_seen=not full, queued=queued, confirm=confirm
+        )
+        report(urls, frontier.prevented - prevented)
+        if urls:
+            yield urls
+
+    after_link: Optional[str] = ""
+    while after_link is not None:
+        async with pool.acquire() as conn:
+            links, after_link = await get_due_links(conn, after_link)
+        urls = [link for link in links if queued.add(url_key(link))]
+        report(urls)
+        if urls:
+            yield urls
+
+
+async def _heartbeat(pool, owner: str) -> None:
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        try:
+            async with pool.acquire() as conn:
+                await heartbeat_crawl_tasks(conn, owner)
+        except Exception as e:
+            # A missed beat is retried on the next interval, well before
+            # the leases expire
+            logger.warning("Crawl task heartbeat failed: {}", e)
+
+
+async def consume_crawl_tasks(
+    pool,
+    crawlers,
+    store,
+    dedup: NearDuplicateIndex,
+    owner: str,
+    until_drained: bool = True,
+    on_result: Optional[Callable[[LinkScrapeResult], None]] = None,
+    on_stats: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
+    full: bool = False
+) -> None:
+    """
+    Claims batches of links from the distributed crawl queue (see
+    `app.models.crawl_tasks_db`) and crawls them on the local crawler pool.
+
+    The leases of the claimed links are extended by a heartbeat while they
+    are crawled, and given back if the crawl is cancelled or fails. The
+    outcome of every link is persisted as crawl state and completes its
+    task, and the HTTP validators of the pages are stored afterwards.
+
+    Args:
+        pool (asyncpg.pool.Pool): The connection pool of the shared database.
+        crawlers (CrawlerPool): The pool of warm crawler worker processes.
+        store (ResultStore): The append-only store receiving scraped items.
+        dedup (NearDuplicateIndex): The near-duplicate index.
+        owner (str): Identifier of this worker in the task leases.
+        until_drained (bool): Return once no task is pending or leased by
+        any worker. When False, wait for new tasks forever.
+        on_result (Callable, optional): Called with every link outcome.
+        on_stats (Callable, optional): Called with the counters reported by
+        every finished batch.
+        on_item (Callable, optional): Called with every stored item.
+        full (bool): Fetch every page unconditionally and extract it again.
+    """
+    articles = ArticleWriter(pool)
+    validators = ValidatorStore()
+    while True:
+        async with pool.acquire() as conn:
+            await reap_crawl_tasks(conn)
+            links = await claim_crawl_tasks(conn, owner, TASK_CLAIM_SIZE)
+            remaining = 0 if links else await count_open_crawl_tasks(conn)
+
+        if not links:
+            if until_drained and not remaining:
+                return
+            # Other workers hold the remaining tasks, or there are none yet
+            await asyncio.sleep(TASK_IDLE_DELAY)
+            continue
+
+        logger.info("Claimed {} crawl tasks as {}", len(links), owner)
+        heartbeat = asyncio.create_task(_heartbeat(pool, owner))
+        try:
+            results = await crawl_links(
+                crawlers, links, store, dedup, articles, on_result, on_stats,
+                on_item, full
+            )
+        except BaseException:
+            # Cancelled or failed, e.g. by a database error: the tasks are
+            # claimable again at once, without counting the attempt
+            async with pool.acquire() as conn:
+                await release_crawl_tasks(conn, owner)
+            raise
+        finally:
+            heartbeat.cancel()
+
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await record_scrape_results(conn, results)
+                await complete_crawl_tasks(conn, owner, results)
+        await store_validators(validators, results)
+
+
+def run_dynamic_spider_from_db(
+    pool,
+    crawlers,
+    store,
+    force_full: bool = False,
+    on_cycle: Optional[Callable[[], None]] = None,
+    on_result: Optional[Callable[[LinkScrapeResult], None]] = None,
+    on_stats: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_item: Optional[Callable[[Dict[str, Any]], None]] = None
+)-> Coroutine[Any, Any, None]:
     """
     Creates and returns an asynchronous function that continuously runs the
     dynamic Scrapy spider.
 
     This function:
-    - Periodically acquires URLs from a PostgreSQL connection pool.
-    - Spawns a separate process to run a Scrapy spider using those URLs.
-    - Waits 60 seconds before repeating the process.
+    - Periodically acquires the pending URLs from a PostgreSQL connection
+      pool: entries created since the last cycle's watermark, canonicalized
+      and filtered through the seen-URL frontier (see
+      `app.scraping.frontier`), plus known links that are due for a refresh
+      or a retry. The links are read in pages of `LINK_BATCH_SIZE` by short
+      keyset queries, ahead of the crawl through a bounded `LinkQueue`, so
+      memory stays flat whatever the number of entries and no connection
+      or transaction is held across the cycle.
+    - Hands those URLs in batches to the warm workers of the crawler pool
+      as they are read and waits for them without blocking the event loop.
+      Pages are fetched conditionally, and unchanged (304) pages are not
+      extracted again.
+      With `CRAWL_DISTRIBUTED` enabled, the URLs are queued as crawl tasks
+      instead, and this node crawls them together with the task workers of
+      any other node until the queue is drained.
+    - Checks the scraped items against the near-duplicate index (see
+      `app.scraping.dedup`), appends them to the result store and upserts
+      them in batches into the searchable articles table, persists the
+      outcome of every link in batches and advances the watermark.
+    - Waits 5 seconds before repeating the process, and stops once no URL
+      is pending.
 
     Args:
         pool (asyncpg.pool.Pool): The asyncpg connection pool for database
         access.
+        crawlers (CrawlerPool): The pool of warm crawler worker processes.
+        store (ResultStore): The append-only store receiving scraped items.
+        force_full (bool): Ignore the watermark on the first cycle and
+        re-crawl every entry link in the database, downloading every page
+        unconditionally so that unchanged pages are extracted again.
+        on_cycle (Callable, optional): Called when the first URLs of a cycle
+        are queued.
+        on_result (Callable, optional): Called with every link outcome.
+        on_stats (Callable, optional): Called with the counters reported by
+        every finished batch (e.g. conditional-fetch hits and misses), and
+        with the URLs queued and the fetches prevented by the frontier for
+        every batch of links read from the database.
+        on_item (Callable, optional): Called with every stored item, as
+        soon as it is scraped (e.g. to stream it to clients).
 
     Returns:
         Callable[[], None]: An asynchronous function that starts the continuous
         spider execution loop.
     """
     async def run()-> None:
+        full = force_full
+        dedup = NearDuplicateIndex()
+        frontier = SeenUrlFrontier()
+        try:
+            await crawl(full, dedup, frontier)
+        finally:
+            dedup.close()
+            frontier.save()
+
+    async def crawl(
+        full: bool,
+        dedup: NearDuplicateIndex,
+        frontier: SeenUrlFrontier
+    ) -> None:
+        owner = task_owner()
+        articles = ArticleWriter(pool)
+        validators = ValidatorStore()
         while True:
             async with pool.acquire() as conn:
-                urls = await get_entry_links(conn)
-                if not urls:
-                    print("No URLs found to process.")
-                    return
+                since_id = 0 if full else await get_watermark(conn)
+                until_id = await get_max_entry_id(conn)
+            logger.info(
+                "Crawling entries {}..{} (full={})", since_id, until_id, full
+            )
+
+            prevented = frontier.prevented
+            queued = 0
+
+            def count(stats: Dict[str, Any]) -> None:
+                nonlocal queued
+                if not queued and stats["queued"] and on_cycle is not None:
+                    on_cycle()
+                queued += stats["queued"]
+                if on_stats is not None:
+                    on_stats(stats)
+
+            if CRAWL_DISTRIBUTED:
+                tasks = 0
+                # Queuing a link again is a no-op while its task is open,
+                # so a cycle interrupted before its watermark moves is
+                # safely queued again
+                async for urls in cycle_links(
+                    pool, frontier, since_id, until_id, full, count
+                ):
+                    async with pool.acquire() as conn:
+                        tasks += await enqueue_crawl_tasks(conn, urls)
+                    frontier.mark_seen(urls)
+                async with pool.acquire() as conn:
+                    await set_watermark(conn, until_id)
+                logger.info(
+                    "Seen-URL frontier prevented {} fetches",
+                    frontier.prevented - prevented
+                )
+                if queued:
+                    logger.info("Queued {} crawl tasks", tasks)
+                    frontier.save()
+                    await consume_crawl_tasks(
+                        pool, crawlers, store, dedup, owner,
+                        on_result=on_result, on_stats=on_stats,
+                        on_item=on_item, full=full
+                    )
+            else:
+                results = ScrapeResultWriter(
+                    pool, frontier, articles, validators
+                )
 
-                p = Process(target=run_dynamic_spider, args=(urls,))
-                p.start()
-                p.join()
+                def record(result: LinkScrapeResult) -> None:
+                    results.add(result)
+                    if on_result is not None:
+                        on_result(result)
 
+                links = cycle_links(
+                    pool, frontier, since_id, until_id, full, count
+                )
+                async with LinkQueue(links) as batches:
+                    try:
+                        await stream_links(
+                            crawlers, batches, store, dedup, articles,
+                            record, on_stats, on_item, full
+                        )
+                    finally:
+                        await results.flush()
+                logger.info(
+                    "Seen-URL frontier prevented {} fetches",
+                    frontier.prevented - prevented
+                )
+                async with pool.acquire() as conn:
+                    await set_watermark(conn, until_id)
+                frontier.save()
+
+            if not queued:
+                logger.info("No new or due URLs found to process.")
+                return
+            logger.info("Crawled {} URLs", queued)
+
+            full = False
             logger.info("Waiting for next run...")
-            time.sleep(5)
+            await asyncio.sleep(CYCLE_DELAY)
 
     return run()
+
+
+def task_owner() -> str:
+    """
+    Returns an identifier of the current process, unique across nodes, used
+    as the owner of crawl task leases.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
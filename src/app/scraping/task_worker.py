@@ -0,0 +1,76 @@
+# @ Author: Ignacio Fernandez Belda. Aitea Tech Becarios
+# <nachofernandezbelda@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: Standalone crawl task worker.
+#
+# Runs on any node that can reach the shared PostgreSQL database (see
+# `app.db.session` for the `POSTGRES_*` settings) and crawls the links queued
+# in the `crawl_tasks` table by an API running with `CRAWL_DISTRIBUTED`
+# enabled. Links are claimed in leased batches with `FOR UPDATE SKIP LOCKED`
+# (see `app.models.crawl_tasks_db`), so several workers never crawl the same
+# link, and the links of a worker that dies are claimed again by the others
+# once its leases expire.
+#
+# The scraped items are upserted into the shared `articles` table, and
+# written to a result store and a near-duplicate index local to the worker.
+# Run it from the `src` directory with:
+#
+#     python -m app.scraping.task_worker
+
+import asyncio
+import os
+from loguru import logger
+from app.db.session import create_db_pool
+from app.models.articles_db import ensure_articles_table
+from app.models.crawl_tasks_db import ensure_crawl_task_table
+from app.scraping.crawler_pool import CrawlerPool
+from app.scraping.dedup import NearDuplicateIndex
+from app.scraping.result_store import ResultStore
+from app.scraping.spider_factory import consume_crawl_tasks, task_owner
+
+# Result store of the worker, kept apart from the one written by the API
+WORKER_RESULT_DIR = os.getenv("TASK_WORKER_RESULT_DIR", "data/worker_results")
+
+
+async def run_worker() -> None:
+    """
+    Claims and crawls queued links until the process is interrupted, then
+    gives back the links it still holds.
+    """
+    owner = task_owner()
+    pool = await create_db_pool(min_size=1, max_size=4)
+    crawlers = CrawlerPool()
+    store = ResultStore(WORKER_RESULT_DIR)
+    dedup = NearDuplicateIndex()
+    try:
+        async with pool.acquire() as conn:
+            await ensure_crawl_task_table(conn)
+            await ensure_articles_table(conn)
+        crawlers.start()
+        logger.info("Crawl task worker {} started", owner)
+        await consume_crawl_tasks(
+            pool, crawlers, store, dedup, owner, until_drained=False
+        )
+    finally:
+        await crawlers.close()
+        store.close()
+        dedup.close()
+        await pool.close()
+        logger.info("Crawl task worker {} stopped", owner)
+
+
+def main() -> None:
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
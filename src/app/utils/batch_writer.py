@@ -0,0 +1,85 @@
+# @ Author: Antonio Llorente. Aitea Tech Becarios
+# <antoniollorentecuenca@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: Base class of the writers that buffer records on the event
+# loop and persist them in batches from background tasks, such as the
+# articles and the crawl state written by the continuous crawl.
+#
+# `add()` never blocks: a full batch is handed to a task running the
+# subclass's `_write()`. A batch that fails is not retried; its error is
+# kept and raised by `flush()`, so the caller stops before it records the
+# work as done (e.g. before a crawl cycle advances its watermark).
+
+import asyncio
+from typing import Generic, List, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+
+class BatchWriter(Generic[T]):
+    """
+    Buffers records and writes them in batches of `batch_size` without
+    blocking the caller. Subclasses implement `_write`.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = max(1, batch_size)
+        self.written = 0
+        self.failed = 0
+        self._buffer: List[T] = []
+        self._writes: Set[asyncio.Task] = set()
+        self._error: Optional[Exception] = None
+
+    def add(self, record: T) -> None:
+        """
+        Buffer a record, starting a write once a batch is full. Must be
+        called from the running event loop.
+        """
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._start_write()
+
+    def _start_write(self) -> None:
+        batch, self._buffer = self._buffer, []
+        task = asyncio.create_task(self._run(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _run(self, batch: List[T]) -> None:
+        try:
+            await self._write(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            if self._error is None:
+                self._error = e
+            return
+        self.written += len(batch)
+
+    async def _write(self, batch: List[T]) -> None:
+        """
+        Persist a batch of records.
+
+        Raises:
+            Exception: If the batch could not be written.
+        """
+        raise NotImplementedError
+
+    async def flush(self) -> None:
+        """
+        Write the buffered records and wait for every pending batch.
+
+        Raises:
+            Exception: The error of the first batch that failed.
+        """
+        if self._buffer:
+            self._start_write()
+        if self._writes:
+            await asyncio.gather(*self._writes)
+        if self._error is not None:
+            raise self._error
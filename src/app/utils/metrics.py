@@ -0,0 +1,462 @@
+# @ Author: Antonio Llorente. Aitea Tech Becarios
+# <antoniollorentecuenca@gmail.com>
+
+# @ Create Time: 2026-10-18 12:17:59
+
+# @ Modified time: 2026-10-18 12:17:59
+
+# @ Project: Cebolla
+
+# @ Description: Minimal metrics registry rendered in the Prometheus text
+# exposition format at `/metrics`.
+#
+# Counters, gauges and histograms are declared once in this module, so the
+# API process and the crawler worker processes share the same definitions.
+# Workers record into their own copy of the registry and send the counts
+# accumulated since the previous batch with every finished batch (see
+# `Registry.drain()`); the API process adds them to its own registry with
+# `Registry.merge()`, so `/metrics` reports the whole crawler pool.
+
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    30.0, 60.0
+)
+
+# Upper bounds, in seconds, of the crawler process lifetime buckets
+LIFETIME_BUCKETS = (60.0, 300.0, 900.0, 3600.0, 6 * 3600.0, 24 * 3600.0)
+
+
+def _escape(value: str) -> str:
+    return (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any):
+        """
+        Return the child of the metric for a combination of label values.
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}"
+                )
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def header(self) -> List[str]:
+        documentation = (
+            self.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        )
+        return [
+            f"# HELP {self.name} {documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """
+    Monotonic counter, summed across processes.
+    """
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} "
+            f"{_format_value(child.value)}"
+            for key, child in self._children.items()
+        ]
+
+    def drain(self) -> List[Tuple[Tuple[str, ...], float]]:
+        drained = [(key, child.value)
+                   for key, child in self._children.items() if child.value]
+        for child in self._children.values():
+            child.value = 0.0
+        return drained
+
+    def merge(self, drained) -> None:
+        for key, value in drained:
+            self.labels(*key).inc(value)
+
+
+class Gauge(Counter):
+    """
+    Value that goes up and down, set by the API process only.
+    """
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def drain(self) -> List:
+        return []
+
+
+class _Observations:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """
+        Observe the duration of the `with` block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets, summed across
+    processes.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _new_child(self) -> _Observations:
+        return _Observations(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames + ("le",), key + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(
+                f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            )
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+    def drain(self) -> List:
+        drained = []
+        for key, child in self._children.items():
+            if child.count:
+                drained.append((key, child.counts, child.sum, child.count))
+                # Reset in place, callers may hold on to the child
+                child.counts = [0] * len(self.buckets)
+                child.sum = 0.0
+                child.count = 0
+        return drained
+
+    def merge(self, drained) -> None:
+        for key, counts, total, count in drained:
+            child = self.labels(*key)
+            for index, bucket_count in enumerate(counts):
+                child.counts[index] += bucket_count
+            child.sum += total
+            child.count += count
+
+
+class Registry:
+    """
+    Set of metrics rendered together.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """
+        Forget the counts recorded so far. Called by the crawler workers on
+        start, since a forked worker inherits the counts of the API process
+        and would otherwise send them back to be merged a second time.
+        """
+        self.drain()
+
+    def drain(self) -> Dict[str, List]:
+        """
+        Return the counts recorded since the previous call, and reset them.
+        Used by the crawler workers to report to the API process.
+        """
+        drained = {}
+        for name, metric in self._metrics.items():
+            values = metric.drain()
+            if values:
+                drained[name] = values
+        return drained
+
+    def merge(self, drained: Dict[str, List]) -> None:
+        """
+        Add the counts drained from the registry of another process.
+        """
+        for name, values in drained.items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+
+REGISTRY = Registry()
+
+# Crawler workers
+PAGES = REGISTRY.counter(
+    "crawler_pages_total",
+    "Pages crawled, by host and outcome (ok, not_modified, document, "
+    "rejected, too_large, failed).",
+    ("domain", "status")
+)
+RESPONSE_BYTES = REGISTRY.counter(
+    "crawler_response_bytes_total",
+    "Bytes of response bodies downloaded, by host.",
+    ("domain",)
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "crawler_stage_seconds",
+    "Latency of the crawl stages: download, parse, archive, feedparser, "
+    "db_insert.",
+    ("stage",)
+)
+WORKERS_ALIVE = REGISTRY.gauge(
+    "crawler_workers_alive",
+    "Crawler worker processes currently running."
+)
+WORKER_RESTARTS = REGISTRY.counter(
+    "crawler_worker_restarts_total",
+    "Crawler worker processes that exited and were respawned."
+)
+WORKER_LIFETIME = REGISTRY.histogram(
+    "crawler_worker_lifetime_seconds",
+    "Lifetime of the crawler worker processes that exited.",
+    buckets=LIFETIME_BUCKETS
+)
+
+ADMISSION = REGISTRY.counter(
+    "crawler_admission_total",
+    "Responses by content category and admission outcome (admitted, "
+    "rejected, too_large, deferred).",
+    ("category", "outcome")
+)
+
+ARCHIVE_RECORDS = REGISTRY.counter(
+    "crawler_archived_responses_total",
+    "Raw responses appended to the response archive."
+)
+ARCHIVE_BYTES = REGISTRY.counter(
+    "crawler_archived_bytes_total",
+    "Compressed bytes appended to the response archive."
+)
+
+# Live result stream
+STREAM_SUBSCRIBERS = REGISTRY.gauge(
+    "stream_subscribers",
+    "Clients currently subscribed to the live result stream."
+)
+STREAM_PUBLISHED = REGISTRY.counter(
+    "stream_items_published_total",
+    "Scraped items published to the live result stream."
+)
+STREAM_DROPPED = REGISTRY.counter(
+    "stream_items_dropped_total",
+    "Items dropped from the buffer of a slow stream subscriber."
+)
+
+# Feed discovery
+FEEDS_DISCOVERED = REGISTRY.counter(
+    "feeds_discovered_total",
+    "Distinct feed URLs found on the scanned websites."
+)
+FEED_DISCOVERY_CACHE = REGISTRY.counter(
+    "feed_discovery_cache_total",
+    "Domains looked up in the feed discovery cache, by result (hit, miss).",
+    ("result",)
+)
+FEED_PROBES = REGISTRY.counter(
+    "feed_probes_total",
+    "URLs probed for a feed, by outcome (feed, not_feed, error).",
+    ("outcome",)
+)
+FEED_FETCHES = REGISTRY.counter(
+    "feed_fetches_total",
+    "Feeds downloaded, by outcome (ok, not_modified, error).",
+    ("status",)
+)
+FEEDS_STORED = REGISTRY.counter(
+    "feeds_stored_total",
+    "Validated feeds written to the database, by outcome (inserted, "
+    "duplicate, error).",
+    ("status",)
+)
+
+# Feed scheduler
+FEED_POLLS = REGISTRY.counter(
+    "feed_polls_total",
+    "Scheduled feed polls, by outcome (changed, unchanged, error).",
+    ("outcome",)
+)
+FEED_POLL_LAG = REGISTRY.histogram(
+    "feed_poll_lag_seconds",
+    "Delay between the time a feed was due and the time it was polled."
+)
+FEEDS_SCHEDULED = REGISTRY.gauge(
+    "feed_scheduler_feeds",
+    "Feeds known to the scheduler."
+)
+FEEDS_DUE = REGISTRY.gauge(
+    "feed_scheduler_due_feeds",
+    "Feeds due for a poll and waiting for the poll budget."
+)
+
+# Database pools
+DB_POOL_SIZE = REGISTRY.gauge(
+    "db_pool_connections",
+    "Connections opened by the database pool.",
+    ("pool",)
+)
+DB_POOL_IDLE = REGISTRY.gauge(
+    "db_pool_idle_connections",
+    "Open connections of the database pool not in use.",
+    ("pool",)
+)
+DB_POOL_MAX = REGISTRY.gauge(
+    "db_pool_max_connections",
+    "Maximum number of connections of the database pool.",
+    ("pool",)
+)
+DB_POOL_WAITING = REGISTRY.gauge(
+    "db_pool_waiting_requests",
+    "Callers currently waiting for a connection of the database pool.",
+    ("pool",)
+)
+DB_ACQUIRE_SECONDS = REGISTRY.histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a connection of the database pool.",
+    ("pool",)
+)
+DB_ACQUIRE_TIMEOUTS = REGISTRY.counter(
+    "db_pool_acquire_timeouts_total",
+    "Waits for a connection of the database pool that timed out.",
+    ("pool",)
+)
+DB_CHECKOUT_SECONDS = REGISTRY.histogram(
+    "db_pool_checkout_seconds",
+    "Time a connection of the database pool is held by its caller.",
+    ("pool",)
+)
+
+
+def collect(pools=(), crawlers=None) -> None:
+    """
+    Update the gauges read from the live state of the API process.
+
+    Args:
+        pools (Iterable[MeteredPool]): The database connection pools.
+        crawlers (CrawlerPool, optional): The pool of crawler workers.
+    """
+    for pool in pools:
+        DB_POOL_SIZE.labels(pool.name).set(pool.get_size())
+        DB_POOL_IDLE.labels(pool.name).set(pool.get_idle_size())
+        DB_POOL_MAX.labels(pool.name).set(pool.get_max_size())
+        DB_POOL_WAITING.labels(pool.name).set(pool.waiting)
+    if crawlers is not None:
+        WORKERS_ALIVE.set(crawlers.alive_workers())
@@ -16,9 +16,20 @@
 
 from app.controllers.tiny_postgres_controller import router as postgre_feeds
 from app.controllers.scrapy_news_controller import router as newsSpider
+from app.controllers.metrics_controller import router as metrics
+from app.db.session import create_db_pool
+from app.models.articles_db import ensure_articles_table
+from app.models.crawl_state_db import ensure_crawl_state_tables
+from app.models.crawl_tasks_db import ensure_crawl_task_table
+from app.models.feed_schedule_db import ensure_feed_schedule_table
+from app.scraping.broadcast import BroadcastChannel
+from app.scraping.crawler_pool import CrawlerPool
+from app.scraping.feed_scheduler import FEED_SCHEDULER_ENABLED, FeedScheduler
+from app.scraping.jobs import CrawlJobManager
+from app.scraping.result_store import ResultStore
+from app.scraping.sipder_rss import shutdown_feed_parsers
 from loguru import logger
 from fastapi import FastAPI
-import asyncpg
 import uvicorn
 
 
@@ -27,15 +38,30 @@ app = FastAPI()
 # Include the feeds router (which handles Scrapy-related routes)
 app.include_router(postgre_feeds)
 app.include_router(newsSpider)
+app.include_router(metrics)
+
+# Live feed of the scraped items, read through /newsSpider/stream
+app.state.stream = BroadcastChannel()
+
+# Background crawl jobs started through the news spider router
+app.state.jobs = CrawlJobManager(app.state.stream)
+
+# Append-only store of the scraped items, read through /newsSpider/results
+app.state.results = ResultStore()
 
 # Create a connection pool for the PostgreSQL database
 async def create_pool()-> None:
     """
-    Initializes a connection pool to the PostgreSQL database using asyncpg.
+    Initializes the connection pools to the PostgreSQL database using asyncpg.
 
-    This function sets up a connection pool and attaches it to the global
-    application state (`app.state.pool`). This allows other parts of the
-    application to reuse database connections efficiently.
+    This function sets up two connection pools and attaches them to the
+    global application state: `app.state.api_pool` serves the queries of the
+    HTTP endpoints, and `app.state.pool` the crawl jobs, the feed discovery
+    and the exports, which hold connections for longer (see
+    `app.db.session`). This allows other parts of the application to reuse
+    database connections efficiently. It also makes sure the tables holding
+    the incremental crawl state, the distributed crawl queue, the
+    searchable articles and the feed polling schedule exist.
 
     Raises:
         Exception: If there is an error during the creation of the connection
@@ -43,17 +69,16 @@ async def create_pool()-> None:
     """
     try:
         logger.info("Database connecting...")
-        app.state.pool = await asyncpg.create_pool(
-            user='postgres',
-            password='password123',
-            database='postgres',
-            host='127.0.0.1', # ONLY DEVELOPER, PORT EXPOSED DB TINY POSTGRES
-            port=5432,
-            min_size=5,
-            max_size=20
-        )
-
-        logger.info("Database connection pool created successfully.")
+        app.state.pool = await create_db_pool("batch")
+        app.state.api_pool = await create_db_pool("api")
+
+        async with app.state.pool.acquire() as conn:
+            await ensure_crawl_state_tables(conn)
+            await ensure_crawl_task_table(conn)
+            await ensure_articles_table(conn)
+            await ensure_feed_schedule_table(conn)
+
+        logger.info("Database connection pools created successfully.")
     except Exception as e:
         logger.error(f"Error creating database connection pool: {str(e)}")
         raise e
@@ -61,18 +86,78 @@ async def create_pool()-> None:
 
 async def close_pool()-> None:
     """
-    Closes the database connection pool if it exists.
+    Closes the database connection pools that exist.
+
+    This function checks whether the FastAPI application's state has active
+    PostgreSQL connection pools (`app.state.api_pool`, `app.state.pool`).
+    If it does, it closes them to gracefully release all database
+    connections.
+    """
+    for name in ("api_pool", "pool"):
+        if hasattr(app.state, name):
+            await getattr(app.state, name).close()
+    logger.info("Database connection pools closed.")
+
+async def start_crawlers()-> None:
+    """
+    Starts the pool of warm crawler worker processes shared by the news
+    spider jobs and the RSS discovery, sized by `CRAWLER_POOL_SIZE`.
+    """
+    app.state.crawlers = CrawlerPool()
+    app.state.crawlers.start()
+
+
+async def stop_crawlers()-> None:
+    """
+    Stops the crawler worker processes if the pool was started.
+    """
+    if hasattr(app.state, "crawlers"):
+        await app.state.crawlers.close()
 
-    This function checks whether the FastAPI application's state has an
-    active PostgreSQL connection pool (`app.state.pool`). If it does,
-    it closes the pool to gracefully release all database connections.
+
+async def start_feed_scheduler()-> None:
+    """
+    Starts the adaptive feed polling scheduler when `FEED_SCHEDULER_ENABLED`
+    is set. It polls the stored feeds on the batch connection pool.
+    """
+    if FEED_SCHEDULER_ENABLED:
+        app.state.feed_scheduler = FeedScheduler(app.state.pool)
+        app.state.feed_scheduler.start()
+
+
+async def stop_feed_scheduler()-> None:
+    """
+    Stops the feed scheduler if it was started.
+    """
+    if hasattr(app.state, "feed_scheduler"):
+        await app.state.feed_scheduler.close()
+
+
+async def stop_feed_parsers()-> None:
+    """
+    Shuts down the shared pool of feed parser processes if it was started.
+    """
+    await shutdown_feed_parsers()
+
+
+async def stop_jobs()-> None:
+    """
+    Cancels the running crawl jobs and terminates their crawler processes
+    before the connection pool is closed, then commits the result store and
+    ends the live result streams.
     """
-    if hasattr(app.state, "pool"):
-        await app.state.pool.close()
-        logger.info("Database connection pool closed.")
+    await app.state.jobs.shutdown()
+    app.state.results.close()
+    app.state.stream.close()
 
 # Register event handlers OUTSIDE of __main__ block so they are used by uvicorn
 app.add_event_handler("startup", create_pool)
+app.add_event_handler("startup", start_crawlers)
+app.add_event_handler("startup", start_feed_scheduler)
+app.add_event_handler("shutdown", stop_jobs)
+app.add_event_handler("shutdown", stop_feed_scheduler)
+app.add_event_handler("shutdown", stop_feed_parsers)
+app.add_event_handler("shutdown", stop_crawlers)
 app.add_event_handler("shutdown", close_pool)
 
 # Main entry point
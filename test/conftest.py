@@ -0,0 +1,7 @@
+# The application is imported as `app`, from the `src` directory
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+)
@@ -0,0 +1,32 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+for module in ("fastapi", "loguru", "pydantic", "asyncpg", "scrapy"):
+    pytest.importorskip(module)
+
+from app.controllers.scrapy_news_controller import stream_results
+from app.scraping.broadcast import BroadcastChannel
+
+
+def fake_request(channel):
+    return SimpleNamespace(
+        app=SimpleNamespace(state=SimpleNamespace(stream=channel)),
+        headers={}
+    )
+
+
+def test_stream_slot_is_freed_without_reading():
+    channel = BroadcastChannel(max_subscribers=1)
+
+    async def run():
+        response = await stream_results(fake_request(channel), "ndjson")
+        assert len(channel.subscribers) == 1
+        # The client left before the first item: only the background task
+        # of the response runs
+        await response.background()
+
+    asyncio.run(run())
+    assert not channel.subscribers
+    channel.subscribe()
@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("scrapy")
+
+from app.scraping.admission import classify_content_type, sniff_content
+
+
+@pytest.mark.parametrize("value, expected", [
+    (b"text/html; charset=utf-8", "html"),
+    (b"application/xhtml+xml", "html"),
+    (b"application/rss+xml", "feed"),
+    (b"application/atom+xml; charset=UTF-8", "feed"),
+    (b"application/rdf+xml", "feed"),
+    (b"Application/RSS+XML", "feed"),
+    (b"application/feed+json", "feed"),
+    (b"text/xml", "feed"),
+    (b"text/plain", "text"),
+    (b"application/pdf", "document"),
+    (
+        b"application/vnd.openxmlformats-officedocument."
+        b"wordprocessingml.document",
+        "document"
+    ),
+    (b"image/png", "binary"),
+    (b"image/svg+xml", "binary"),
+    (b"video/mp4", "binary"),
+    (b"application/zip", "binary"),
+    # XML and JSON types other than feeds
+    (b"application/mathml+xml", "binary"),
+    (b"application/json", "binary"),
+])
+def test_content_types(value, expected):
+    assert classify_content_type(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    None, b"", b"application/octet-stream", b"binary/octet-stream; x=y"
+])
+def test_generic_content_types_are_sniffed(value):
+    assert classify_content_type(value) is None
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b"%PDF-1.7\n", "document"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "document"),
+    (b"\x89PNG\r\n\x1a\n", "binary"),
+    (b"PK\x03\x04", "binary"),
+    (b'<?xml version="1.0"?>\n<rss version="2.0">', "feed"),
+    (b"  <feed xmlns=\"http://www.w3.org/2005/Atom\">", "feed"),
+    (b'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">',
+     "feed"),
+    (b'{"version": "https://jsonfeed.org/version/1.1", "items": []}',
+     "feed"),
+    (b'<svg xmlns="http://www.w3.org/2000/svg">', "binary"),
+    (b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg">',
+     "binary"),
+    (b"<!DOCTYPE html><html><body><svg></svg></body></html>", "html"),
+    (b'{"ok": true}', "html"),
+    (b"", "html"),
+])
+def test_sniffed_content(data, expected):
+    assert sniff_content(data) == expected
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app.utils.batch_writer import BatchWriter
+
+
+class ListWriter(BatchWriter[int]):
+
+    def __init__(self, batch_size, fail_on=None):
+        super().__init__(batch_size)
+        self.batches = []
+        self.fail_on = fail_on
+
+    async def _write(self, batch):
+        await asyncio.sleep(0)
+        if self.fail_on in batch:
+            raise RuntimeError(f"cannot write {self.fail_on}")
+        self.batches.append(batch)
+
+
+def test_records_are_written_in_batches():
+    writer = ListWriter(batch_size=3)
+
+    async def run():
+        for record in range(7):
+            writer.add(record)
+        # Full batches are written in the background
+        assert len(writer._writes) == 2
+        await writer.flush()
+
+    asyncio.run(run())
+    assert sorted(writer.batches) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert writer.written == 7
+    assert writer.failed == 0
+
+
+def test_flush_raises_the_failed_batch():
+    writer = ListWriter(batch_size=2, fail_on=3)
+
+    async def run():
+        for record in range(5):
+            writer.add(record)
+        await writer.flush()
+
+    with pytest.raises(RuntimeError, match="cannot write 3"):
+        asyncio.run(run())
+    assert writer.written == 3
+    assert writer.failed == 2
+
+
+def test_flush_without_records():
+    writer = ListWriter(batch_size=2)
+    asyncio.run(writer.flush())
+    assert writer.batches == []
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+
+from app.scraping.broadcast import BroadcastChannel
+from app.utils.metrics import STREAM_DROPPED
+
+
+def read_all(subscription):
+    """
+    Read the buffered items without waiting, with the drops reported
+    before each one.
+    """
+    async def run():
+        received = []
+        while subscription.buffer:
+            message, dropped = await subscription.get(timeout=0)
+            received.append((json.loads(message)["n"], dropped))
+        return received
+
+    return asyncio.run(run())
+
+
+def test_every_subscriber_gets_every_item():
+    channel = BroadcastChannel(buffer_size=10)
+    first, second = channel.subscribe(), channel.subscribe()
+    for n in range(3):
+        channel.publish({"n": n})
+    expected = [(0, 0), (1, 0), (2, 0)]
+    assert read_all(first) == expected
+    assert read_all(second) == expected
+    # The item is serialized once and shared
+    channel.publish({"n": 3})
+    assert first.buffer[0] is second.buffer[0]
+
+
+def test_slow_subscriber_drops_its_oldest_items():
+    channel = BroadcastChannel(buffer_size=3)
+    slow = channel.subscribe()
+    fast = channel.subscribe(buffer_size=100)
+    before = STREAM_DROPPED.labels().value
+    for n in range(10):
+        channel.publish({"n": n})
+    # Publishing never waits for the slow subscriber
+    assert len(slow.buffer) == 3
+    assert STREAM_DROPPED.labels().value - before == 7
+    # The drops are reported once, before the next item received
+    assert read_all(slow) == [(7, 7), (8, 0), (9, 0)]
+    assert read_all(fast) == [(n, 0) for n in range(10)]
+
+
+def test_drops_are_reported_again_after_reading():
+    channel = BroadcastChannel(buffer_size=2)
+    slow = channel.subscribe()
+    for n in range(4):
+        channel.publish({"n": n})
+    assert read_all(slow) == [(2, 2), (3, 0)]
+    for n in range(4, 7):
+        channel.publish({"n": n})
+    assert read_all(slow) == [(5, 1), (6, 0)]
+
+
+def test_get_times_out_without_items():
+    channel = BroadcastChannel()
+    subscription = channel.subscribe()
+    message, dropped = asyncio.run(subscription.get(timeout=0.01))
+    assert (message, dropped) == (None, 0)
+    assert not subscription.finished
+
+
+def test_waiting_subscriber_is_woken_by_publish():
+    channel = BroadcastChannel()
+    subscription = channel.subscribe()
+
+    async def run():
+        waiting = asyncio.create_task(subscription.get())
+        await asyncio.sleep(0)
+        channel.publish({"n": 1})
+        return await asyncio.wait_for(waiting, 1)
+
+    message, dropped = asyncio.run(run())
+    assert (json.loads(message), dropped) == ({"n": 1}, 0)
+
+
+def test_close_ends_subscriptions_once_read():
+    channel = BroadcastChannel()
+    subscription = channel.subscribe()
+    channel.publish({"n": 1})
+    channel.close()
+    assert not subscription.finished
+    assert read_all(subscription) == [(1, 0)]
+    assert subscription.finished
+    with pytest.raises(RuntimeError):
+        channel.subscribe()
+
+
+def test_subscribers_are_limited_and_released():
+    channel = BroadcastChannel(max_subscribers=1)
+    with channel.subscribe():
+        with pytest.raises(RuntimeError):
+            channel.subscribe()
+        channel.publish({"n": 1})
+    assert not channel.subscribers
+    channel.subscribe()
@@ -0,0 +1,134 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("pydantic")
+
+from app.models.crawl_state_db import (
+    FINAL_STATUSES,
+    get_due_links,
+    get_new_entry_links,
+    get_watermark,
+    set_watermark,
+    stored_links
+)
+
+
+class FakeConnection:
+    """
+    In-memory stand-in for the watermark and crawl state tables.
+    """
+
+    def __init__(self, links=()):
+        self.watermarks = {}
+        self.links = set(links)
+        self.queries = 0
+
+    async def fetchval(self, query, name):
+        self.queries += 1
+        return self.watermarks.get(name)
+
+    async def execute(self, query, name, entry_id):
+        self.queries += 1
+        self.watermarks[name] = entry_id
+
+    async def fetch(self, query, links):
+        self.queries += 1
+        return [{"link": link} for link in links if link in self.links]
+
+
+def test_watermark_starts_at_zero():
+    assert asyncio.run(get_watermark(FakeConnection())) == 0
+
+
+def test_watermark_round_trip():
+    conn = FakeConnection()
+
+    async def run():
+        await set_watermark(conn, 42)
+        await set_watermark(conn, 7, name="other")
+        return await get_watermark(conn), await get_watermark(conn, "other")
+
+    assert asyncio.run(run()) == (42, 7)
+
+
+def test_stored_links():
+    conn = FakeConnection(["https://example.com/a"])
+    assert asyncio.run(stored_links(
+        conn, ["https://example.com/a", "https://example.com/b"]
+    )) == {"https://example.com/a"}
+    assert asyncio.run(stored_links(conn, [])) == set()
+    assert conn.queries == 1
+
+
+class FakeEntries:
+    """
+    In-memory stand-in for the ttrss_entries table.
+    """
+
+    def __init__(self, links):
+        self.rows = [{"id": i, "link": link}
+                     for i, link in enumerate(links, 1)]
+        self.queries = 0
+
+    async def fetch(self, query, after, until_id, limit):
+        self.queries += 1
+        rows = [row for row in self.rows if row["link"] is not None
+                and after < row["id"] <= until_id]
+        return rows[:limit]
+
+
+def test_new_entry_links_are_paged_by_id():
+    conn = FakeEntries(["a", None, "b", "c", "d", "e"])
+
+    async def run():
+        pages, after = [], 1
+        while after is not None:
+            links, after = await get_new_entry_links(conn, after, 5, limit=2)
+            pages.append(links)
+        return pages
+
+    # Entry 1 is before the watermark and entry 6 after the cycle
+    assert asyncio.run(run()) == [["b", "c"], ["d"]]
+    assert conn.queries == 2
+
+
+class FakeLinkState:
+    """
+    In-memory stand-in for the due links query of the crawl state table.
+    """
+
+    def __init__(self, rows):
+        self.rows = sorted(rows)
+
+    async def fetch(self, query, after, refresh_after, max_attempts, limit,
+                    excluded):
+        return [
+            {"link": link} for link, status, attempts, age in self.rows
+            if link > after and status not in excluded and (
+                (status != "failed" and age > refresh_after)
+                or (status == "failed" and attempts < max_attempts)
+            )
+        ][:limit]
+
+
+def test_final_outcomes_are_never_due():
+    old = timedelta(days=30)
+    conn = FakeLinkState([
+        ("a", "ok", 0, old),
+        ("b", "not_modified", 0, old),
+        ("c", "failed", 1, timedelta(0)),
+        ("d", "failed", 3, old),
+        ("e", "ok", 0, timedelta(0)),
+    ] + [(status, status, 0, old) for status in FINAL_STATUSES])
+
+    async def run():
+        links, after = [], ""
+        while after is not None:
+            page, after = await get_due_links(conn, after, limit=2)
+            links.extend(page)
+        return links
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
@@ -0,0 +1,106 @@
+import asyncio
+import itertools
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("scrapy")
+
+from app.scraping import crawler_pool
+from app.utils.metrics import PAGES
+
+
+class CrashingProcess:
+    """
+    Stand-in for `CrawlerProcess` whose spider records a page and dies in
+    the middle of its batch.
+    """
+
+    def __init__(self, settings):
+        pass
+
+    def crawl(self, spider, **kwargs):
+        pass
+
+    def start(self):
+        PAGES.labels("example.com", "ok").inc()
+        raise RuntimeError("worker crashed")
+
+
+def run_worker(conn):
+    try:
+        crawler_pool.run_crawler_worker(0, None, conn)
+    except RuntimeError:
+        pass
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="fork start method not available"
+)
+def test_worker_reports_only_its_metrics_on_exit(monkeypatch):
+    monkeypatch.setattr(crawler_pool, "CrawlerProcess", CrashingProcess)
+    page = PAGES.labels("example.com", "ok")
+    page.inc(100)
+    context = multiprocessing.get_context("fork")
+    try:
+        # Every respawned worker is forked from the same API process
+        for expected in (101, 102):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_worker, args=(sender,))
+            process.start()
+            sender.close()
+            kind, batch_id, payload = receiver.recv()
+            process.join()
+            assert (kind, batch_id) == ("metrics", None)
+            crawler_pool.REGISTRY.merge(payload)
+            assert page.value == expected
+    finally:
+        crawler_pool.REGISTRY.drain()
+
+
+def hosts_of(pool):
+    """
+    Find a host crawled by each worker of a pool.
+    """
+    hosts = {}
+    for n in itertools.count():
+        host = f"host{n}.example"
+        hosts.setdefault(pool._partition([f"https://{host}/"]).popitem()[0],
+                         host)
+        if len(hosts) == pool.size:
+            return [hosts[worker_id] for worker_id in range(pool.size)]
+
+
+def test_busy_worker_does_not_hold_back_the_others(monkeypatch):
+    monkeypatch.setattr(crawler_pool, "QUEUED_BATCHES", 4)
+    pool = crawler_pool.CrawlerPool(size=2, batch_size=1)
+    busy, free = hosts_of(pool)
+    release = asyncio.Event()
+    submitted = []
+
+    async def submit(worker_id, kind, urls, on_message, batches,
+                     full=False):
+        if busy in urls[0]:
+            await release.wait()
+        submitted.append(urls[0])
+        if urls[0] == f"https://{free}/4":
+            release.set()
+
+    async def sources():
+        for n in range(5):
+            yield [f"https://{busy}/{n}", f"https://{free}/{n}"]
+
+    async def run():
+        # The busy worker only takes a batch once the other worker was
+        # sent all of its own
+        await asyncio.wait_for(pool.crawl_stream(
+            "dynamic", sources(), lambda *args: None
+        ), 5)
+
+    monkeypatch.setattr(pool, "_submit", submit)
+    asyncio.run(run())
+    assert submitted == (
+        [f"https://{free}/{n}" for n in range(5)]
+        + [f"https://{busy}/{n}" for n in range(5)]
+    )
@@ -0,0 +1,108 @@
+import pytest
+
+pytest.importorskip("scrapy")
+
+from app.scraping.dedup import (
+    DEDUP_MIN_WORDS,
+    NearDuplicateIndex,
+    fingerprint_item,
+    simhash
+)
+
+WORDS = [f"word{i}" for i in range(300)]
+
+
+def article(url, words):
+    return {"url": url, "p": [" ".join(words)]}
+
+
+def distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite3"), "tag")
+    yield index
+    index.close()
+
+
+def test_short_text_has_no_fingerprint():
+    assert simhash(WORDS[:DEDUP_MIN_WORDS - 1]) is None
+    assert fingerprint_item(article("a", WORDS[:5])) is None
+    assert fingerprint_item({"url": "a"}) is None
+
+
+def test_fingerprint_is_stable_and_case_insensitive():
+    fingerprint = fingerprint_item(article("a", WORDS))
+    assert len(fingerprint) == 16
+    int(fingerprint, 16)
+    upper = [word.upper() for word in WORDS]
+    assert fingerprint_item(article("b", upper)) == fingerprint
+
+
+def test_near_copies_are_close_and_other_texts_far():
+    edited = WORDS[:150] + ["changed"] + WORDS[151:]
+    other = [f"other{i}" for i in range(300)]
+    fingerprint = fingerprint_item(article("a", WORDS))
+    assert distance(fingerprint, fingerprint_item(article("b", edited))) <= 3
+    assert distance(fingerprint, fingerprint_item(article("c", other))) > 3
+
+
+def test_near_duplicate_is_tagged(index):
+    edited = WORDS[:150] + ["changed"] + WORDS[151:]
+    first = index.process(article("https://a.example/post", WORDS))
+    assert "duplicate_of" not in first
+    copy = index.process(article("https://b.example/copy", edited))
+    assert copy["duplicate_of"] == "https://a.example/post"
+    assert index.duplicates == 1
+
+
+def test_same_url_is_not_its_own_duplicate(index):
+    index.process(article("https://a.example/post", WORDS))
+    again = index.process(article("https://a.example/post", WORDS))
+    assert "duplicate_of" not in again
+    assert index.duplicates == 0
+
+
+def test_drop_and_off_modes(tmp_path):
+    drop = NearDuplicateIndex(str(tmp_path / "drop.sqlite3"), "drop")
+    off = NearDuplicateIndex(str(tmp_path / "off.sqlite3"), "off")
+    try:
+        assert drop.process(article("a", WORDS)) is not None
+        assert drop.process(article("b", WORDS)) is None
+        assert off.process(article("a", WORDS)) is not None
+        assert "duplicate_of" not in off.process(article("b", WORDS))
+        assert off.duplicates == 0
+    finally:
+        drop.close()
+        off.close()
+
+
+def test_short_items_pass_through(index):
+    item = index.process(article("a", WORDS[:5]))
+    assert item["simhash"] is None
+    assert "duplicate_of" not in index.process(article("b", WORDS[:5]))
+
+
+def test_process_many_sees_earlier_items_of_the_batch(index):
+    results = index.process_many([
+        article("a", WORDS),
+        article("b", WORDS),
+        article("c", [f"other{i}" for i in range(300)])
+    ])
+    assert "duplicate_of" not in results[0]
+    assert results[1]["duplicate_of"] == "a"
+    assert "duplicate_of" not in results[2]
+
+
+def test_index_persists(tmp_path):
+    path = str(tmp_path / "dedup.sqlite3")
+    first = NearDuplicateIndex(path, "tag")
+    first.process(article("a", WORDS))
+    first.close()
+    second = NearDuplicateIndex(path, "tag")
+    try:
+        assert second.process(article("b", WORDS))["duplicate_of"] == "a"
+    finally:
+        second.close()
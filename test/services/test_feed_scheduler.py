@@ -0,0 +1,155 @@
+from datetime import datetime, timezone
+
+import pytest
+
+for module in ("loguru", "pydantic", "asyncpg", "httpx", "feedparser",
+               "scrapy"):
+    pytest.importorskip(module)
+
+from app.models.feed_schedule_db import FeedSchedule
+from app.scraping import feed_scheduler
+from app.scraping.feed_scheduler import (
+    FEED_BACKOFF,
+    FEED_DEFAULT_INTERVAL,
+    FEED_MAX_INTERVAL,
+    FEED_MIN_INTERVAL,
+    FEED_POLL_FACTOR,
+    FEED_RETRY_INTERVAL,
+    entry_gap,
+    learn_interval,
+    update_schedule
+)
+
+NOW = 1_800_000_000.0
+HOUR = 3600.0
+DAY = 86400.0
+
+
+def schedule(**kwargs):
+    values = {
+        "feed_id": 1,
+        "feed_url": "https://example.com/feed",
+        "interval_seconds": FEED_DEFAULT_INTERVAL
+    }
+    values.update(kwargs)
+    return FeedSchedule(**values)
+
+
+def at(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def summary(*timestamps):
+    return {"timestamps": list(timestamps)}
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(feed_scheduler.random, "uniform", lambda a, b: 1.0)
+
+
+def test_entry_gap_needs_two_entries():
+    assert entry_gap([], NOW) is None
+    assert entry_gap([NOW - HOUR], NOW) is None
+    # Repeated timestamps count once
+    assert entry_gap([NOW - HOUR, NOW - HOUR], NOW) is None
+
+
+def test_entry_gap_is_the_median():
+    times = [NOW - 10, NOW - 10 - HOUR, NOW - 10 - 2 * HOUR,
+             NOW - 10 - 5 * HOUR]
+    assert entry_gap(times, NOW) == HOUR
+
+
+def test_entry_gap_grows_with_silence():
+    times = [NOW - 3 * DAY, NOW - 3 * DAY - HOUR]
+    assert entry_gap(times, NOW) == 3 * DAY
+
+
+def test_first_interval_is_not_smoothed():
+    times = [NOW - 60, NOW - 60 - 8 * HOUR, NOW - 60 - 16 * HOUR]
+    interval = learn_interval(schedule(), times, NOW)
+    assert interval == 8 * HOUR * FEED_POLL_FACTOR
+
+
+def test_interval_is_smoothed_once_learned():
+    times = [NOW - 60, NOW - 60 - 8 * HOUR, NOW - 60 - 16 * HOUR]
+    learned = schedule(interval_seconds=2 * HOUR, changes=3)
+    interval = learn_interval(learned, times, NOW)
+    assert 2 * HOUR < interval < 8 * HOUR * FEED_POLL_FACTOR
+
+
+@pytest.mark.parametrize("gap, expected", [
+    (60.0, FEED_MIN_INTERVAL),
+    (365 * DAY, FEED_MAX_INTERVAL),
+])
+def test_interval_is_clamped(gap, expected):
+    times = [NOW, NOW - gap]
+    assert learn_interval(schedule(), times, NOW) == expected
+
+
+def test_interval_without_dated_entries_is_kept():
+    assert learn_interval(schedule(), [NOW], NOW) == FEED_DEFAULT_INTERVAL
+
+
+def test_new_entries_change_the_schedule():
+    feed = schedule()
+    times = [NOW - 60, NOW - 60 - 4 * HOUR, NOW - 60 - 8 * HOUR]
+    assert update_schedule(feed, summary(*times), False, NOW) == "changed"
+    assert feed.interval_seconds == 4 * HOUR * FEED_POLL_FACTOR
+    assert feed.last_entry_at == at(NOW - 60)
+    assert feed.next_poll == at(NOW + feed.interval_seconds)
+    assert (feed.polls, feed.changes, feed.failures) == (1, 1, 0)
+
+
+@pytest.mark.parametrize("result", [
+    None,  # 304 Not Modified
+    summary(NOW - DAY, NOW - 2 * DAY),  # No entry newer than the last one
+])
+def test_nothing_new_backs_off(result):
+    feed = schedule(last_entry_at=at(NOW - DAY))
+    assert update_schedule(feed, result, False, NOW) == "unchanged"
+    assert feed.interval_seconds == FEED_DEFAULT_INTERVAL * FEED_BACKOFF
+    assert feed.changes == 0
+
+
+def test_back_off_is_clamped():
+    feed = schedule(interval_seconds=FEED_MAX_INTERVAL)
+    update_schedule(feed, None, False, NOW)
+    assert feed.interval_seconds == FEED_MAX_INTERVAL
+
+
+def test_feed_without_dates_keeps_its_interval():
+    feed = schedule()
+    assert update_schedule(feed, summary(), False, NOW) == "unchanged"
+    assert feed.interval_seconds == FEED_DEFAULT_INTERVAL
+
+
+def test_failures_retry_with_exponential_back_off():
+    feed = schedule()
+    delays = []
+    for _ in range(3):
+        assert update_schedule(feed, None, True, NOW) == "error"
+        delays.append(feed.next_poll.timestamp() - NOW)
+    assert delays == [
+        min(FEED_MAX_INTERVAL, FEED_RETRY_INTERVAL * factor)
+        for factor in (1, 2, 4)
+    ]
+    assert feed.interval_seconds == FEED_DEFAULT_INTERVAL
+    assert feed.failures == 3
+
+    update_schedule(feed, None, False, NOW)
+    assert feed.failures == 0
+
+
+def test_retry_delay_is_clamped():
+    feed = schedule(failures=40)
+    update_schedule(feed, None, True, NOW)
+    assert feed.next_poll == at(NOW + FEED_MAX_INTERVAL)
+
+
+def test_next_poll_is_jittered(monkeypatch):
+    monkeypatch.setattr(feed_scheduler.random, "uniform", lambda a, b: b)
+    feed = schedule()
+    update_schedule(feed, None, False, NOW)
+    assert feed.next_poll == at(NOW + feed.interval_seconds * 1.1)
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("loguru")
+
+from app.scraping.frontier import BloomFilter, SeenUrlFrontier
+
+
+@pytest.fixture
+def frontier(tmp_path):
+    return SeenUrlFrontier(str(tmp_path / "seen.bloom"), 1000, 0.01)
+
+
+def filter_new(frontier, urls, **kwargs):
+    return asyncio.run(frontier.filter_new(urls, **kwargs))
+
+
+def test_bloom_filter_membership():
+    bloom = BloomFilter(1000, 0.01)
+    assert bloom.add("a") is True
+    assert bloom.add("a") is False
+    assert "a" in bloom
+    assert "b" not in bloom
+    assert bloom.count == 1
+
+
+def test_variants_are_filtered(frontier):
+    urls = filter_new(frontier, [
+        "https://example.com/post?utm_source=x",
+        "https://example.com/post/",
+        "https://example.com/other#c",
+    ])
+    assert urls == ["https://example.com/post", "https://example.com/other"]
+    assert frontier.prevented == 1
+
+
+def test_seen_urls_are_skipped(frontier):
+    frontier.mark_seen(["https://example.com/post/"])
+    assert filter_new(frontier, ["https://example.com/post"]) == []
+    assert frontier.prevented == 1
+    assert filter_new(
+        frontier, ["https://example.com/post"], skip_seen=False
+    ) == ["https://example.com/post"]
+
+
+def test_queued_urls_are_skipped_across_batches(frontier):
+    queued = BloomFilter(1000, 0.01)
+    first = filter_new(frontier, ["https://example.com/a"], queued=queued)
+    second = filter_new(
+        frontier, ["https://example.com/a/", "https://example.com/b"],
+        queued=queued
+    )
+    assert first == ["https://example.com/a"]
+    assert second == ["https://example.com/b"]
+
+
+def test_filter_hits_are_confirmed(frontier):
+    frontier.mark_seen(["https://example.com/fetched/",
+                        "https://example.com/lost"])
+    asked = []
+
+    async def confirm(urls):
+        asked.extend(urls)
+        # Only the first page has a crawl state, the other is a false
+        # positive of the filter
+        return ["https://example.com/fetched/"]
+
+    urls = filter_new(frontier, [
+        "https://example.com/fetched",
+        "https://example.com/lost",
+        "https://example.com/new",
+    ], confirm=confirm)
+    assert urls == ["https://example.com/lost", "https://example.com/new"]
+    assert "https://example.com/fetched/" in asked
+    assert "https://example.com/new" not in asked
+    assert frontier.prevented == 1
+    assert frontier.false_positives == 1
+
+
+def test_confirm_is_not_called_without_hits(frontier):
+    async def confirm(urls):
+        raise AssertionError("no URL was in the filter")
+
+    assert filter_new(
+        frontier, ["https://example.com/a"], confirm=confirm
+    ) == ["https://example.com/a"]
+
+
+def test_frontier_persists(tmp_path):
+    path = str(tmp_path / "seen.bloom")
+    frontier = SeenUrlFrontier(path, 1000, 0.01)
+    frontier.mark_seen(["https://example.com/a"])
+    frontier.prevented = 5
+    frontier.save()
+
+    # The stored geometry wins over the requested one
+    reloaded = SeenUrlFrontier(path, 50, 0.1)
+    assert reloaded.filter.bits == frontier.filter.bits
+    assert reloaded.prevented == 5
+    assert filter_new(reloaded, ["https://example.com/a/"]) == []
+
+
+@pytest.mark.parametrize("content", [b"", b"garbage", b"CBLOOM01\x00"])
+def test_unreadable_frontier_is_ignored(tmp_path, content):
+    path = tmp_path / "seen.bloom"
+    path.write_bytes(content)
+    frontier = SeenUrlFrontier(str(path), 1000, 0.01)
+    assert frontier.filter.count == 0
+
+
+def test_truncated_frontier_is_ignored(tmp_path):
+    path = str(tmp_path / "seen.bloom")
+    frontier = SeenUrlFrontier(path, 1000, 0.01)
+    frontier.mark_seen(["https://example.com/a"])
+    frontier.save()
+    with open(path, "r+b") as file:
+        file.truncate(40)
+    assert SeenUrlFrontier(path, 1000, 0.01).filter.count == 0
+
+
+def test_queued_hits_are_confirmed(frontier):
+    queued = BloomFilter(1000, 0.01)
+    # Stands for a false positive of the cycle's filter
+    queued.add("https://example.com/lost")
+    queued.add("https://example.com/fetched")
+
+    async def confirm(urls):
+        return [url for url in urls if url == "https://example.com/fetched"]
+
+    urls = filter_new(frontier, [
+        "https://example.com/lost", "https://example.com/fetched"
+    ], queued=queued, confirm=confirm)
+    assert urls == ["https://example.com/lost"]
+    assert frontier.prevented == 1
+    # Only hits of the seen-URL filter count as its false positives
+    assert frontier.false_positives == 0
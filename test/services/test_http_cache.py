@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+for module in ("scrapy", "loguru", "pydantic", "asyncpg", "psycopg2"):
+    pytest.importorskip(module)
+
+from scrapy.http import HtmlResponse, Request
+
+from app.models.crawl_state_db import LinkScrapeResult
+from app.scraping.http_cache import ConditionalFetchMiddleware, ValidatorStore
+from app.scraping.spider_factory import store_validators
+
+LINK = "https://example.com/a"
+TARGET = "https://example.com/articles/a"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ValidatorStore(str(tmp_path / "validators.sqlite3"))
+    yield store
+    store.close()
+
+
+def fetch(middleware, request, etag):
+    middleware.process_request(request, None)
+    response = HtmlResponse(
+        request.url, headers={"ETag": etag}, body=b"<html></html>",
+        request=request
+    )
+    return middleware.process_response(request, response, None)
+
+
+def test_redirected_validators_are_stored_under_the_target(store):
+    middleware = ConditionalFetchMiddleware(store)
+    request = Request(LINK, meta={"link": LINK})
+    middleware.process_request(request, None)
+    # The redirect middleware hands over the meta to the new request
+    redirected = request.replace(url=TARGET)
+    fetch(middleware, redirected, '"v1"')
+    assert redirected.meta["validators"][:2] == (TARGET, '"v1"')
+
+    asyncio.run(store_validators(store, [LinkScrapeResult(
+        link=LINK, status="ok", validators=redirected.meta["validators"]
+    )]))
+    assert store.get(LINK) is None
+    assert store.get(TARGET)[0] == '"v1"'
+
+    # The link itself is fetched unconditionally, its target is not
+    again = Request(LINK, meta={"link": LINK})
+    middleware.process_request(again, None)
+    assert b"If-None-Match" not in again.headers
+    target = again.replace(url=TARGET)
+    middleware.process_request(target, None)
+    assert target.headers[b"If-None-Match"] == b'"v1"'
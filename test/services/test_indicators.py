@@ -0,0 +1,131 @@
+import pytest
+
+pytest.importorskip("loguru")
+pytest.importorskip("tldextract")
+
+from app.scraping.indicators import (
+    IndicatorExtractor,
+    KeywordAutomaton,
+    load_keywords
+)
+
+MD5 = "d41d8cd98f00b204e9800998ecf8427e"
+SHA1 = "da39a3ee5e6b4b0d3255bfef95601890afd80709"
+SHA256 = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return IndicatorExtractor({
+        "Siemens": "Siemens",
+        "Schneider Electric": "Schneider Electric",
+        "Schneider": "Schneider Electric",
+        "Windows Server": "Windows Server",
+        "Windows": "Windows",
+        "Fortinet FortiGate": "FortiGate",
+    })
+
+
+def test_cve_ids_are_normalised(extractor):
+    found = extractor.extract_text(
+        "Patch cve-2024-3400 and CVE-2021-44228, not CVE-21-1."
+    )
+    assert found["cve"] == ["CVE-2024-3400", "CVE-2021-44228"]
+
+
+def test_defanged_domains_are_restored(extractor):
+    found = extractor.extract_text(
+        "C2 at evil[.]example(.)com, hxxps://bad[dot]org/payload and "
+        "www.example.co.uk."
+    )
+    assert found["domain"] == [
+        "evil.example.com", "bad.org", "www.example.co.uk"
+    ]
+
+
+def test_file_names_are_not_domains(extractor):
+    found = extractor.extract_text(
+        "Dropped update.exe, loader.dll and setup.py next to invoice.pdf"
+    )
+    assert "domain" not in found
+
+
+def test_ipv4_addresses(extractor):
+    found = extractor.extract_text(
+        "Seen from 192.168.1.10, 10.0.0.1. and 8.8.8.8 but not 999.1.1.1, "
+        "1.2.3 or version 1.2.3.4.5"
+    )
+    assert found["ipv4"] == ["192.168.1.10", "10.0.0.1", "8.8.8.8"]
+
+
+def test_ipv6_addresses_are_compressed(extractor):
+    found = extractor.extract_text(
+        "Beacons to 2001:0db8:0000:0000:0000:ff00:0042:8329 and fe80::1, "
+        "not 12:30"
+    )
+    assert found["ipv6"] == ["2001:db8::ff00:42:8329", "fe80::1"]
+
+
+def test_hashes_are_typed_by_length(extractor):
+    found = extractor.extract_text(
+        f"Hashes {MD5.upper()} {SHA1} {SHA256} and {MD5[:31]}"
+    )
+    assert found["md5"] == [MD5]
+    assert found["sha1"] == [SHA1]
+    assert found["sha256"] == [SHA256]
+
+
+def test_multi_word_keywords(extractor):
+    found = extractor.extract_text(
+        "Schneider  Electric and Siemens advisories; Windows Server 2019 "
+        "and windows hosts behind a Fortinet\nFortiGate"
+    )
+    assert found["keyword"] == [
+        "Schneider Electric", "Siemens", "Windows", "Windows Server",
+        "FortiGate"
+    ]
+
+
+def test_partial_multi_word_keyword_is_not_found(extractor):
+    found = extractor.extract_text("Fortinet released a statement")
+    assert "keyword" not in found
+
+
+def test_text_without_indicators(extractor):
+    assert extractor.extract_text("Nothing to see here.") == {}
+
+
+def test_item_fields_are_scanned(extractor):
+    item = extractor.process({
+        "url": "https://news.example/a",
+        "title": "Siemens fixes CVE-2024-1234",
+        "h2": ["IOCs"],
+        "p": ["Contact 203.0.113.7", "Hash " + MD5],
+    })
+    assert item["indicators"] == {
+        "cve": ["CVE-2024-1234"],
+        "ipv4": ["203.0.113.7"],
+        "md5": [MD5],
+        "keyword": ["Siemens"],
+    }
+
+
+def test_automaton_suffix_matches():
+    automaton = KeywordAutomaton({"a b c": "ABC", "b c": "BC", "c d": "CD"})
+    assert automaton.find("x a b c d".split()) == ["ABC", "BC", "CD"]
+    assert automaton.find("a b x c d".split()) == ["CD"]
+
+
+def test_load_keywords(tmp_path):
+    path = tmp_path / "keywords.txt"
+    path.write_text(
+        "# vendors\n\nSiemens\nSchneider Electric | Schneider | SE\n",
+        encoding="utf8"
+    )
+    assert load_keywords(str(path)) == {
+        "Siemens": "Siemens",
+        "Schneider Electric": "Schneider Electric",
+        "Schneider": "Schneider Electric",
+        "SE": "Schneider Electric",
+    }
+    assert load_keywords(str(tmp_path / "missing.txt")) == {}
@@ -0,0 +1,88 @@
+import multiprocessing
+
+import pytest
+
+from app.utils.metrics import Registry
+
+
+def make_registry():
+    registry = Registry()
+    pages = registry.counter("pages_total", "Pages.", ("status",))
+    seconds = registry.histogram(
+        "stage_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0)
+    )
+    alive = registry.gauge("alive", "Workers alive.")
+    return registry, pages, seconds, alive
+
+
+def record(pages, seconds, count):
+    for _ in range(count):
+        pages.labels("ok").inc()
+        seconds.labels("parse").observe(0.05)
+
+
+def totals(pages, seconds):
+    return pages.labels("ok").value, seconds.labels("parse").count
+
+
+def test_drain_resets_counts():
+    registry, pages, seconds, alive = make_registry()
+    record(pages, seconds, 3)
+    alive.set(4)
+    drained = registry.drain()
+    assert set(drained) == {"pages_total", "stage_seconds"}
+    assert totals(pages, seconds) == (0, 0)
+    assert registry.drain() == {}
+    # Gauges belong to the API process and are neither drained nor reset
+    assert alive.labels().value == 4
+
+
+def test_merge_adds_drained_counts():
+    worker, worker_pages, worker_seconds, _ = make_registry()
+    api, api_pages, api_seconds, _ = make_registry()
+    record(api_pages, api_seconds, 2)
+    for _ in range(3):
+        record(worker_pages, worker_seconds, 5)
+        api.merge(worker.drain())
+    assert totals(api_pages, api_seconds) == (17, 17)
+    assert api_seconds.labels("parse").counts[0] == 17
+    assert api_seconds.labels("parse").sum == pytest.approx(17 * 0.05)
+
+
+def test_merge_ignores_unknown_metrics():
+    registry, pages, seconds, _ = make_registry()
+    registry.merge({"other_total": [(("x",), 1.0)]})
+    assert totals(pages, seconds) == (0, 0)
+
+
+def _worker(registry, pages, seconds, conn, reset):
+    if reset:
+        registry.reset()
+    record(pages, seconds, 1)
+    conn.send(registry.drain())
+    conn.close()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="fork start method not available"
+)
+@pytest.mark.parametrize("reset, expected", [
+    (True, (101, 101)),
+    # What a forked worker reports if it does not reset its copy
+    (False, (201, 201)),
+])
+def test_forked_worker_reports_only_its_counts(reset, expected):
+    registry, pages, seconds, _ = make_registry()
+    record(pages, seconds, 100)
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_worker, args=(registry, pages, seconds, sender, reset)
+    )
+    process.start()
+    sender.close()
+    drained = receiver.recv()
+    process.join()
+    registry.merge(drained)
+    assert totals(pages, seconds) == expected
@@ -0,0 +1,155 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("scrapy")
+pytest.importorskip("loguru")
+
+from app.scraping import replay, response_archive
+from app.scraping.replay import plan_replay, replay_archive, replay_chunk
+from app.scraping.response_archive import (
+    INDEX_ENTRY,
+    ResponseArchive,
+    ResponseArchiveWriter,
+    decode_record,
+    encode_record
+)
+from app.scraping.result_store import ResultStore
+
+HTML = [(b"Content-Type", b"text/html; charset=utf-8")]
+PDF = [(b"Content-Type", b"application/pdf")]
+# The compressed streams of a PDF keep its body from being taken as text
+PDF_BODY = b"%PDF-1.7\n1 0 obj\nstream\nx\x9c\x03\x00\x00\x00\x00\x01\n"
+
+
+def page(title):
+    return f"<html><body><h1>{title}</h1></body></html>".encode("utf8")
+
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    return str(tmp_path / "archive")
+
+
+def write(directory, records, prefix="w"):
+    writer = ResponseArchiveWriter(directory, prefix)
+    for url, fetched_at, headers, body in records:
+        writer.append(url, 200, headers, body, fetched_at)
+    return writer
+
+
+def test_record_round_trip():
+    headers = HTML + [(b"Content-Encoding", b"gzip"), (b"X-Test", b"1")]
+    archived = decode_record(encode_record(
+        "https://example.com/a", 1700000000.25, 200, headers, b"body"
+    ))
+    assert archived.url == "https://example.com/a"
+    assert archived.fetched_at == pytest.approx(1700000000.25)
+    assert archived.status == 200
+    assert archived.body == b"body"
+    # The body is stored decoded, with its own length
+    assert (b"Content-Encoding", b"gzip") not in archived.headers
+    assert (b"X-Test", b"1") in archived.headers
+    assert (b"Content-Length", b"4") in archived.headers
+
+
+def test_versions_are_found_before_and_after_sealing(archive_dir):
+    writer = write(archive_dir, [
+        ("https://example.com/a", 100.0, HTML, page("old")),
+        ("https://example.com/b", 150.0, HTML, page("b")),
+        ("https://example.com/a", 200.0, HTML, page("new")),
+    ])
+    archive = ResponseArchive(archive_dir)
+    for _ in range(2):
+        assert [v[0] for v in archive.lookup("https://example.com/a")] == [
+            100.0, 200.0
+        ]
+        assert archive.get("https://example.com/a").body == page("new")
+        assert archive.get("https://example.com/a", at=150).body == (
+            page("old")
+        )
+        assert archive.get("https://example.com/a", at=50) is None
+        assert archive.get("https://example.com/missing") is None
+        # The active index is a log, sealing sorts it
+        writer.close()
+    assert sorted(os.listdir(archive_dir)) == ["w-000001.idx",
+                                               "w-000001.warc.gz"]
+
+
+def test_segments_rotate(archive_dir, monkeypatch):
+    monkeypatch.setattr(response_archive, "ARCHIVE_SEGMENT_MAX_BYTES", 1)
+    write(archive_dir, [
+        (f"https://example.com/{i}", float(i), HTML, page(str(i)))
+        for i in range(3)
+    ]).close()
+    archive = ResponseArchive(archive_dir)
+    assert archive.segments() == ["w-000001", "w-000002", "w-000003"]
+    assert archive.get("https://example.com/2").body == page("2")
+
+
+def test_torn_index_entry_is_ignored(archive_dir):
+    writer = write(archive_dir, [
+        ("https://example.com/a", 100.0, HTML, page("a")),
+    ])
+    writer._index.write(b"\x00" * (INDEX_ENTRY.size // 2))
+    writer._index.flush()
+    archive = ResponseArchive(archive_dir)
+    assert len(list(archive.entries())) == 1
+    assert archive.get("https://example.com/a").body == page("a")
+
+
+def test_plan_replays_latest_versions(archive_dir, monkeypatch):
+    monkeypatch.setattr(replay, "REPLAY_CHUNK_SIZE", 2)
+    write(archive_dir, [
+        ("https://example.com/a", 100.0, HTML, page("old")),
+        ("https://example.com/b", 150.0, HTML, page("b")),
+        ("https://example.com/a", 200.0, HTML, page("new")),
+        ("https://example.com/c", 250.0, HTML, page("c")),
+    ]).close()
+    archive = ResponseArchive(archive_dir)
+
+    latest = plan_replay(archive)
+    assert [len(spans) for _, spans in latest] == [2, 1]
+    assert sum(len(spans) for _, spans in plan_replay(
+        archive, all_versions=True
+    )) == 4
+    assert sum(len(spans) for _, spans in plan_replay(
+        archive, since=120, until=220
+    )) == 2
+
+
+def fake_scrape(response):
+    if b"broken" in response.body:
+        raise ValueError("cannot extract")
+    return {"url": response.url, "h1": [response.css("h1::text").get()]}, ""
+
+
+def test_replay_counts_documents_apart(archive_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(replay, "scrape_article", fake_scrape)
+    # The extraction runs in threads, so the fake is seen
+    monkeypatch.setattr(replay, "ProcessPoolExecutor", ThreadPoolExecutor)
+    write(archive_dir, [
+        ("https://example.com/a", 100.0, HTML, page("a")),
+        ("https://example.com/report.pdf", 110.0, PDF, PDF_BODY),
+        ("https://example.com/b", 120.0, HTML, page("broken")),
+        ("https://example.com/c", 130.0, HTML, page("c")),
+    ]).close()
+
+    chunk, = plan_replay(ResponseArchive(archive_dir))
+    items, failed, documents = replay_chunk(archive_dir, chunk)
+    assert [item["h1"] for item in items] == [["a"], ["c"]]
+    assert items[0]["fetched_at"] == pytest.approx(100.0)
+    assert (failed, documents) == (1, 1)
+
+    store = ResultStore(str(tmp_path / "results"))
+    try:
+        stats = replay_archive(store, archive_dir, processes=1)
+        assert (stats["records"], stats["items"], stats["failed"],
+                stats["documents"]) == (4, 2, 1, 1)
+        page_, _ = store.read(limit=10)
+        assert {item["url"] for item in page_} == {
+            "https://example.com/a", "https://example.com/c"
+        }
+    finally:
+        store.close()
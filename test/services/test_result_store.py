@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from app.scraping import result_store
+from app.scraping.result_store import (
+    ResultStore,
+    decode_cursor,
+    encode_cursor
+)
+
+
+def fill(store, count, start=0):
+    for i in range(start, start + count):
+        store.append({"url": f"https://example.com/{i}",
+                      "fetched_at": 1000.0 + i})
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(3, 1024)) == (3, 1024)
+    assert decode_cursor(None) == (0, 0)
+    assert decode_cursor("") == (0, 0)
+
+
+@pytest.mark.parametrize("cursor", [
+    "1:-5", "0:-5", "-1:0", "abc", "1", "1:2:3", "a:b"
+])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_uncommitted_records_are_not_visible(tmp_path):
+    store = ResultStore(str(tmp_path))
+    fill(store, 5)
+    assert store.read()[0] == []
+    store.commit()
+    items, cursor = store.read()
+    assert [item["url"] for item in items] == [
+        f"https://example.com/{i}" for i in range(5)
+    ]
+    assert cursor is None
+    store.close()
+
+
+def test_paging_with_cursor(tmp_path):
+    store = ResultStore(str(tmp_path))
+    fill(store, 25)
+    store.commit()
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = store.read(cursor, limit=10)
+        seen.extend(item["url"] for item in items)
+        if cursor is None:
+            break
+    assert seen == [f"https://example.com/{i}" for i in range(25)]
+    store.close()
+
+
+def test_filters(tmp_path):
+    store = ResultStore(str(tmp_path))
+    fill(store, 10)
+    store.commit()
+
+    items, _ = store.read(url="https://example.com/3")
+    assert [item["fetched_at"] for item in items] == [1003.0]
+    items, _ = store.read(since=1005.0, until=1007.0)
+    assert [item["fetched_at"] for item in items] == [1005.0, 1006.0, 1007.0]
+    store.close()
+
+
+def test_segments_rotate(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, "SEGMENT_MAX_BYTES", 200)
+    store = ResultStore(str(tmp_path))
+    fill(store, 20)
+    store.close()
+
+    segments = store.load_manifest()["segments"]
+    assert len(segments) > 1
+    assert sum(segment["records"] for segment in segments) == 20
+    assert len(list(store.iter_items())) == 20
+
+
+def test_reopen_drops_uncommitted_tail(tmp_path):
+    store = ResultStore(str(tmp_path))
+    fill(store, 3)
+    store.commit()
+    # A crashed writer leaves bytes past the committed size
+    store._file.write(b'{"url": "half')
+    store._file.flush()
+
+    reopened = ResultStore(str(tmp_path))
+    fill(reopened, 1, start=3)
+    reopened.close()
+    assert [item["fetched_at"] for item in reopened.iter_items()] == [
+        1000.0, 1001.0, 1002.0, 1003.0
+    ]
+
+
+def test_commit_async(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, "COMMIT_INTERVAL", 10)
+    store = ResultStore(str(tmp_path))
+
+    async def crawl():
+        fill(store, 35)
+        await store.commit_async()
+
+    asyncio.run(crawl())
+    with open(os.path.join(tmp_path, "index.json"), encoding="utf8") as file:
+        manifest = json.load(file)
+    assert manifest["segments"][-1]["records"] == 35
+    assert len(list(store.iter_items())) == 35
+    store.close()
+
+
+def test_rotation_syncs_off_the_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, "SEGMENT_MAX_BYTES", 200)
+    synced = []
+    fsync = os.fsync
+
+    def record_fsync(fd):
+        synced.append(threading.current_thread() is threading.main_thread())
+        fsync(fd)
+
+    monkeypatch.setattr(result_store.os, "fsync", record_fsync)
+    store = ResultStore(str(tmp_path))
+
+    async def crawl():
+        fill(store, 20)
+        await store.commit_async()
+
+    asyncio.run(crawl())
+    segments = store.load_manifest()["segments"]
+    assert len(segments) > 1
+    assert sum(segment["records"] for segment in segments) == 20
+    assert synced and not any(synced)
+    assert not store._unsynced
+    store.close()
@@ -0,0 +1,73 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+for module in ("scrapy", "loguru", "pydantic", "asyncpg", "psycopg2"):
+    pytest.importorskip(module)
+
+from app.scraping import spider_factory
+
+
+class FakeTaskQueue:
+    """
+    In-memory stand-in for the crawl_tasks table, with the claim and
+    release rules of `app.models.crawl_tasks_db`.
+    """
+
+    def __init__(self, links):
+        self.tasks = {
+            link: {"status": "pending", "owner": None, "attempts": 0}
+            for link in links
+        }
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield None
+
+    async def claim(self, conn, owner, limit):
+        claimed = []
+        for link, task in self.tasks.items():
+            if task["status"] == "pending" and len(claimed) < limit:
+                task.update(status="leased", owner=owner)
+                task["attempts"] += 1
+                claimed.append(link)
+        return claimed
+
+    async def release(self, conn, owner):
+        for task in self.tasks.values():
+            if task["status"] == "leased" and task["owner"] == owner:
+                task.update(status="pending", owner=None)
+                task["attempts"] = max(task["attempts"] - 1, 0)
+
+    async def reap(self, conn):
+        return 0
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = FakeTaskQueue(["https://example.com/a", "https://example.com/b"])
+    monkeypatch.setattr(spider_factory, "claim_crawl_tasks", queue.claim)
+    monkeypatch.setattr(spider_factory, "release_crawl_tasks", queue.release)
+    monkeypatch.setattr(spider_factory, "reap_crawl_tasks", queue.reap)
+    monkeypatch.setattr(spider_factory, "ArticleWriter", lambda pool: None)
+    monkeypatch.setattr(spider_factory, "ValidatorStore", lambda: None)
+    return queue
+
+
+@pytest.mark.parametrize("error", [
+    RuntimeError("articles batch failed"), asyncio.CancelledError()
+])
+def test_failed_crawl_gives_its_tasks_back(queue, monkeypatch, error):
+    async def crawl_links(*args):
+        raise error
+
+    monkeypatch.setattr(spider_factory, "crawl_links", crawl_links)
+    with pytest.raises(type(error)):
+        asyncio.run(spider_factory.consume_crawl_tasks(
+            queue, None, None, None, "node-1"
+        ))
+    # Claimable again at once, and the attempt does not count
+    assert all(task == {"status": "pending", "owner": None, "attempts": 0}
+               for task in queue.tasks.values())
+    assert asyncio.run(queue.claim(None, "node-2", 10)) == list(queue.tasks)
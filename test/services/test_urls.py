@@ -0,0 +1,64 @@
+import pytest
+
+from app.scraping.urls import canonicalize_url, url_key
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM:443/a?b=2&a=1#top", "https://example.com/a?a=1&b=2"),
+    ("http://example.com:80", "http://example.com/"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("https://example.com./a", "https://example.com/a"),
+    ("  https://example.com/a  ", "https://example.com/a"),
+    ("https://user:pw@Example.com/a", "https://user:pw@example.com/a"),
+    ("https://example.com/post/comment-page-2/",
+     "https://example.com/post/"),
+    ("https://example.com/post/comment-page-3",
+     "https://example.com/post/"),
+    ("https://example.com/a?q=&b=1", "https://example.com/a?b=1&q="),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "utm_source=x", "UTM_Campaign=y", "fbclid=1", "gclid=1", "msclkid=1",
+    "mc_eid=1", "_ga=1", "pk_campaign=1", "hsa_acc=1", "ref_src=twsrc"
+])
+def test_tracking_params_are_stripped(query):
+    assert canonicalize_url(
+        f"https://example.com/a?id=7&{query}"
+    ) == "https://example.com/a?id=7"
+
+
+@pytest.mark.parametrize("query", [
+    "ref=main", "source=rss", "pk_id=3", "hsa=1", "id=7", "page=2"
+])
+def test_other_params_are_kept(query):
+    assert canonicalize_url(f"https://example.com/a?{query}") == (
+        f"https://example.com/a?{query}"
+    )
+
+
+@pytest.mark.parametrize("url", [
+    "mailto:someone@example.com", "/relative/path", "ftp://example.com/a",
+    "https://[::1/a"
+])
+def test_other_urls_are_returned_stripped(url):
+    assert canonicalize_url(f" {url} ") == url
+
+
+def test_url_key_ignores_trailing_slash():
+    variants = [
+        "https://example.com/post/",
+        "https://example.com/post",
+        "https://EXAMPLE.com/post/?utm_source=x#c",
+        "https://example.com/post/comment-page-1/",
+    ]
+    assert {url_key(url) for url in variants} == {"https://example.com/post"}
+    assert url_key("https://example.com/") == "https://example.com/"
+
+
+def test_trailing_slash_is_kept_in_fetched_url():
+    assert canonicalize_url("https://example.com/post/") == (
+        "https://example.com/post/"
+    )